@@ -8,6 +8,7 @@ from .models import User, BlacklistedToken
 from .serializers import UserSerializer, CustomTokenObtainPairSerializer, UserProfileSerializer
 from .throttling import LoginRateThrottle, RegisterRateThrottle
 from .logging import log_failed_login, log_successful_login
+from cart.guest import merge_guest_cart
 from datetime import datetime
 import jwt
 from django.conf import settings
@@ -41,10 +42,12 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         
         # If authentication was successful, log it
         if response.status_code == status.HTTP_200_OK:
-            username = request.data.get('username')
+            username = request.data.get(User.USERNAME_FIELD)
             try:
-                user = User.objects.get(username=username)
+                user = User.objects.get(**{User.USERNAME_FIELD: username})
                 log_successful_login(user, ip_address, user_agent)
+                # Carry the anonymous cart over to the account
+                merge_guest_cart(request, response, user)
             except User.DoesNotExist:
                 pass  # User not found, but we still got a successful response
         
@@ -0,0 +1,247 @@
+import math
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from orders.models import OrderItem
+from .models import CoPurchaseCheckpoint, RelatedProduct
+
+DEFAULT_TOP_K = 10
+DEFAULT_CHUNK_SIZE = 200_000
+# Baskets larger than this (bulk/wholesale orders) say little about
+# affinity and would add size**2 pairs each; they are skipped
+MAX_BASKET_SIZE = 50
+# Approximate peak bytes per distinct pair held while counting: the packed
+# key and its count plus the sort/inverse temporaries of a merge
+# (measured with benchmark_copurchase)
+BYTES_PER_PAIR = 80
+
+
+def _group_bounds(order_ids):
+    n = len(order_ids)
+    starts = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1]]) if n else np.empty(0, dtype=np.int64)
+    sizes = np.diff(np.r_[starts, n])
+    return starts, sizes
+
+
+def basket_pairs(order_ids, product_ids, left=None):
+    """
+    Return (a, b) arrays of every ordered pair of distinct products bought
+    in the same order. Rows must be grouped by order. `left`, a boolean
+    function of product ids, restricts which products appear as `a`.
+    """
+    # Sort by (order, product) and drop repeated products within an order
+    order = np.lexsort((product_ids, order_ids))
+    order_ids, product_ids = order_ids[order], product_ids[order]
+    if len(order_ids):
+        fresh = np.r_[True, (order_ids[1:] != order_ids[:-1]) | (product_ids[1:] != product_ids[:-1])]
+        order_ids, product_ids = order_ids[fresh], product_ids[fresh]
+
+    starts, sizes = _group_bounds(order_ids)
+    item_size = np.repeat(sizes, sizes)
+    keep = (item_size >= 2) & (item_size <= MAX_BASKET_SIZE)
+    order_ids, product_ids = order_ids[keep], product_ids[keep]
+    starts, sizes = _group_bounds(order_ids)
+    item_start = np.repeat(starts, sizes)
+    item_size = np.repeat(sizes, sizes)
+
+    anchors = np.arange(len(product_ids))
+    if left is not None:
+        anchors = anchors[left(product_ids)]
+    # Each anchor item is paired with every item of its basket
+    widths = item_size[anchors]
+    total = int(widths.sum())
+    first = np.repeat(anchors, widths)
+    block_start = np.repeat(np.cumsum(widths) - widths, widths)
+    second = np.repeat(item_start[anchors], widths) + (np.arange(total) - block_start)
+    distinct = first != second
+    return product_ids[first[distinct]], product_ids[second[distinct]]
+
+
+class PairCounter:
+    """
+    Counts (a, b) product pairs packed into int64 keys, merging partial
+    counts with np.unique so memory tracks the number of distinct pairs.
+    """
+
+    def __init__(self, merge_threshold):
+        self.merge_threshold = merge_threshold
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.pending = []
+        self.pending_size = 0
+
+    def add(self, a, b):
+        if not len(a):
+            return
+        keys, counts = np.unique((a.astype(np.int64) << 32) | b.astype(np.int64), return_counts=True)
+        self.pending.append((keys, counts))
+        self.pending_size += len(keys)
+        if self.pending_size >= self.merge_threshold:
+            self.merge()
+
+    def merge(self):
+        if not self.pending:
+            return
+        keys = np.concatenate([self.keys] + [part[0] for part in self.pending])
+        counts = np.concatenate([self.counts] + [part[1] for part in self.pending])
+        self.pending, self.pending_size = [], 0
+        order = np.argsort(keys, kind='stable')
+        keys, counts = keys[order], counts[order]
+        del order
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        self.keys, self.counts = keys[starts], np.add.reduceat(counts, starts)
+
+    def top_k(self, k):
+        """
+        Return (product, related, count, rank) arrays of the k most
+        co-purchased neighbours of every product; ties go to the lower id.
+        """
+        self.merge()
+        a = self.keys >> 32
+        b = self.keys & 0xFFFFFFFF
+        order = np.lexsort((b, -self.counts, a))
+        a, b, counts = a[order], b[order], self.counts[order]
+        starts, sizes = _group_bounds(a)
+        rank = np.arange(len(a)) - np.repeat(starts, sizes)
+        keep = rank < k
+        return a[keep], b[keep], counts[keep], rank[keep]
+
+
+def partitions_for_budget(pair_occurrences, memory_budget_mb):
+    """
+    Number of product partitions (one counting pass each) that keeps the
+    pair counts of a pass within the memory budget.
+    """
+    budget = memory_budget_mb * 1024 * 1024
+    return max(1, math.ceil(pair_occurrences * BYTES_PER_PAIR / budget))
+
+
+def merge_threshold_for_budget(memory_budget_mb):
+    # Unmerged partial counts may take a quarter of the budget
+    return max(100_000, memory_budget_mb * 1024 * 1024 // (BYTES_PER_PAIR * 4))
+
+
+def count_copurchases(chunks, top_k=DEFAULT_TOP_K, partitions=1, restrict_to=None, memory_budget_mb=256):
+    """
+    Yield top-K neighbour arrays per partition. `chunks` is a callable
+    returning a fresh iterable of (order_ids, product_ids) array chunks
+    that never split an order; it is read once per partition.
+    `restrict_to` limits the products whose neighbours are computed.
+    """
+    merge_threshold = merge_threshold_for_budget(memory_budget_mb)
+    for partition in range(partitions):
+        def left(product_ids, partition=partition):
+            mask = product_ids % partitions == partition
+            if restrict_to is not None:
+                mask &= np.isin(product_ids, restrict_to)
+            return mask
+
+        counter = PairCounter(merge_threshold)
+        for order_ids, product_ids in chunks():
+            counter.add(*basket_pairs(order_ids, product_ids, left))
+        yield counter.top_k(top_k)
+
+
+def iter_order_item_chunks(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream (order_ids, product_ids) arrays from an OrderItem queryset,
+    ordered by order and cut only at order boundaries.
+    """
+    rows = queryset.order_by('order_id').values_list('order_id', 'product_id').iterator(chunk_size=chunk_size)
+    carry_orders = np.empty(0, dtype=np.int64)
+    carry_products = np.empty(0, dtype=np.int64)
+    while True:
+        batch = np.fromiter(
+            (value for row in islice(rows, chunk_size) for value in row),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        order_ids = np.concatenate([carry_orders, batch[:, 0]])
+        product_ids = np.concatenate([carry_products, batch[:, 1]])
+        if len(batch) < chunk_size:
+            if len(order_ids):
+                yield order_ids, product_ids
+            return
+        # Hold back the last (possibly incomplete) order for the next chunk
+        cut = np.searchsorted(order_ids, order_ids[-1])
+        carry_orders, carry_products = order_ids[cut:], product_ids[cut:]
+        if cut:
+            yield order_ids[:cut], product_ids[:cut]
+
+
+def _purchases(head):
+    return OrderItem.objects.filter(order_id__lte=head).exclude(order__status='cancelled')
+
+
+def _pair_occurrences(items):
+    # Upper bound of pairs generated: sum of squared basket sizes
+    return items.order_by().values('order').annotate(size=Count('product', distinct=True)).aggregate(
+        total=Sum(F('size') * F('size'))
+    )['total'] or 0
+
+
+def _store(results, product_filter):
+    # Readers keep seeing the previous lists until every partition is written
+    with transaction.atomic():
+        RelatedProduct.objects.filter(**product_filter).delete()
+        for products, related, counts, ranks in results:
+            RelatedProduct.objects.bulk_create([
+                RelatedProduct(product_id=int(a), related_id=int(b), co_purchase_count=int(c), rank=int(r))
+                for a, b, c, r in zip(products, related, counts, ranks)
+            ], batch_size=2000)
+
+
+def _build(items, head, top_k, memory_budget_mb, chunk_size, restrict_to=None, restrict_queryset=None):
+    memory_budget_mb = memory_budget_mb or getattr(settings, 'COPURCHASE_MEMORY_BUDGET_MB', 256)
+    partitions = partitions_for_budget(_pair_occurrences(items), memory_budget_mb)
+    results = count_copurchases(
+        lambda: iter_order_item_chunks(items, chunk_size),
+        top_k=top_k, partitions=partitions, restrict_to=restrict_to,
+        memory_budget_mb=memory_budget_mb,
+    )
+    product_filter = {} if restrict_queryset is None else {'product_id__in': restrict_queryset}
+    _store(results, product_filter)
+    CoPurchaseCheckpoint.objects.update_or_create(
+        pk=1, defaults={'last_order_id': head, 'built_at': timezone.now()}
+    )
+    return partitions
+
+
+def rebuild_related_products(top_k=DEFAULT_TOP_K, memory_budget_mb=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Rebuild every product's neighbours from all non-cancelled orders.
+    Returns the number of counting passes used.
+    """
+    head = OrderItem.objects.aggregate(head=Max('order_id'))['head'] or 0
+    return _build(_purchases(head), head, top_k, memory_budget_mb, chunk_size)
+
+
+def update_related_products(top_k=DEFAULT_TOP_K, memory_budget_mb=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fold orders placed since the checkpoint into the neighbour lists.
+
+    Only pairs inside the new orders change, and both of their products
+    appear in those orders, so recomputing the neighbours of exactly those
+    products (from every order containing them) gives the same result as
+    a full rebuild. Status changes of older orders (e.g. cancellations)
+    are only picked up by rebuild_related_products.
+    Returns the number of products refreshed.
+    """
+    checkpoint, _ = CoPurchaseCheckpoint.objects.get_or_create(pk=1)
+    head = OrderItem.objects.aggregate(head=Max('order_id'))['head'] or 0
+    if head <= checkpoint.last_order_id:
+        return 0
+    new_products = (
+        _purchases(head).filter(order_id__gt=checkpoint.last_order_id)
+        .order_by().values('product_id').distinct()
+    )
+    touched = np.fromiter(new_products.values_list('product_id', flat=True), dtype=np.int64)
+    items = _purchases(head).filter(
+        order_id__in=OrderItem.objects.filter(product_id__in=new_products).values('order_id')
+    )
+    _build(items, head, top_k, memory_budget_mb, chunk_size, restrict_to=touched, restrict_queryset=new_products)
+    return len(touched)
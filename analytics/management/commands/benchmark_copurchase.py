@@ -0,0 +1,117 @@
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import User
+from sellers.models import SellerProfile
+from products.models import Category, Product
+from api.prefetch import plan_queryset
+from analytics.copurchase import DEFAULT_CHUNK_SIZE, DEFAULT_TOP_K, count_copurchases, partitions_for_budget
+from analytics.models import RelatedProduct
+from analytics.serializers import RelatedProductSerializer
+
+
+def synthetic_orders(rng, items, products, avg_basket):
+    """
+    Order items grouped by order: geometric basket sizes and a skewed
+    product popularity (low ids sell far more often).
+    """
+    sizes = rng.geometric(1 / avg_basket, size=items // avg_basket * 2)
+    sizes = sizes[:np.searchsorted(np.cumsum(sizes), items)]
+    order_ids = np.repeat(np.arange(1, len(sizes) + 1, dtype=np.int64), sizes)
+    product_ids = (products * rng.random(len(order_ids)) ** 3).astype(np.int64) + 1
+    return order_ids, product_ids
+
+
+def array_chunks(order_ids, product_ids, chunk_size):
+    start = 0
+    while start < len(order_ids):
+        end = min(start + chunk_size, len(order_ids))
+        if end < len(order_ids):
+            # Never split an order across chunks
+            boundary = np.searchsorted(order_ids, order_ids[end], side='left')
+            end = boundary if boundary > start else np.searchsorted(order_ids, order_ids[end], side='right')
+        yield order_ids[start:end], product_ids[start:end]
+        start = end
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure the co-purchase build on synthetic order items and the related-products '
+        'lookup latency. Database rows created for the lookup test are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=10_000_000, help='Synthetic order items')
+        parser.add_argument('--products', type=int, default=100_000, help='Catalog size')
+        parser.add_argument('--avg-basket', type=int, default=4, help='Mean items per order')
+        parser.add_argument('--memory-mb', type=int, default=256, help='Pair count memory budget')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K)
+        parser.add_argument('--lookups', type=int, default=500, help='Timed related-product lookups')
+        parser.add_argument('--lookup-products', type=int, default=2000,
+                            help='Products written to the database for the lookup test')
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(42)
+        order_ids, product_ids = synthetic_orders(
+            rng, options['items'], options['products'], options['avg_basket']
+        )
+        sizes = np.bincount(order_ids)
+        occurrences = int((sizes.astype(np.int64) ** 2).sum())
+        partitions = partitions_for_budget(occurrences, options['memory_mb'])
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        neighbours = sum(
+            len(result[0]) for result in count_copurchases(
+                lambda: array_chunks(order_ids, product_ids, options['chunk_size']),
+                top_k=options['top_k'], partitions=partitions, memory_budget_mb=options['memory_mb'],
+            )
+        )
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(
+            f'Build: {len(order_ids)} items in {sizes.astype(bool).sum()} orders, {partitions} pass(es), '
+            f'{elapsed:.2f}s ({len(order_ids) / elapsed:,.0f} items/s), '
+            f'peak {peak / 2 ** 20:.0f} MiB traced, {neighbours} neighbours'
+        )
+        self._benchmark_lookups(rng, options)
+
+    def _benchmark_lookups(self, rng, options):
+        count, top_k = options['lookup_products'], options['top_k']
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username='copurchase-benchmark', email='copurchase-benchmark@example.com', password=None
+            )
+            seller = SellerProfile.objects.create(user=user, store_name='Benchmark Store')
+            category = Category.objects.create(name='Co-purchase Benchmark')
+            products = Product.objects.bulk_create([
+                Product(title=f'Item {i}', description='Item', price=1, stock=1, category=category, seller=seller)
+                for i in range(count)
+            ])
+            ids = [product.pk for product in products]
+            RelatedProduct.objects.bulk_create([
+                RelatedProduct(product_id=pk, related_id=ids[(i + rank + 1) % count],
+                               rank=rank, co_purchase_count=top_k - rank)
+                for i, pk in enumerate(ids)
+                for rank in range(top_k)
+            ], batch_size=5000)
+
+            timings = []
+            for pk in rng.choice(ids, size=options['lookups']):
+                started = time.perf_counter()
+                queryset = RelatedProduct.objects.filter(product_id=int(pk), related__is_active=True).order_by('rank')
+                RelatedProductSerializer(plan_queryset(queryset, RelatedProductSerializer), many=True).data
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f'Lookup: median {statistics.median(timings):.2f} ms, '
+                f'p99 {timings[int(len(timings) * 0.99) - 1]:.2f} ms over {len(timings)} lookups'
+            )
+            transaction.set_rollback(True)
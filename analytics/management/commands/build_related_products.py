@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from analytics.copurchase import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_TOP_K, rebuild_related_products, update_related_products
+)
+
+
+class Command(BaseCommand):
+    help = 'Build "frequently bought together" lists from order items (incremental by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Rebuild from every order instead of only orders since the last run')
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K,
+                            help='Neighbours stored per product')
+        parser.add_argument('--memory-mb', type=int,
+                            help='Memory budget for pair counts (default: COPURCHASE_MEMORY_BUDGET_MB)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Order items loaded per NumPy batch')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        arguments = dict(top_k=options['top_k'], memory_budget_mb=options['memory_mb'],
+                         chunk_size=options['chunk_size'])
+        if options['full']:
+            passes = rebuild_related_products(**arguments)
+            message = f'Rebuilt related products in {passes} pass(es)'
+        else:
+            refreshed = update_related_products(**arguments)
+            message = f'Refreshed related products of {refreshed} products'
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'{message} in {elapsed:.2f}s'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from analytics.trending import DEFAULT_CHUNK_SIZE, refresh_trend_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute time-decayed trending scores from recent user activity'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--half-life-hours', type=float,
+                            help='Hours after which an event counts half (default: TRENDING_HALF_LIFE_HOURS)')
+        parser.add_argument('--window-days', type=int,
+                            help='Ignore events older than this (default: TRENDING_WINDOW_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Activity rows loaded per NumPy batch')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        scored = refresh_trend_scores(
+            half_life_hours=options['half_life_hours'],
+            window_days=options['window_days'],
+            chunk_size=options['chunk_size'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Scored {scored} trending products in {elapsed:.2f}s'))
@@ -23,6 +23,57 @@ class UserActivity(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Trending scans only read recent events
+            models.Index(fields=['timestamp'], name='analytics_activity_ts_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.activity_type}"
\ No newline at end of file
+        return f"{self.user.username} - {self.activity_type}"
+
+
+class ProductTrendScore(models.Model):
+    """
+    Exponentially time-decayed activity score per product, refreshed in
+    bulk by the compute_trending command and read by the trending endpoint.
+    """
+    product = models.OneToOneField('products.Product', on_delete=models.CASCADE, primary_key=True, related_name='trend_score')
+    score = models.FloatField()
+    event_count = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='analytics_trend_score_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id}: {self.score:.3f}"
+
+class RelatedProduct(models.Model):
+    """
+    Top-K "frequently bought together" neighbours of a product, ranked by
+    how many orders contain both. Built by analytics.copurchase.
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='related_products')
+    related = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    co_purchase_count = models.PositiveIntegerField()
+    
+    class Meta:
+        unique_together = ('product', 'rank')
+        ordering = ['product', 'rank']
+    
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank}, {self.co_purchase_count})"
+
+class CoPurchaseCheckpoint(models.Model):
+    """
+    Singleton row recording the last order folded into RelatedProduct, so
+    incremental updates only read orders placed since.
+    """
+    last_order_id = models.PositiveBigIntegerField(default=0)
+    built_at = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"Co-purchase checkpoint at order {self.last_order_id}"
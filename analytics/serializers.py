@@ -0,0 +1,14 @@
+from rest_framework import serializers
+from products.serializers import ProductSerializer
+
+
+class TrendingProductSerializer(ProductSerializer):
+    trend_score = serializers.FloatField(source='trend_score.score', read_only=True)
+    
+    class Meta(ProductSerializer.Meta):
+        pass
+
+
+class RelatedProductSerializer(serializers.Serializer):
+    product = ProductSerializer(source='related', read_only=True)
+    co_purchase_count = serializers.IntegerField(read_only=True)
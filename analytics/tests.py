@@ -1,3 +1,139 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from sellers.models import SellerProfile
+from products.models import Category, Product
+from orders.models import Order, OrderItem
+from .copurchase import rebuild_related_products, update_related_products
+from .models import ProductTrendScore, RelatedProduct, UserActivity
+from .trending import refresh_trend_scores
+
+User = get_user_model()
+
+
+class TrendingProductsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        seller = SellerProfile.objects.create(user=self.user, store_name='Test Store')
+        category = Category.objects.create(name='Toys')
+        self.kite, self.yoyo, self.puzzle = [
+            Product.objects.create(
+                title=title, description=title, price='5.00', stock=1,
+                category=category, seller=seller
+            )
+            for title in ('Kite', 'Yoyo', 'Puzzle')
+        ]
+        self.now = timezone.now()
+
+    def record(self, product, activity_type, hours_ago):
+        activity = UserActivity.objects.create(user=self.user, activity_type=activity_type, product=product)
+        UserActivity.objects.filter(pk=activity.pk).update(
+            timestamp=self.now - datetime.timedelta(hours=hours_ago)
+        )
+
+    def test_scores_decay_with_age(self):
+        """Test one fresh event outweighs several stale ones"""
+        self.record(self.kite, 'view_product', 0)
+        self.record(self.kite, 'add_to_cart', 24)
+        for _ in range(3):
+            self.record(self.yoyo, 'view_product', 72)
+        self.record(self.puzzle, 'view_product', 24 * 30)
+        self.record(self.puzzle, 'login', 0)
+
+        self.assertEqual(refresh_trend_scores(now=self.now, half_life_hours=24, chunk_size=2), 2)
+        scores = dict(ProductTrendScore.objects.values_list('product_id', 'score'))
+        self.assertAlmostEqual(scores[self.kite.id], 1.0 + 3.0 / 2)
+        self.assertAlmostEqual(scores[self.yoyo.id], 3 / 8)
+        self.assertEqual(ProductTrendScore.objects.get(product=self.kite).event_count, 2)
+
+    def test_endpoint_reads_scores_in_one_query(self):
+        """Test the trending list is a single indexed read"""
+        self.record(self.yoyo, 'view_product', 0)
+        self.record(self.kite, 'add_to_cart', 0)
+        refresh_trend_scores(now=self.now)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/analytics/trending/', {'limit': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data['data']], [self.kite.id, self.yoyo.id])
+        self.assertAlmostEqual(response.data['data'][0]['trend_score'], 3.0, places=3)
+
+
+class RelatedProductsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        seller = SellerProfile.objects.create(user=self.user, store_name='Test Store')
+        category = Category.objects.create(name='Coffee')
+        self.beans, self.grinder, self.filters, self.mug = [
+            Product.objects.create(
+                title=title, description=title, price='5.00', stock=10,
+                category=category, seller=seller
+            )
+            for title in ('Beans', 'Grinder', 'Filters', 'Mug')
+        ]
+
+    def order(self, *products, status='pending'):
+        order = Order.objects.create(user=self.user, total_price='10.00', status=status)
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        return order
+
+    def neighbours(self, product):
+        return list(
+            RelatedProduct.objects.filter(product=product).order_by('rank')
+            .values_list('related_id', 'co_purchase_count')
+        )
+
+    def test_neighbours_are_ranked_by_co_purchase_count(self):
+        """Test top-K lists count shared orders and skip cancelled ones"""
+        self.order(self.beans, self.grinder, self.filters)
+        self.order(self.beans, self.filters, self.filters)
+        self.order(self.beans, self.mug, status='cancelled')
+        rebuild_related_products(top_k=2)
+        self.assertEqual(self.neighbours(self.beans), [(self.filters.id, 2), (self.grinder.id, 1)])
+        self.assertEqual(self.neighbours(self.mug), [])
+
+        # Chunks never split an order, however small they are
+        rebuild_related_products(top_k=2, chunk_size=1)
+        self.assertEqual(self.neighbours(self.beans), [(self.filters.id, 2), (self.grinder.id, 1)])
+
+    def test_incremental_update_matches_full_rebuild(self):
+        """Test folding in new orders gives the same lists as rebuilding"""
+        self.order(self.beans, self.grinder)
+        self.order(self.filters, self.mug)
+        rebuild_related_products()
+        self.order(self.beans, self.mug)
+        self.order(self.beans, self.mug, self.filters)
+        self.assertEqual(update_related_products(), 3)
+        incremental = {p.id: self.neighbours(p) for p in (self.beans, self.grinder, self.filters, self.mug)}
+        rebuild_related_products()
+        rebuilt = {p.id: self.neighbours(p) for p in (self.beans, self.grinder, self.filters, self.mug)}
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(update_related_products(), 0)
+
+    def test_related_endpoint_is_a_single_lookup(self):
+        """Test /api/products/{id}/related/ reads the stored list in one query"""
+        self.order(self.beans, self.grinder, self.mug)
+        self.order(self.beans, self.grinder)
+        rebuild_related_products()
+        self.mug.is_active = False
+        self.mug.save()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/products/{self.beans.id}/related/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['product']['id'], item['co_purchase_count']) for item in response.data['data']],
+            [(self.grinder.id, 2)]
+        )
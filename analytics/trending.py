@@ -0,0 +1,106 @@
+import datetime
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ProductTrendScore, UserActivity
+
+# Contribution of one event of each type before decay
+EVENT_WEIGHTS = {
+    'view_product': 1.0,
+    'add_to_cart': 3.0,
+}
+# Scores below this are not stored
+MIN_SCORE = 1e-3
+DEFAULT_CHUNK_SIZE = 100_000
+
+
+def _chunk_scores(product_ids, weights, timestamps, now, half_life):
+    """
+    Decay one chunk of events and sum it per product.
+    Returns (unique product ids, decayed sums, event counts).
+    """
+    ages = now - timestamps
+    decayed = weights * np.exp2(-ages / half_life)
+    products, inverse = np.unique(product_ids, return_inverse=True)
+    return (
+        products,
+        np.bincount(inverse, weights=decayed),
+        np.bincount(inverse),
+    )
+
+
+def _merge(parts):
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64)
+    product_ids = np.concatenate([part[0] for part in parts])
+    products, inverse = np.unique(product_ids, return_inverse=True)
+    scores = np.bincount(inverse, weights=np.concatenate([part[1] for part in parts]))
+    counts = np.bincount(inverse, weights=np.concatenate([part[2] for part in parts])).astype(np.int64)
+    return products, scores, counts
+
+
+def compute_trend_scores(now=None, half_life_hours=None, window_days=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Score every product as sum(weight * 2 ** (-age / half_life)) over its
+    recent view/add-to-cart events.
+
+    Events are streamed from the database in chunks into NumPy arrays; each
+    chunk is decayed and reduced per product with bincount, and the partial
+    sums are merged the same way, so memory is bounded by the chunk size
+    plus the number of products with activity.
+    Returns (product ids, scores, event counts) arrays.
+    """
+    now = now or timezone.now()
+    half_life_hours = half_life_hours or getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 24)
+    window_days = window_days or getattr(settings, 'TRENDING_WINDOW_DAYS', 14)
+    half_life = half_life_hours * 3600.0
+    cutoff = now - datetime.timedelta(days=window_days)
+    type_codes = {activity_type: code for code, activity_type in enumerate(EVENT_WEIGHTS)}
+    weight_table = np.array(list(EVENT_WEIGHTS.values()))
+
+    events = (
+        UserActivity.objects
+        .filter(activity_type__in=list(EVENT_WEIGHTS), product__isnull=False, timestamp__gte=cutoff)
+        .order_by()
+        .values_list('product_id', 'activity_type', 'timestamp')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    parts = []
+    now_seconds = now.timestamp()
+    while True:
+        rows = list(islice(events, chunk_size))
+        if not rows:
+            break
+        product_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        codes = np.fromiter((type_codes[row[1]] for row in rows), dtype=np.int64, count=len(rows))
+        timestamps = np.fromiter((row[2].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+        parts.append(_chunk_scores(product_ids, weight_table[codes], timestamps, now_seconds, half_life))
+        # Keep the number of partial results small
+        if len(parts) >= 16:
+            parts = [_merge(parts)]
+
+    return _merge(parts)
+
+
+def refresh_trend_scores(now=None, half_life_hours=None, window_days=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE, batch_size=1000):
+    """
+    Recompute and atomically replace the ProductTrendScore table.
+    Returns the number of products scored.
+    """
+    now = now or timezone.now()
+    products, scores, counts = compute_trend_scores(now, half_life_hours, window_days, chunk_size)
+    keep = scores >= MIN_SCORE
+    rows = [
+        ProductTrendScore(product_id=int(product_id), score=float(score), event_count=int(count), computed_at=now)
+        for product_id, score, count in zip(products[keep], scores[keep], counts[keep])
+    ]
+    with transaction.atomic():
+        ProductTrendScore.objects.all().delete()
+        ProductTrendScore.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
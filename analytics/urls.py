@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import TrendingProductListView
+
+urlpatterns = [
+    path('trending/', TrendingProductListView.as_view(), name='trending-products'),
+]
@@ -1,3 +1,63 @@
-from django.shortcuts import render
+from rest_framework import generics
+from rest_framework.response import Response
+from rest_framework.permissions import AllowAny
+from products.models import Product
+from api.prefetch import PlannedQuerysetMixin
+from .models import RelatedProduct
+from .serializers import TrendingProductSerializer, RelatedProductSerializer
 
-# Create your views here.
+TRENDING_DEFAULT_LIMIT = 20
+TRENDING_MAX_LIMIT = 100
+
+
+class TrendingProductListView(PlannedQuerysetMixin, generics.ListAPIView):
+    """
+    Top active products by their precomputed trend score (`?limit=`, max
+    100). Reads the score index; scores are refreshed by compute_trending.
+    """
+    serializer_class = TrendingProductSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    
+    def get_queryset(self):
+        return Product.objects.filter(is_active=True, trend_score__isnull=False).order_by('-trend_score__score')
+    
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', TRENDING_DEFAULT_LIMIT))
+        except ValueError:
+            limit = TRENDING_DEFAULT_LIMIT
+        return max(1, min(limit, TRENDING_MAX_LIMIT))
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())[:self.get_limit()]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response({
+            'success': True,
+            'data': serializer.data,
+            'error': None
+        })
+
+
+class RelatedProductListView(PlannedQuerysetMixin, generics.ListAPIView):
+    """
+    "Frequently bought together" products for a product: its stored top-K
+    co-purchase neighbours, read with a single indexed query.
+    """
+    serializer_class = RelatedProductSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    
+    def get_queryset(self):
+        return RelatedProduct.objects.filter(
+            product_id=self.kwargs['pk'], related__is_active=True
+        ).order_by('rank')
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer(queryset, many=True)
+        return Response({
+            'success': True,
+            'data': serializer.data,
+            'error': None
+        })
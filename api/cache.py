@@ -0,0 +1,109 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'catalog:version'
+STATS_KEYS = {
+    'hits': 'catalog:stats:hits',
+    'misses': 'catalog:stats:misses',
+}
+
+
+def _increment(key, initial):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Missing key: add() wins the race for exactly one writer
+        if cache.add(key, initial, timeout=None):
+            return initial
+        return cache.incr(key)
+
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_backend_is_shared(alias='default'):
+    """
+    Whether the `alias` cache is one store for every process, management
+    commands included, rather than a per-process LocMem (or dummy) cache.
+    """
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', PROCESS_LOCAL_BACKENDS[0])
+    return backend not in PROCESS_LOCAL_BACKENDS
+
+
+def cache_is_shared():
+    """
+    Whether every worker sees the same default cache. A version bump made
+    in one process invalidates the others only then, so catalog caching is
+    off on a per-process backend unless CATALOG_CACHE_SINGLE_PROCESS is set.
+    """
+    if getattr(settings, 'CATALOG_CACHE_SINGLE_PROCESS', False):
+        return True
+    return cache_backend_is_shared()
+
+
+def catalog_version():
+    """
+    Return the current catalog version. When the counter is missing (cold
+    or evicted cache) it restarts from the clock so responses cached under
+    an earlier version are never served again.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached catalog response in O(1).
+    """
+    return _increment(CATALOG_VERSION_KEY, int(time.time() * 1000))
+
+
+def cache_stats():
+    stats = cache.get_many(STATS_KEYS.values())
+    return {name: stats.get(key, 0) for name, key in STATS_KEYS.items()}
+
+
+def listing_cache_key(request, namespace):
+    params = sorted(
+        (name, sorted(value for value in values if value != ''))
+        for name, values in request.query_params.lists()
+    )
+    raw = f'{request.get_host()}|{request.path}|{params}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'catalog:{namespace}:{catalog_version()}:{digest}'
+
+
+class CatalogCacheMixin:
+    """
+    Cache list responses for anonymous users, keyed by the normalized query
+    string and the catalog version. Catalog signals bump the version, so no
+    key ever has to be deleted. Disabled unless cache_is_shared().
+    """
+    catalog_cache_namespace = None
+
+    def get(self, request, *args, **kwargs):
+        if (request.user and request.user.is_authenticated) or not cache_is_shared():
+            return super().get(request, *args, **kwargs)
+
+        namespace = self.catalog_cache_namespace or self.__class__.__name__
+        key = listing_cache_key(request, namespace)
+        data = cache.get(key)
+        if data is not None:
+            _increment(STATS_KEYS['hits'], 1)
+            return Response(data)
+
+        _increment(STATS_KEYS['misses'], 1)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300))
+        return response
@@ -0,0 +1,42 @@
+import datetime
+import hashlib
+
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+
+def _row(model, fields, request, pk):
+    # etag_func and last_modified_func are called separately; share one query
+    cache = request.__dict__.setdefault('_conditional_rows', {})
+    key = (model, pk)
+    if key not in cache:
+        cache[key] = model._default_manager.filter(pk=pk).values_list(*fields).first()
+    return cache[key]
+
+
+def conditional_object(model, fields):
+    """
+    Class decorator for detail views: computes ETag and Last-Modified from
+    `fields` of the requested row with a single lightweight query, before
+    the view (and its serializer) runs.
+
+    If-None-Match / If-Modified-Since short-circuit GET and HEAD to 304, and
+    If-Match / If-Unmodified-Since on writes answer 412 when stale.
+    `fields` should include every column the representation depends on
+    that is not reflected in the row's own updated_at.
+    """
+    def etag(request, pk=None, **kwargs):
+        row = _row(model, fields, request, pk)
+        if row is None:
+            return None
+        digest = hashlib.md5(repr(row).encode('utf-8')).hexdigest()
+        return f'"{model._meta.model_name}-{pk}-{digest}"'
+
+    def last_modified(request, pk=None, **kwargs):
+        row = _row(model, fields, request, pk)
+        if row is None:
+            return None
+        stamps = [value for value in row if isinstance(value, datetime.datetime)]
+        return max(stamps) if stamps else None
+
+    return method_decorator(condition(etag_func=etag, last_modified_func=last_modified), name='dispatch')
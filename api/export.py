@@ -0,0 +1,109 @@
+import csv
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from orders.models import Order
+from products.models import Category, Product
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+# Rows fetched per database round trip and written per response chunk
+EXPORT_CHUNK_SIZE = 2000
+
+# resource -> (model, {column: same-named field or expression})
+EXPORTS = {
+    'products': (Product, {
+        'id': 'id',
+        'title': 'title',
+        'description': 'description',
+        'price': 'price',
+        'stock': 'stock',
+        'category_id': 'category_id',
+        'category_name': F('category__name'),
+        'seller_id': 'seller_id',
+        'seller_name': F('seller__store_name'),
+        'image_url': 'image_url',
+        'is_active': 'is_active',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }),
+    'categories': (Category, {
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'product_count': 'product_count',
+        'active_product_count': 'active_product_count',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }),
+    'orders': (Order, {
+        'id': 'id',
+        'user_id': 'user_id',
+        'status': 'status',
+        'total_price': 'total_price',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+        'shipped_at': 'shipped_at',
+        'delivered_at': 'delivered_at',
+    }),
+}
+
+
+def export_rows(resource, updated_since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Return (columns, iterator of row dicts) for an export resource, read
+    with a chunked cursor so memory does not grow with the table.
+    """
+    model, spec = EXPORTS[resource]
+    fields = [column for column, source in spec.items() if isinstance(source, str)]
+    expressions = {column: source for column, source in spec.items() if column not in fields}
+    queryset = model._default_manager.order_by('pk')
+    if updated_since is not None:
+        queryset = queryset.filter(updated_at__gte=updated_since)
+    rows = queryset.values(*fields, **expressions).iterator(chunk_size=chunk_size)
+    return list(spec), rows
+
+
+class _Echo:
+    # File-like object for csv.writer that hands each line back instead of buffering it
+    def write(self, value):
+        return value
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_ndjson(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = DjangoJSONEncoder()
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(
+            encoder.encode({column: row[column] for column in columns}) + '\n'
+            for row in chunk
+        )
+
+
+def stream_csv(columns, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(columns)
+    for chunk in _chunks(rows, chunk_size):
+        yield ''.join(writer.writerow([row[column] for column in columns]) for row in chunk)
+
+
+def stream_export(resource, fmt, updated_since=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield the export of `resource` as NDJSON or CSV text chunks.
+    """
+    columns, rows = export_rows(resource, updated_since, chunk_size)
+    if fmt == 'csv':
+        return stream_csv(columns, rows, chunk_size)
+    return stream_ndjson(columns, rows, chunk_size)
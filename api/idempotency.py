@@ -0,0 +1,102 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def key_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 3600))
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f'{request.method}|{request.path}|{body}'.encode('utf-8')).hexdigest()
+
+
+def _error(message, status_code):
+    return Response({
+        'success': False,
+        'data': None,
+        'error': message
+    }, status=status_code)
+
+
+def _replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return _error(f'This {IDEMPOTENCY_HEADER} was used for a different request', status.HTTP_422_UNPROCESSABLE_ENTITY)
+    return Response(record.response, status=record.status_code, headers={REPLAYED_HEADER: 'true'})
+
+
+def idempotent_response(request, handler):
+    """
+    Run `handler()` (returning a Response) at most once per Idempotency-Key
+    header and user. The first response below 500 is stored for
+    IDEMPOTENCY_KEY_TTL seconds together with the write, in one
+    transaction; a retry replays it with an `Idempotent-Replayed: true`
+    header, without validating or writing anything. Requests without the
+    header, or from anonymous users, just run `handler()`.
+
+    The key row is inserted in the handler's transaction, so it is only
+    ever visible with its response. A concurrent request with the same key
+    waits on that insert until the first one commits (and replays it) or
+    rolls back (and runs itself); there is no in-progress state to time
+    out while the first request is still running.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key or not request.user.is_authenticated:
+        return handler()
+    if len(key) > IdempotencyKey._meta.get_field('key').max_length:
+        return _error(f'{IDEMPOTENCY_HEADER} must be at most 255 characters', status.HTTP_400_BAD_REQUEST)
+
+    fingerprint = _fingerprint(request)
+    now = timezone.now()
+    # Replays are answered by this single lookup
+    record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+    if record is not None:
+        if record.expires_at > now:
+            return _replay(record, fingerprint)
+        IdempotencyKey.objects.filter(pk=record.pk, expires_at=record.expires_at).delete()
+
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=request.user, key=key, fingerprint=fingerprint, expires_at=now + key_ttl()
+                )
+        except IntegrityError:
+            # A concurrent request with the same key committed first
+            record = IdempotencyKey.objects.filter(user=request.user, key=key).first()
+            if record is None:
+                return _error(f'A request with this {IDEMPOTENCY_HEADER} is in progress', status.HTTP_409_CONFLICT)
+            return _replay(record, fingerprint)
+
+        response = handler()
+        if response.status_code < 500:
+            IdempotencyKey.objects.filter(pk=record.pk).update(
+                status_code=response.status_code, response=response.data
+            )
+        else:
+            # Keep 5xx answers retryable with the same key
+            record.delete()
+    return response
+
+
+class IdempotentCreateMixin:
+    """
+    Create-view mixin making POST honour the Idempotency-Key header; the
+    view's own create() runs only for the first request with a key.
+    """
+
+    def post(self, request, *args, **kwargs):
+        return idempotent_response(request, lambda: super(IdempotentCreateMixin, self).post(request, *args, **kwargs))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from api.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete expired idempotency keys'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(IdempotencyKey.objects.filter(expires_at__lte=now)
+                       .values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            count, _ = IdempotencyKey.objects.filter(pk__in=ids).delete()
+            deleted += count
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
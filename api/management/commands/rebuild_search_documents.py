@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import SearchDocument
+from api import search
+from products.models import Category, Product
+from sellers.models import SellerProfile
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the global search documents for products, categories and sellers'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            SearchDocument.objects.all().delete()
+            counts = {'product': 0, 'category': 0, 'seller': 0}
+            for product in Product.objects.filter(is_active=True).iterator(chunk_size=1000):
+                search.index_product(product)
+                counts['product'] += 1
+            for category in Category.objects.iterator(chunk_size=1000):
+                search.index_category(category)
+                counts['category'] += 1
+            for seller in SellerProfile.objects.iterator(chunk_size=1000):
+                search.index_seller(seller)
+                counts['seller'] += 1
+        self.stdout.write(self.style.SUCCESS(
+            'Indexed {product} products, {category} categories and {seller} sellers'.format(**counts)
+        ))
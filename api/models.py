@@ -1,3 +1,65 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
-# Create your models here.
+
+class SearchDocument(models.Model):
+    """
+    Denormalized search entry for a product, category or seller store.
+    Maintained by api.signals so a global search is a single indexed query.
+    """
+    KIND_CHOICES = (
+        ('product', 'Product'),
+        ('category', 'Category'),
+        ('seller', 'Seller'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)
+    snippet = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}: {self.title}"
+
+
+class SearchDocumentToken(models.Model):
+    document = models.ForeignKey('api.SearchDocument', on_delete=models.CASCADE, related_name='tokens')
+    token = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('document', 'token')
+        indexes = [
+            models.Index(fields=['token', 'document'], name='api_search_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.document_id} ({self.weight})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    First response to a write sent with an `Idempotency-Key` header, so a
+    retry gets the same answer without running the write again. The row is
+    inserted in the write's own transaction and holds its unique key until
+    that commits, so other requests only ever see it with its response.
+    Expired rows are ignored and deleted by `manage.py purge_idempotency_keys`.
+    """
+    user = models.ForeignKey('accounts.User', on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    # sha256 of method, path and body: a key may not be reused for another request
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.key} ({self.user_id}) -> {self.status_code}"
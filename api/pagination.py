@@ -1,4 +1,4 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.response import Response
 
 class CustomPageNumberPagination(PageNumberPagination):
@@ -20,4 +20,59 @@ class CustomPageNumberPagination(PageNumberPagination):
                 }
             },
             'error': None
-        })
\ No newline at end of file
+        })
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (created_at, id), or on the field requested through
+    `?ordering=` when the view uses OrderingFilter. Search results without
+    an explicit ordering stay in relevance order, keyed on search_rank.
+    Pages are addressed by opaque cursors and no COUNT query is issued.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    
+    def get_ordering(self, request, queryset, view):
+        if queryset.query.order_by[:1] == ('-search_rank',):
+            # Ranked search results that no ?ordering= has reordered
+            ordering = ('-search_rank',) + self.ordering
+        else:
+            ordering = super().get_ordering(request, queryset, view)
+        if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+            # Rows tied on the cursor field are paged by offset; keep that stable
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'success': True,
+            'data': {
+                'results': data,
+                'pagination': {
+                    'next': self.get_next_link(),
+                    'previous': self.get_previous_link(),
+                }
+            },
+            'error': None
+        })
+
+class KeysetPaginationMixin:
+    """
+    Lets list views switch to cursor pagination per request with
+    `?pagination=cursor`. Next/previous links keep the parameter.
+    """
+    keyset_pagination_class = CustomCursorPagination
+    keyset_pagination_param = 'pagination'
+    
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.request.query_params.get(self.keyset_pagination_param) == 'cursor':
+                self._paginator = self.keyset_pagination_class()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
@@ -0,0 +1,212 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.pagination import CursorPagination
+
+from .sparse import requested_selection
+
+
+def _serializer_fields(serializer):
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    return serializer.fields.values()
+
+
+def _nested(field):
+    """
+    Return the serializer a field renders related objects with, if any.
+    """
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def _prefixed(prefix, lookup):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(f'{prefix}__{lookup.prefetch_to}', queryset=lookup.queryset)
+    return f'{prefix}__{lookup}'
+
+
+def plan_relations(serializer, model, columns=False):
+    """
+    Inspect a serializer's fields and return the (select_related,
+    prefetch_related) lookups needed to render `model` instances without
+    per-row queries.
+
+    Dotted `source` paths through forward foreign keys become
+    select_related joins; nested serializers over to-many relations become
+    Prefetch objects whose querysets are planned recursively.
+    SerializerMethodFields and properties cannot be inspected and are
+    skipped. With `columns`, prefetch querysets are narrowed as well (see
+    plan_queryset).
+    """
+    select = set()
+    prefetch = []
+
+    for field in _serializer_fields(serializer):
+        if field.write_only or field.source == '*':
+            continue
+
+        nested = _nested(field)
+        attrs = field.source.split('.')
+        current = model
+        path = []
+        for position, attr in enumerate(attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation:
+                break
+
+            path.append(attr)
+            lookup = '__'.join(path)
+            is_last = position == len(attrs) - 1
+            related_model = model_field.related_model
+
+            if model_field.many_to_many or model_field.one_to_many:
+                if nested is not None and is_last:
+                    # The reverse foreign key is needed to attach prefetched rows
+                    required = (model_field.field.name,) if model_field.one_to_many else ()
+                    prefetch.append(Prefetch(
+                        lookup,
+                        queryset=plan_queryset(
+                            related_model._default_manager.all(), nested, columns, required
+                        ),
+                    ))
+                else:
+                    prefetch.append(lookup)
+                break
+
+            if not is_last:
+                select.add(lookup)
+                current = related_model
+                continue
+
+            if nested is not None:
+                select.add(lookup)
+                child_select, child_prefetch = plan_relations(nested, related_model)
+                select.update(f'{lookup}__{child}' for child in child_select)
+                prefetch.extend(_prefixed(lookup, child) for child in child_prefetch)
+
+    return select, prefetch
+
+
+def plan_columns(serializer, model):
+    """
+    Return the `.only()` lookups covering every column `serializer` reads
+    from `model` instances (and their select_related rows), or None when a
+    field reads something that cannot be traced to a column.
+
+    SerializerMethodFields and properties are opaque unless the serializer
+    declares what they read in `Meta.field_sources` ({field: lookups}).
+    A nested serializer that cannot be traced keeps its related row whole.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    sources = getattr(getattr(serializer, 'Meta', None), 'field_sources', {})
+
+    columns = set()
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in sources:
+            columns.update(sources[name])
+            continue
+        if field.source == '*':
+            return None
+
+        nested = _nested(field)
+        attrs = field.source.split('.')
+        current = model
+        path = []
+        for position, attr in enumerate(attrs):
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                return None
+            if model_field.many_to_many or model_field.one_to_many:
+                # Prefetched with its own queryset
+                break
+            if not model_field.concrete:
+                return None
+
+            path.append(attr)
+            lookup = '__'.join(path)
+            columns.add(lookup)
+            if not model_field.is_relation:
+                break
+            if position == len(attrs) - 1:
+                if nested is not None:
+                    child = plan_columns(nested, model_field.related_model)
+                    if child is not None:
+                        columns.update(f'{lookup}__{column}' for column in child)
+                break
+            current = model_field.related_model
+
+    return sorted(columns)
+
+
+def plan_queryset(queryset, serializer, columns=False, required=()):
+    """
+    Apply the select_related/prefetch_related plan for `serializer` to a
+    queryset. With `columns`, also restrict the fetched columns to the
+    ones the serializer reads (plus `required` lookups) with `.only()`;
+    meant for serializers narrowed by a sparse fieldset.
+    """
+    select, prefetch = plan_relations(serializer, queryset.model, columns)
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if columns:
+        only = plan_columns(serializer, queryset.model)
+        if only is not None:
+            queryset = queryset.only(*only, *required)
+    return queryset
+
+
+class PlannedQuerysetMixin:
+    """
+    Generic view mixin that plans joins and prefetches from the view's
+    serializer, so list and detail responses use a constant number of
+    queries regardless of row count.
+
+    Under `?fields=` / `?omit=` the plan follows the narrowed serializer and
+    only the columns it renders are fetched.
+    """
+
+    def _ordering_columns(self, queryset):
+        # Cursor pagination reads the ordering fields back from the rows
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if isinstance(self.paginator, CursorPagination):
+            paginator_ordering = self.paginator.ordering
+            ordering += [paginator_ordering] if isinstance(paginator_ordering, str) else list(paginator_ordering)
+        columns = set()
+        for name in ordering:
+            if not isinstance(name, str):
+                continue
+            try:
+                field = queryset.model._meta.get_field(name.lstrip('-'))
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                columns.add(field.name)
+        return sorted(columns)
+
+    def plan_queryset(self, queryset):
+        if requested_selection(self.request) is None:
+            return plan_queryset(queryset, self.get_serializer_class())
+        return plan_queryset(
+            queryset, self.get_serializer(), columns=True, required=self._ordering_columns(queryset)
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.plan_queryset(queryset)
@@ -0,0 +1,109 @@
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from products.search import (
+    tokenize, build_tokens, weigh_text, token_prefix_q
+)
+from .models import SearchDocument, SearchDocumentToken
+
+SNIPPET_LENGTH = SearchDocument._meta.get_field('snippet').max_length
+
+
+def _snippet(text):
+    return (text or '')[:SNIPPET_LENGTH]
+
+
+def index_document(kind, object_id, title, snippet, weights):
+    """
+    Create or replace the search document for one object.
+    """
+    document, created = SearchDocument.objects.update_or_create(
+        kind=kind,
+        object_id=object_id,
+        defaults={'title': title[:200], 'snippet': _snippet(snippet)}
+    )
+    if not created:
+        document.tokens.all().delete()
+    SearchDocumentToken.objects.bulk_create([
+        SearchDocumentToken(document=document, token=token, weight=weight)
+        for token, weight in weights.items()
+    ])
+    return document
+
+
+def remove_document(kind, object_id):
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def index_product(product):
+    if not product.is_active:
+        remove_document('product', product.pk)
+        return None
+    return index_document('product', product.pk, product.title, product.description, build_tokens(product))
+
+
+def index_new_products(products):
+    """
+    Bulk-create documents for products that have none yet, e.g. right
+    after Product.objects.bulk_create().
+    """
+    products = [product for product in products if product.is_active]
+    documents = SearchDocument.objects.bulk_create([
+        SearchDocument(
+            kind='product', object_id=product.pk,
+            title=product.title[:200], snippet=_snippet(product.description)
+        )
+        for product in products
+    ])
+    SearchDocumentToken.objects.bulk_create([
+        SearchDocumentToken(document=document, token=token, weight=weight)
+        for document, product in zip(documents, products)
+        for token, weight in build_tokens(product).items()
+    ])
+
+
+def index_category(category):
+    return index_document(
+        'category', category.pk, category.name, category.description,
+        weigh_text(category.name, category.description)
+    )
+
+
+def index_seller(seller):
+    return index_document(
+        'seller', seller.pk, seller.store_name, seller.description,
+        weigh_text(seller.store_name, seller.description)
+    )
+
+
+def search_documents(query, kinds=None):
+    """
+    Return search documents matching every query term (prefix match),
+    ordered by summed token weight.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return SearchDocument.objects.none()
+
+    queryset = SearchDocument.objects.all()
+    if kinds:
+        queryset = queryset.filter(kind__in=kinds)
+
+    any_term = Q()
+    for term in terms:
+        term_q = token_prefix_q(term)
+        queryset = queryset.filter(
+            pk__in=SearchDocumentToken.objects.filter(term_q).values('document_id')
+        )
+        any_term |= term_q
+
+    rank = (
+        SearchDocumentToken.objects
+        .filter(any_term, document=OuterRef('pk'))
+        .values('document')
+        .annotate(total=Sum('weight'))
+        .values('total')
+    )
+    return queryset.annotate(
+        search_rank=Coalesce(Subquery(rank), 0)
+    ).order_by('-search_rank', 'kind', 'object_id')
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .models import SearchDocument
 
 
 class EndpointSerializer(serializers.Serializer):
@@ -11,4 +12,13 @@ class EndpointSerializer(serializers.Serializer):
 class APISerializer(serializers.Serializer):
     message = serializers.CharField()
     description = serializers.CharField()
-    endpoints = serializers.DictField(child=EndpointSerializer(many=True))
\ No newline at end of file
+    endpoints = serializers.DictField(child=EndpointSerializer(many=True))
+
+class SearchDocumentSerializer(serializers.ModelSerializer):
+    type = serializers.CharField(source='kind', read_only=True)
+    id = serializers.IntegerField(source='object_id', read_only=True)
+    score = serializers.IntegerField(source='search_rank', read_only=True)
+
+    class Meta:
+        model = SearchDocument
+        fields = ('type', 'id', 'title', 'snippet', 'score')
@@ -0,0 +1,69 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from products.models import Category, Product
+from products.signals import changed_fields, products_bulk_created, products_bulk_updated
+from sellers.models import SellerProfile
+from reviews.models import Review
+from . import search
+from .cache import bump_catalog_version
+
+
+@receiver(post_save, sender=Product)
+def index_product_document(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    changed = changed_fields(instance)
+    if changed is not None and not changed:
+        return
+    search.index_product(instance)
+
+
+@receiver(products_bulk_created)
+def index_bulk_created_documents(sender, products, **kwargs):
+    search.index_new_products(products)
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Category)
+def index_category_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_category(instance)
+
+
+@receiver(post_save, sender=SellerProfile)
+def index_seller_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_seller(instance)
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_document(sender, instance, **kwargs):
+    search.remove_document('product', instance.pk)
+
+
+@receiver(post_delete, sender=Category)
+def remove_category_document(sender, instance, **kwargs):
+    search.remove_document('category', instance.pk)
+
+
+@receiver(post_delete, sender=SellerProfile)
+def remove_seller_document(sender, instance, **kwargs):
+    search.remove_document('seller', instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=SellerProfile)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=SellerProfile)
+@receiver(post_delete, sender=Review)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(products_bulk_updated)
+def invalidate_catalog_cache_after_bulk_update(sender, **kwargs):
+    bump_catalog_version()
@@ -0,0 +1,79 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_field_paths(value):
+    """
+    Parse a comma-separated list of (possibly dotted) field names into a
+    tree: {name: None} selects a whole field, {name: {...}} a subset of a
+    nested serializer's fields. `items,items.product.title` selects all of
+    `items`; a whole field always wins over a subset.
+    """
+    tree = {}
+    for path in value.split(','):
+        names = [name.strip() for name in path.split('.')]
+        if not all(names):
+            continue
+        node = tree
+        for position, name in enumerate(names):
+            if position == len(names) - 1:
+                node[name] = None
+                break
+            if name in node and node[name] is None:
+                break
+            node = node.setdefault(name, {})
+    return tree
+
+
+def requested_selection(request):
+    """
+    Return the (fields, omit) trees requested with `?fields=` / `?omit=`,
+    or None when neither is given. Only read requests are narrowed so a
+    write never silently drops input fields.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    fields = request.query_params.get(FIELDS_PARAM)
+    omit = request.query_params.get(OMIT_PARAM)
+    if not fields and not omit:
+        return None
+    return (parse_field_paths(fields) if fields else None), parse_field_paths(omit or '')
+
+
+class SparseFieldsetMixin:
+    """
+    ModelSerializer mixin for sparse fieldsets. The top-level serializer
+    reads `?fields=` / `?omit=` from the request; dotted names reach nested
+    serializers that use the mixin too (`?omit=items.product.description`).
+    Unknown names are ignored.
+    """
+
+    def _is_root(self):
+        root = self.root
+        return root is self or (isinstance(root, serializers.ListSerializer) and root.child is self)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = getattr(self, '_sparse_selection', None)
+        if selection is None and self._is_root():
+            selection = requested_selection(self.context.get('request'))
+        if selection is None:
+            return fields
+
+        only, omit = selection
+        narrowed = {}
+        for name, field in fields.items():
+            if only is not None and name not in only:
+                continue
+            if name in omit and omit[name] is None:
+                continue
+            sub_only = only.get(name) if only is not None else None
+            sub_omit = omit.get(name) or {}
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if (sub_only is not None or sub_omit) and isinstance(nested, SparseFieldsetMixin):
+                nested._sparse_selection = (sub_only, sub_omit)
+            narrowed[name] = field
+        return narrowed
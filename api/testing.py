@@ -0,0 +1,16 @@
+class QueryCountAssertionsMixin:
+    """
+    TestCase mixin for locking in the query count of an endpoint.
+    """
+
+    def assertConstantQueries(self, num, request, grow):
+        """
+        Assert `request()` runs exactly `num` queries, and still does after
+        `grow()` has added more rows.
+        """
+        with self.assertNumQueries(num):
+            first = request()
+        grow()
+        with self.assertNumQueries(num):
+            second = request()
+        return first, second
@@ -1,8 +1,27 @@
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
 from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
+from sellers.models import SellerProfile
+from products.models import Category, Product
+from orders.models import Order, OrderItem
+from cart.models import Cart, CartItem
+from wishlist.models import Wishlist
+from reviews.models import Review
+from payments.models import Payout
+from .models import IdempotencyKey, SearchDocument
+from .testing import QueryCountAssertionsMixin
 
 User = get_user_model()
 
@@ -84,4 +103,380 @@ class JWTAuthenticationTestCase(APITestCase):
         }
         response = self.client.post('/api/token/refresh/', refresh_data, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue('access' in response.data)
\ No newline at end of file
+        self.assertTrue('access' in response.data)
+
+
+class GlobalSearchTestCase(APITestCase):
+    def setUp(self):
+        seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Garden Gnome Depot')
+        self.category = Category.objects.create(name='Garden Tools')
+        self.product = Product.objects.create(
+            title='Garden Hose', description='Twenty metres of hose', price='19.99',
+            stock=3, category=self.category, seller=self.seller
+        )
+
+    def search(self, **params):
+        response = self.client.get('/api/search/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item['type'], item['id']) for item in response.data['data']['results']['data']]
+
+    def test_search_spans_products_categories_and_sellers(self):
+        """Test one query returns every matching entity type"""
+        results = self.search(q='garden')
+        self.assertCountEqual(results, [
+            ('product', self.product.id),
+            ('category', self.category.id),
+            ('seller', self.seller.id),
+        ])
+        self.assertEqual(self.search(q='garden', type='seller'), [('seller', self.seller.id)])
+
+    def test_documents_follow_model_changes(self):
+        """Test documents are updated and removed by signals"""
+        self.seller.store_name = 'Hose Heaven'
+        self.seller.save()
+        self.assertCountEqual(self.search(q='hose'), [
+            ('product', self.product.id),
+            ('seller', self.seller.id),
+        ])
+
+        self.product.is_active = False
+        self.product.save()
+        self.assertEqual(self.search(q='hose'), [('seller', self.seller.id)])
+
+        self.category.delete()
+        self.assertFalse(SearchDocument.objects.filter(kind='category').exists())
+
+    def test_missing_query_is_rejected(self):
+        """Test the q parameter is required"""
+        response = self.client.get('/api/search/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        category = Category.objects.create(name='Books')
+        self.products = [
+            Product.objects.create(
+                title=f'Book {i}', description='Paperback', price=f'{10 + i}.00',
+                stock=1, category=category, seller=seller
+            )
+            for i in range(5)
+        ]
+
+    def test_cursor_pages_walk_the_whole_list_without_counting(self):
+        """Test ?pagination=cursor returns opaque cursors and skips COUNT(*)"""
+        seen = []
+        url = '/api/products/?pagination=cursor&page_size=2'
+        with CaptureQueriesContext(connection) as queries:
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                pagination = response.data['data']['pagination']
+                self.assertNotIn('count', pagination)
+                seen.extend(item['id'] for item in response.data['data']['results']['data'])
+                url = pagination['next']
+        self.assertEqual(seen, [p.id for p in reversed(self.products)])
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_cursor_pages_follow_active_ordering(self):
+        """Test the cursor is keyed on the ?ordering= field"""
+        response = self.client.get('/api/products/', {'pagination': 'cursor', 'ordering': 'price', 'page_size': 3})
+        ids = [item['id'] for item in response.data['data']['results']['data']]
+        self.assertEqual(ids, [p.id for p in self.products[:3]])
+        response = self.client.get(response.data['data']['pagination']['next'])
+        ids = [item['id'] for item in response.data['data']['results']['data']]
+        self.assertEqual(ids, [p.id for p in self.products[3:]])
+
+    def test_cursor_pages_break_ties_on_id(self):
+        """Test rows sharing the ?ordering= value are paged in id order"""
+        Product.objects.update(price='10.00')
+        seen = []
+        url = '/api/products/?pagination=cursor&ordering=price&page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(item['id'] for item in response.data['data']['results']['data'])
+            url = response.data['data']['pagination']['next']
+        self.assertEqual(seen, [p.id for p in self.products])
+
+    def test_cursor_pages_keep_search_relevance(self):
+        """Test ?search= results are in the same relevance order in both modes"""
+        category = self.products[0].category
+        seller = self.products[0].seller
+        kettle = Product.objects.create(
+            title='Kettle kettle kettle', description='Kettle', price='30.00', stock=1,
+            category=category, seller=seller
+        )
+        pot = Product.objects.create(
+            title='Steel pot', description='Not a kettle', price='20.00', stock=1,
+            category=category, seller=seller
+        )
+        response = self.client.get('/api/products/', {'search': 'kettle'})
+        self.assertEqual([item['id'] for item in response.data['data']['results']['data']], [kettle.id, pot.id])
+
+        seen = []
+        url = '/api/products/?pagination=cursor&search=kettle&page_size=1'
+        while url:
+            response = self.client.get(url)
+            seen.extend(item['id'] for item in response.data['data']['results']['data'])
+            url = response.data['data']['pagination']['next']
+        self.assertEqual(seen, [kettle.id, pot.id])
+
+
+class PlannedQueryCountTestCase(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            username='buyer',
+            email='buyer@test.com',
+            password='TestPass123!',
+            role='buyer'
+        )
+        self.seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=self.seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Toys')
+        self.cart = Cart.objects.create(user=self.buyer)
+        self.wishlist = Wishlist.objects.create(user=self.buyer)
+        self.order = Order.objects.create(user=self.buyer, total_price='0.00')
+        self.reviewed = Product.objects.create(
+            title='Reviewed Toy', description='Fun', price='5.00', stock=9,
+            category=self.category, seller=self.seller
+        )
+        self.add_rows()
+
+    def add_rows(self, count=2):
+        for _ in range(count):
+            product = Product.objects.create(
+                title='Toy', description='Fun', price='3.00', stock=9,
+                category=Category.objects.create(name=f'Toys {Category.objects.count()}'),
+                seller=self.seller
+            )
+            OrderItem.objects.create(order=self.order, product=product, quantity=1, price='3.00')
+            order = Order.objects.create(user=self.buyer, total_price='3.00')
+            OrderItem.objects.create(order=order, product=product, quantity=1, price='3.00')
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+            self.wishlist.products.add(product)
+            reviewer = User.objects.create_user(
+                username=f'reviewer{product.id}', email=f'reviewer{product.id}@test.com', password=None
+            )
+            Review.objects.create(user=reviewer, product=self.reviewed, rating=4)
+
+    def assertEndpointQueries(self, num, user, url):
+        self.client.force_authenticate(user)
+        self.assertConstantQueries(num, lambda: self.client.get(url), self.add_rows)
+
+    def test_product_list(self):
+        self.assertEndpointQueries(2, None, '/api/products/')
+
+    def test_order_list(self):
+        self.assertEndpointQueries(4, self.buyer, '/api/orders/')
+
+    def test_cart(self):
+        self.assertEndpointQueries(2, self.buyer, '/api/cart/')
+
+    def test_wishlist(self):
+        self.assertEndpointQueries(2, self.buyer, '/api/wishlist/')
+
+    def test_review_list(self):
+        self.assertEndpointQueries(2, self.buyer, f'/api/reviews/products/{self.reviewed.id}/')
+
+    def test_seller_product_and_order_lists(self):
+        self.assertEndpointQueries(3, self.seller_user, '/api/seller/products/')
+        self.assertEndpointQueries(5, self.seller_user, '/api/seller/orders/')
+
+
+class SparseFieldsetTestCase(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@test.com', password='TestPass123!', role='buyer'
+        )
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Toys')
+        self.cart = Cart.objects.create(user=self.buyer)
+        self.order = Order.objects.create(user=self.buyer, total_price='0.00')
+        self.add_rows()
+
+    def add_rows(self, count=2):
+        for _ in range(count):
+            product = Product.objects.create(
+                title='Toy', description='A long description', price='3.00', stock=9,
+                category=self.category, seller=self.seller
+            )
+            OrderItem.objects.create(order=self.order, product=product, quantity=1, price='3.00')
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+
+    def get(self, url, user=None):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, ' '.join(query['sql'] for query in queries.captured_queries)
+
+    def test_fields_narrow_the_response_and_the_query(self):
+        """Test ?fields= keeps only the listed fields and selects only their columns"""
+        response, sql = self.get('/api/products/?fields=id,title,price,image_url')
+        product = response.data['data']['results']['data'][0]
+        self.assertEqual(set(product), {'id', 'title', 'price', 'image_url'})
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('products_category', sql)
+
+    def test_omit_pushes_down_through_method_fields(self):
+        """Test ?omit= drops a field and its column while declared method fields still render"""
+        response, sql = self.get('/api/products/?omit=description')
+        product = response.data['data']['results']['data'][0]
+        self.assertNotIn('description', product)
+        self.assertIn('thumbnails', product)
+        self.assertEqual(product['category_name'], 'Toys')
+        self.assertNotIn('"description"', sql)
+
+    def test_nested_paths(self):
+        """Test dotted names narrow nested serializers with a constant number of queries"""
+        self.client.force_authenticate(self.buyer)
+        url = f'/api/orders/{self.order.id}/?fields=id,items.quantity,items.product.title'
+        first, second = self.assertConstantQueries(2, lambda: self.client.get(url), self.add_rows)
+        self.assertEqual(set(second.data['data']), {'id', 'items'})
+        self.assertEqual(second.data['data']['items'][0], {'quantity': 1, 'product': {'title': 'Toy'}})
+
+        response, sql = self.get('/api/cart/?omit=items.product.description', self.buyer)
+        item = response.data['data']['items'][0]
+        self.assertNotIn('description', item['product'])
+        self.assertEqual(item['total_price'], '6.00')
+
+class ExportTestCase(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@test.com', password='TestPass123!', role='admin'
+        )
+        seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Books')
+        self.products = [
+            Product.objects.create(
+                title=f'Book {i}', description='Paperback, "used"', price='5.00',
+                stock=1, category=self.category, seller=seller
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(self.admin)
+
+    def export(self, resource, **params):
+        response = self.client.get(f'/api/export/{resource}/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_ndjson_export_streams_every_row(self):
+        """Test the product export writes one JSON object per line"""
+        lines = [json.loads(line) for line in self.export('products').splitlines()]
+        self.assertEqual([row['id'] for row in lines], [p.id for p in self.products])
+        self.assertEqual((lines[0]['category_name'], lines[0]['seller_name']), ('Books', 'Test Store'))
+
+    def test_csv_export_with_updated_since(self):
+        """Test CSV output and incremental filtering"""
+        Product.objects.filter(pk=self.products[0].pk).update(updated_at='2020-01-01T00:00:00Z')
+        rows = list(csv.DictReader(self.export('products', fmt='csv', updated_since='2021-01-01').splitlines()))
+        self.assertEqual([int(row['id']) for row in rows], [p.id for p in self.products[1:]])
+        self.assertEqual(rows[0]['description'], 'Paperback, "used"')
+
+    def test_export_is_admin_only(self):
+        """Test non-admins cannot export"""
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/export/orders/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class IdempotencyKeyTestCase(APITestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@test.com', password='TestPass123!', role='buyer'
+        )
+        self.admin = User.objects.create_user(
+            username='admin', email='admin@test.com', password='TestPass123!', role='admin'
+        )
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+
+    def test_retried_order_is_created_once(self):
+        """Test a retry with the same key replays the first response without writing"""
+        self.client.force_authenticate(self.buyer)
+        first = self.client.post('/api/orders/', {'total_price': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        with self.assertNumQueries(1):
+            replay = self.client.post('/api/orders/', {'total_price': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(replay.data['data']['id'], first.data['data']['id'])
+        self.assertEqual(Order.objects.count(), 1)
+
+        # Same key with another body is rejected; keys are per user
+        response = self.client.post('/api/orders/', {'total_price': '12.00'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        other = User.objects.create_user(
+            username='other', email='other@test.com', password='TestPass123!', role='buyer'
+        )
+        self.client.force_authenticate(other)
+        self.client.post('/api/orders/', {'total_price': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_failed_request_frees_the_key(self):
+        """Test a request that raised is not stored, and payouts honour keys too"""
+        self.client.force_authenticate(self.admin)
+        data = {'seller': self.seller.id, 'amount': '25.00', 'transaction_id': 'tx-1'}
+        response = self.client.post('/api/payments/payouts/', {'seller': self.seller.id}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY='payout-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        for _ in range(2):
+            response = self.client.post('/api/payments/payouts/', data, format='json', HTTP_IDEMPOTENCY_KEY='payout-2')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Payout.objects.count(), 1)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_concurrent_retry_replays_the_committed_request(self):
+        """Test a retry that loses the key insert replays the winner instead of running or taking it over"""
+        self.client.force_authenticate(self.buyer)
+        first = self.client.post('/api/orders/', {'total_price': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        record = IdempotencyKey.objects.get()
+        # The retry's lookup runs before the first request commits
+        old = timezone.now() - timedelta(hours=1)
+        IdempotencyKey.objects.update(created_at=old)
+        lookup = mock.patch(
+            'api.idempotency.IdempotencyKey.objects.filter',
+            side_effect=[IdempotencyKey.objects.none(), IdempotencyKey.objects.filter(pk=record.pk)]
+        )
+        with lookup:
+            retry = self.client.post('/api/orders/', {'total_price': '10.00'}, format='json', HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.data['data']['id'], first.data['data']['id'])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().created_at, old)
@@ -7,7 +7,7 @@ from rest_framework_simplejwt.views import (
 )
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
-from .views import APIIndexViewSet
+from .views import APIIndexViewSet, GlobalSearchView, CatalogCacheStatsView, ExportView
 
 # Create router and register our viewset
 router = DefaultRouter()
@@ -64,4 +64,16 @@ urlpatterns = [
     
     # Seller endpoints
     path('seller/', include('sellers.urls')),
+    
+    # Analytics endpoints
+    path('analytics/', include('analytics.urls')),
+    
+    # Global search
+    path('search/', GlobalSearchView.as_view(), name='global-search'),
+    
+    # Bulk data export
+    path('export/<str:resource>/', ExportView.as_view(), name='data-export'),
+    
+    # Monitoring
+    path('cache/stats/', CatalogCacheStatsView.as_view(), name='catalog-cache-stats'),
 ]
\ No newline at end of file
@@ -1,8 +1,19 @@
-from rest_framework import viewsets
+import datetime
+
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from rest_framework import viewsets, generics
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import action
 from rest_framework import status
+from .models import SearchDocument
+from .permissions import IsAdmin
+from .cache import cache_is_shared, cache_stats, catalog_version
+from .export import EXPORTS, FORMATS, stream_export
+from .search import search_documents
+from .serializers import SearchDocumentSerializer
 
 
 class APIIndexViewSet(viewsets.ViewSet):
@@ -32,7 +43,9 @@ class APIIndexViewSet(viewsets.ViewSet):
             ],
             'Cart': [
                 {'name': 'View Cart', 'url': '/api/cart/', 'method': 'GET', 'description': 'View current user cart'},
+                {'name': 'Cart Summary', 'url': '/api/cart/summary/', 'method': 'GET', 'description': 'Item count and total of the current user cart'},
                 {'name': 'Add to Cart', 'url': '/api/cart/add/', 'method': 'POST', 'description': 'Add item to cart'},
+                {'name': 'Batch Add to Cart', 'url': '/api/cart/add/batch/', 'method': 'POST', 'description': 'Add several items to cart atomically'},
                 {'name': 'Update Cart Item', 'url': '/api/cart/update/{id}/', 'method': 'PUT', 'description': 'Update cart item quantity'},
                 {'name': 'Remove from Cart', 'url': '/api/cart/remove/{id}/', 'method': 'DELETE', 'description': 'Remove item from cart'},
             ],
@@ -58,6 +71,15 @@ class APIIndexViewSet(viewsets.ViewSet):
                 {'name': 'List Payouts', 'url': '/api/payments/payouts/', 'method': 'GET/POST', 'description': 'List payouts or request a new one'},
                 {'name': 'Payout Detail', 'url': '/api/payments/payouts/{id}/', 'method': 'GET', 'description': 'View a specific payout'},
             ],
+            'Analytics': [
+                {'name': 'Trending Products', 'url': '/api/analytics/trending/', 'method': 'GET', 'description': 'Products ranked by recent, time-decayed activity'},
+            ],
+            'Search': [
+                {'name': 'Global Search', 'url': '/api/search/?q={query}', 'method': 'GET', 'description': 'Search products, categories and seller stores'},
+            ],
+            'Export': [
+                {'name': 'Data Export', 'url': '/api/export/{products|categories|orders}/', 'method': 'GET', 'description': 'Stream a full export as NDJSON or CSV (admin only)'},
+            ],
             'Documentation': [
                 {'name': 'Swagger UI', 'url': '/api/swagger/', 'method': 'GET', 'description': 'Interactive API documentation'},
                 {'name': 'ReDoc', 'url': '/api/redoc/', 'method': 'GET', 'description': 'Alternative API documentation'},
@@ -71,4 +93,128 @@ class APIIndexViewSet(viewsets.ViewSet):
             'message': 'BazaarMate API Index',
             'description': 'Structured overview of all available API endpoints',
             'endpoints': endpoints
-        })
\ No newline at end of file
+        })
+
+class GlobalSearchView(generics.ListAPIView):
+    """
+    Search products, categories and seller stores in one indexed query
+    over the precomputed SearchDocument table.
+
+    Query params: `q` (required) and optional `type` (comma-separated
+    subset of product, category, seller).
+    """
+    serializer_class = SearchDocumentSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '')
+        kinds = [
+            kind for kind in self.request.query_params.get('type', '').split(',')
+            if kind in dict(SearchDocument.KIND_CHOICES)
+        ]
+        return search_documents(query, kinds)
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('q', '').strip():
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'Query parameter "q" is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response({
+                'success': True,
+                'data': serializer.data,
+                'error': None
+            })
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response({
+            'success': True,
+            'data': serializer.data,
+            'error': None
+        })
+
+
+class CatalogCacheStatsView(generics.GenericAPIView):
+    """
+    Hit/miss counters of the anonymous catalog listing cache.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        stats = cache_stats()
+        lookups = stats['hits'] + stats['misses']
+        return Response({
+            'success': True,
+            'data': {
+                'enabled': cache_is_shared(),
+                'version': catalog_version(),
+                'hits': stats['hits'],
+                'misses': stats['misses'],
+                'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else None,
+            },
+            'error': None
+        })
+
+
+def _parse_updated_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class ExportView(generics.GenericAPIView):
+    """
+    Stream every product, category or order as NDJSON (default) or CSV.
+    `?fmt=csv` selects CSV (`format` is reserved by DRF content negotiation)
+    and `?updated_since=` limits the export to rows changed since an ISO
+    date or datetime. Memory use does not depend on the table size.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request, resource, *args, **kwargs):
+        if resource not in EXPORTS:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': f"Unknown export '{resource}'. Choose from {', '.join(EXPORTS)}."
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        fmt = request.query_params.get('fmt', 'ndjson')
+        if fmt not in FORMATS:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': f"Unsupported export format '{fmt}'. Use ndjson or csv."
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            try:
+                updated_since = _parse_updated_since(updated_since)
+            except ValueError:
+                return Response({
+                    'success': False,
+                    'data': None,
+                    'error': 'updated_since must be an ISO 8601 date or datetime'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            updated_since = None
+
+        response = StreamingHttpResponse(
+            stream_export(resource, fmt, updated_since),
+            content_type=FORMATS[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{resource}.{fmt}"'
+        return response
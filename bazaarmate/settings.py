@@ -160,6 +160,11 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Product image uploads: thumbnail sizes (longest edge in pixels) and the
+# number of worker processes that resize them (default: min(4, CPUs)).
+PRODUCT_THUMBNAIL_SIZES = {'small': 160, 'medium': 480, 'large': 1024}
+PRODUCT_IMAGE_WORKERS = env.int('PRODUCT_IMAGE_WORKERS', default=0) or None
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -191,6 +196,61 @@ REST_FRAMEWORK = {
     }
 }
 
+# Cache shared by every worker, e.g. CACHE_URL=redis://127.0.0.1:6379/1.
+# The catalog version lives in it, so the listing cache is only used on a
+# shared backend; the per-process default (LocMem) counts as shared only
+# when CATALOG_CACHE_SINGLE_PROCESS says the site runs in one process.
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+CATALOG_CACHE_SINGLE_PROCESS = env.bool('CATALOG_CACHE_SINGLE_PROCESS', default=False)
+
+# Seconds an anonymous product/category listing stays cached. Entries are
+# also invalidated as soon as the catalog version changes.
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', default=300)
+
+# Upper edges of the `?facets=price` buckets; the last bucket is open-ended.
+PRODUCT_PRICE_FACET_BUCKETS = [25, 50, 100, 250, 500]
+
+# Trending scores (analytics compute_trending): an event's weight halves
+# every TRENDING_HALF_LIFE_HOURS; events older than the window are ignored.
+TRENDING_HALF_LIFE_HOURS = env.float('TRENDING_HALF_LIFE_HOURS', default=24)
+TRENDING_WINDOW_DAYS = env.int('TRENDING_WINDOW_DAYS', default=14)
+
+# Memory the co-purchase ("frequently bought together") build may use for
+# pair counts; larger catalogs are counted in several passes instead.
+COPURCHASE_MEMORY_BUDGET_MB = env.int('COPURCHASE_MEMORY_BUDGET_MB', default=256)
+
+# How often (seconds) each process checks the catalog version (or, on a
+# per-process cache, the product and category tables) to decide
+# whether its product autocomplete index must be rebuilt.
+AUTOCOMPLETE_VERSION_CHECK_SECONDS = env.float('AUTOCOMPLETE_VERSION_CHECK_SECONDS', default=1.0)
+# Rebuild it in a background thread, serving the previous index meanwhile
+# (only a process's first build blocks a request).
+AUTOCOMPLETE_BACKGROUND_REBUILD = env.bool('AUTOCOMPLETE_BACKGROUND_REBUILD', default=True)
+
+# Memory-mapped product snapshot (build_catalog_snapshot). Narrow product
+# reads are served from it while its stamp matches the catalog version,
+# which needs a shared cache backend (never LocMem).
+CATALOG_SNAPSHOT_PATH = env('CATALOG_SNAPSHOT_PATH', default=os.path.join(BASE_DIR, 'catalog.snapshot'))
+
+# Cart storage. 'cart.store.CacheCartStore' keeps active carts in the
+# CART_CACHE_ALIAS cache (shared by all processes, non-evicting; LocMem is
+# refused) and writes them to the database when `manage.py flush_carts` runs.
+CART_STORE = env('CART_STORE', default='cart.store.DatabaseCartStore')
+CART_CACHE_ALIAS = env('CART_CACHE_ALIAS', default='default')
+
+# Anonymous carts live in a signed token (X-Guest-Cart header or guest_cart
+# cookie) and are merged into the user's cart on login.
+GUEST_CART_MAX_LINES = env.int('GUEST_CART_MAX_LINES', default=50)
+GUEST_CART_MAX_AGE = env.int('GUEST_CART_MAX_AGE', default=30 * 24 * 3600)
+
+# Seconds the stock of a cart line stays reserved for the cart after it
+# was last changed (database cart store only); 0 disables reservations.
+STOCK_RESERVATION_SECONDS = env.int('STOCK_RESERVATION_SECONDS', default=900)
+
+# Seconds the first response to a request sent with an Idempotency-Key
+# header is kept for replay (purge with `manage.py purge_idempotency_keys`).
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', default=24 * 3600)
+
 # JWT settings with enhanced security
 from datetime import timedelta
 
@@ -5,8 +5,10 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Message
 from orders.models import Order
 from .serializers import MessageSerializer
+from api.pagination import KeysetPaginationMixin
+from api.prefetch import PlannedQuerysetMixin
 
-class OrderMessageListView(generics.ListCreateAPIView):
+class OrderMessageListView(KeysetPaginationMixin, PlannedQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
     
@@ -67,7 +69,7 @@ class OrderMessageListView(generics.ListCreateAPIView):
             'error': None
         }, status=status.HTTP_201_CREATED)
 
-class MessageDetailView(generics.RetrieveUpdateDestroyAPIView):
+class MessageDetailView(PlannedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
     
@@ -0,0 +1,215 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.http import Http404
+
+from products.models import Product
+from .models import CartItem
+from .operations import ProductsNotFound
+from .reservations import InsufficientStock, available_stock, reservation_ttl
+from .store import CartBusy, DetachedCart, get_cart_store, load_products
+
+GUEST_CART_HEADER = 'X-Guest-Cart'
+GUEST_CART_COOKIE = 'guest_cart'
+SALT = 'cart.guest'
+
+
+def max_lines():
+    return getattr(settings, 'GUEST_CART_MAX_LINES', 50)
+
+
+def max_age():
+    return getattr(settings, 'GUEST_CART_MAX_AGE', 30 * 24 * 3600)
+
+
+def encode_lines(lines):
+    """
+    Sign {product_id: quantity} as a compact token: a compressed
+    [[product_id, quantity], ...] list with a timestamped signature.
+    """
+    return signing.dumps([[pk, quantity] for pk, quantity in lines.items()], salt=SALT, compress=True)
+
+
+def decode_lines(token):
+    """
+    Return the lines of a guest cart token; a missing, tampered, expired or
+    malformed token is an empty cart.
+    """
+    if not token:
+        return {}
+    try:
+        pairs = signing.loads(token, salt=SALT, max_age=max_age())
+        lines = {int(pk): int(quantity) for pk, quantity in pairs}
+    except (signing.BadSignature, TypeError, ValueError):
+        return {}
+    return {pk: quantity for pk, quantity in lines.items() if quantity > 0}
+
+
+def read_token(request):
+    return request.headers.get(GUEST_CART_HEADER) or request.COOKIES.get(GUEST_CART_COOKIE)
+
+
+class GuestCartFull(Exception):
+    def __init__(self, limit):
+        super().__init__(f'Guest carts hold at most {limit} products; log in to add more.')
+        self.limit = limit
+
+
+class GuestCartStore:
+    """
+    Cart store for anonymous users. The lines travel with the client in a
+    signed token (X-Guest-Cart header or guest_cart cookie), so guest carts
+    only read products and never write to the database. A guest line's id
+    is its product id.
+    """
+
+    def __init__(self, lines=None):
+        self.lines = dict(lines or {})
+        self.changed = False
+
+    @classmethod
+    def from_request(cls, request):
+        return cls(decode_lines(read_token(request)))
+
+    def _items(self, products, product_ids):
+        return [
+            CartItem(id=pk, product=products[pk], quantity=self.lines[pk])
+            for pk in product_ids if pk in products and pk in self.lines
+        ]
+
+    def load(self, user, queryset=None):
+        return DetachedCart(self._items(load_products(self.lines), list(self.lines)))
+
+    def _check_stock(self, quantities):
+        """
+        Raise InsufficientStock when a full line quantity exceeds the
+        available stock, as the database store does (guest lines hold none).
+        """
+        if reservation_ttl() <= 0:
+            return
+        available = available_stock(quantities)
+        short = {pk: available.get(pk, 0) for pk, quantity in quantities.items() if quantity > available.get(pk, 0)}
+        if short:
+            raise InsufficientStock(short)
+
+    def add(self, user, items, serializer_class=None):
+        quantities = {}
+        for item in items:
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+        products = load_products(quantities)
+        missing = [pk for pk in quantities if pk not in products]
+        if missing:
+            raise ProductsNotFound(missing)
+        if len(self.lines.keys() | quantities.keys()) > max_lines():
+            raise GuestCartFull(max_lines())
+        self._check_stock({pk: self.lines.get(pk, 0) + quantity for pk, quantity in quantities.items()})
+        for pk, quantity in quantities.items():
+            self.lines[pk] = self.lines.get(pk, 0) + quantity
+        self.changed = True
+        return self._items(products, list(quantities))
+
+    def item(self, user, item_id, serializer_class=None):
+        items = self._items(load_products([item_id]), [item_id])
+        if not items:
+            raise Http404
+        return items[0]
+
+    def set_quantity(self, user, item_id, quantity, serializer_class=None):
+        if item_id not in self.lines:
+            raise Http404
+        self._check_stock({item_id: quantity})
+        self.lines[item_id] = quantity
+        self.changed = True
+        return self.item(user, item_id)
+
+    def remove(self, user, item_id):
+        if self.lines.pop(item_id, None) is None:
+            raise Http404
+        self.changed = True
+
+    def summary(self, user):
+        prices = dict(Product.objects.filter(pk__in=self.lines).values_list('pk', 'price'))
+        lines = [(pk, quantity) for pk, quantity in self.lines.items() if pk in prices]
+        return {
+            'line_count': len(lines),
+            'total_items': sum(quantity for _, quantity in lines),
+            'total_price': sum((quantity * prices[pk] for pk, quantity in lines), Decimal('0.00')),
+        }
+
+    def flush(self):
+        return 0
+
+    def attach(self, response):
+        """
+        Send the updated token back in the header and the cookie.
+        """
+        if not self.lines:
+            response[GUEST_CART_HEADER] = ''
+            response.delete_cookie(GUEST_CART_COOKIE)
+            return response
+        token = encode_lines(self.lines)
+        response[GUEST_CART_HEADER] = token
+        response.set_cookie(
+            GUEST_CART_COOKIE, token, max_age=max_age(), httponly=True, samesite='Lax',
+            secure=getattr(settings, 'SESSION_COOKIE_SECURE', False),
+        )
+        return response
+
+
+def cart_store_for(request):
+    """
+    The configured cart store for authenticated users, a guest store
+    holding the request's token otherwise.
+    """
+    if request.user and request.user.is_authenticated:
+        return get_cart_store()
+    return GuestCartStore.from_request(request)
+
+
+def guest_response(store, response):
+    if isinstance(store, GuestCartStore) and store.changed:
+        store.attach(response)
+    return response
+
+
+def merge_guest_cart(request, response, user):
+    """
+    Add the request's guest cart to `user`'s cart in one batched upsert and
+    clear the guest token. Products that no longer exist are dropped and
+    lines short of stock are capped to what is still available, then the
+    rest is added again. Returns the number of lines merged.
+    """
+    lines = decode_lines(read_token(request))
+    if not lines:
+        return 0
+    items = [{'product_id': pk, 'quantity': quantity} for pk, quantity in lines.items()]
+    store = get_cart_store()
+    merged = []
+    # Missing products, then short ones; a third failure gives up
+    for _ in range(3):
+        if not items:
+            break
+        try:
+            store.add(user, items)
+        except ProductsNotFound as exc:
+            items = [item for item in items if item['product_id'] not in exc.missing]
+        except InsufficientStock as exc:
+            # `available` covers the whole line, including what the user's cart already holds
+            held = dict(
+                CartItem.objects.filter(cart__user=user, product_id__in=exc.available)
+                .values_list('product_id', 'quantity')
+            )
+            for item in items:
+                if item['product_id'] in exc.available:
+                    item['quantity'] = exc.available[item['product_id']] - held.get(item['product_id'], 0)
+            items = [item for item in items if item['quantity'] > 0]
+        except CartBusy:
+            # Keep the token; the next login merges it
+            return 0
+        else:
+            merged = items
+            break
+    response.delete_cookie(GUEST_CART_COOKIE)
+    response[GUEST_CART_HEADER] = ''
+    return len(merged)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from cart.store import CartBusy, get_cart_store
+
+
+class Command(BaseCommand):
+    help = 'Write carts changed in the cache-backed cart store to the cart tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, metavar='SECONDS',
+                            help='Keep running and flush every SECONDS')
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        while True:
+            started = time.perf_counter()
+            try:
+                written = store.flush()
+            except CartBusy:
+                # The log is replayed from the same point next time
+                self.stderr.write('A cart stayed locked; its changes will be flushed on the next run')
+                written = 0
+            if written or not options['interval']:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(self.style.SUCCESS(f'Flushed {written} carts in {elapsed:.2f}s'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
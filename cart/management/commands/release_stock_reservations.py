@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+from cart.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired stock reservations in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--interval', type=float, metavar='SECONDS',
+                            help='Keep running and sweep every SECONDS')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            deleted = release_expired(options['batch_size'])
+            if deleted or not options['interval']:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(self.style.SUCCESS(f'Released {deleted} expired reservations in {elapsed:.2f}s'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
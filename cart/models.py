@@ -15,9 +15,37 @@ class CartItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     added_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+    
     def __str__(self):
         return f"{self.quantity} x {self.product.title}"
     
     @property
     def total_price(self):
-        return self.quantity * self.product.price
\ No newline at end of file
+        return self.quantity * self.product.price
+
+class StockReservation(models.Model):
+    """
+    Units of a product held for a cart until `expires_at`. Available stock
+    is `Product.stock` minus the unexpired holds; expired rows are ignored
+    and deleted in bulk by `manage.py release_stock_reservations`.
+    """
+    cart = models.ForeignKey('cart.Cart', on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product_reservation'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_expiry'),
+            models.Index(fields=['expires_at'], name='reservation_expiry'),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} held until {self.expires_at}"
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from rest_framework import serializers
+
+from api.prefetch import plan_queryset
+from .models import CartItem
+from .reservations import lock_available_stock, reserve
+
+MAX_BATCH_ITEMS = 100
+
+
+class CartAddItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class ProductsNotFound(Exception):
+    def __init__(self, missing):
+        super().__init__(f'Products not found: {missing}')
+        self.missing = missing
+
+
+def add_items(cart, items, serializer_class=None):
+    """
+    Add [{product_id, quantity}] to a cart and return the affected
+    CartItems in input order.
+
+    All products are checked with one query. Missing rows are inserted with
+    quantity 0 (conflicts on the (cart, product) constraint are ignored) and
+    every row is then incremented by a single `quantity = quantity + n`
+    UPDATE, so concurrent adds never lose an increment and the number of
+    queries does not depend on the number of items. When given,
+    `serializer_class` plans the query that loads the returned items.
+
+    The products are locked while the new line quantities are reserved
+    (see cart.reservations); InsufficientStock rolls the whole add back.
+    """
+    quantities = {}
+    for item in items:
+        quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+
+    with transaction.atomic():
+        available = lock_available_stock(quantities, cart.pk)
+        missing = [pk for pk in quantities if pk not in available]
+        if missing:
+            raise ProductsNotFound(missing)
+
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, product_id=pk, quantity=0) for pk in quantities],
+            ignore_conflicts=True,
+        )
+        CartItem.objects.filter(cart=cart, product_id__in=quantities).update(
+            quantity=F('quantity') + Case(
+                *[When(product_id=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+                output_field=PositiveIntegerField(),
+            )
+        )
+
+        queryset = CartItem.objects.filter(cart=cart, product_id__in=quantities)
+        if serializer_class is not None:
+            queryset = plan_queryset(queryset, serializer_class)
+        by_product = {item.product_id: item for item in queryset}
+        reserve(cart.pk, {pk: by_product[pk].quantity for pk in quantities}, available)
+    return [by_product[pk] for pk in quantities]
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import Product
+from .models import StockReservation
+
+
+def reservation_ttl():
+    """
+    Seconds a cart holds the stock of its lines (STOCK_RESERVATION_SECONDS);
+    0 disables reservations.
+    """
+    return getattr(settings, 'STOCK_RESERVATION_SECONDS', 900)
+
+
+class InsufficientStock(Exception):
+    def __init__(self, available):
+        super().__init__(f'Insufficient stock: {available}')
+        # {product_id: units still available to this cart}
+        self.available = available
+
+
+def with_available_stock(queryset, exclude_cart_id=None):
+    """
+    Annotate products with `available_stock`: stock minus the unexpired
+    holds, leaving out the holds of `exclude_cart_id` (a cart never
+    competes with itself).
+    """
+    holds = StockReservation.objects.filter(product=OuterRef('pk'), expires_at__gt=timezone.now())
+    if exclude_cart_id is not None:
+        holds = holds.exclude(cart_id=exclude_cart_id)
+    held = holds.order_by().values('product').annotate(total=Sum('quantity')).values('total')
+    return queryset.annotate(
+        available_stock=F('stock') - Coalesce(Subquery(held, output_field=IntegerField()), 0)
+    )
+
+
+def available_stock(product_ids, exclude_cart_id=None):
+    """
+    Return {product_id: available units} for existing products, in one query.
+    """
+    queryset = with_available_stock(Product.objects.filter(pk__in=product_ids), exclude_cart_id)
+    return {pk: max(available, 0) for pk, available in queryset.values_list('pk', 'available_stock')}
+
+
+def lock_available_stock(product_ids, cart_id):
+    """
+    available_stock() with the product rows locked until the end of the
+    transaction, so concurrent reservations of a product are serialized.
+    """
+    queryset = with_available_stock(Product.objects.select_for_update().filter(pk__in=product_ids), cart_id)
+    return {pk: max(available, 0) for pk, available in queryset.values_list('pk', 'available_stock')}
+
+
+def reserve(cart_id, quantities, available):
+    """
+    Hold {product_id: quantity} (the cart's full line quantities) for the
+    TTL, replacing the cart's previous holds of those products with one
+    upsert. `available` comes from lock_available_stock(); raises
+    InsufficientStock, writing nothing, when a quantity exceeds it.
+    """
+    if reservation_ttl() <= 0:
+        return
+    short = {pk: available.get(pk, 0) for pk, quantity in quantities.items() if quantity > available.get(pk, 0)}
+    if short:
+        raise InsufficientStock(short)
+    expires_at = timezone.now() + timedelta(seconds=reservation_ttl())
+    StockReservation.objects.bulk_create(
+        [StockReservation(cart_id=cart_id, product_id=pk, quantity=quantity, expires_at=expires_at)
+         for pk, quantity in quantities.items()],
+        update_conflicts=True,
+        unique_fields=['cart', 'product'],
+        update_fields=['quantity', 'expires_at'],
+    )
+
+
+def release(cart_id, product_ids=None):
+    """
+    Drop a cart's holds (all of them, or those of `product_ids`).
+    """
+    holds = StockReservation.objects.filter(cart_id=cart_id)
+    if product_ids is not None:
+        holds = holds.filter(product_id__in=product_ids)
+    holds.delete()
+
+
+def release_expired(batch_size=5000):
+    """
+    Delete expired holds in batches of `batch_size` rows (found through the
+    expiry index) and return how many were deleted.
+    """
+    now = timezone.now()
+    deleted = 0
+    while True:
+        ids = list(StockReservation.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        count, _ = StockReservation.objects.filter(pk__in=ids).delete()
+        deleted += count
@@ -1,8 +1,10 @@
 from rest_framework import serializers
 from .models import Cart, CartItem
 from products.serializers import ProductSerializer
+from api.sparse import SparseFieldsetMixin
+from .totals import cart_totals
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     
@@ -11,7 +13,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id', 'cart', 'added_at')
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_items = serializers.SerializerMethodField()
     total_price = serializers.SerializerMethodField()
@@ -20,9 +22,24 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = '__all__'
         read_only_fields = ('id', 'user', 'created_at', 'updated_at')
+        # Read from the with_totals() annotations
+        field_sources = {'total_items': (), 'total_price': ()}
+    
+    def _totals(self, obj):
+        # Carts loaded without with_totals() (e.g. just created) are summed in one query
+        if not hasattr(obj, 'items_quantity'):
+            totals = cart_totals(obj.items.all())
+            obj.items_quantity, obj.items_price = totals['total_items'], totals['total_price']
+        return obj.items_quantity, obj.items_price
         
     def get_total_items(self, obj):
-        return sum(item.quantity for item in obj.items.all())
+        return self._totals(obj)[0]
     
     def get_total_price(self, obj):
-        return sum(item.total_price for item in obj.items.all())
\ No newline at end of file
+        return self._totals(obj)[1]
+
+
+class CartSummarySerializer(serializers.Serializer):
+    line_count = serializers.IntegerField()
+    total_items = serializers.IntegerField()
+    total_price = serializers.DecimalField(max_digits=12, decimal_places=2)
\ No newline at end of file
@@ -0,0 +1,425 @@
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Case, DateTimeField, PositiveIntegerField, Value, When
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from api.cache import cache_backend_is_shared
+from api.prefetch import plan_queryset
+from products.models import Product
+from products.serializers import ProductSerializer
+from .models import Cart, CartItem
+from .operations import ProductsNotFound, add_items
+from .reservations import lock_available_stock, release, reserve
+from .totals import cart_totals, with_totals
+
+
+class CartBusy(Exception):
+    """Another request held the cart's lock for longer than the store waits."""
+
+
+def get_cart_store():
+    """
+    Return the cart store configured by CART_STORE (a dotted path).
+    """
+    return import_string(getattr(settings, 'CART_STORE', 'cart.store.DatabaseCartStore'))()
+
+
+def load_products(product_ids):
+    """
+    Products by id, loaded the way CartItemSerializer renders them.
+    """
+    queryset = plan_queryset(Product.objects.filter(pk__in=product_ids), ProductSerializer)
+    return {product.pk: product for product in queryset}
+
+
+class DetachedCart:
+    """
+    Cart without a Cart row (guest carts, users who never added anything),
+    rendered by CartSerializer like a loaded cart.
+    """
+    id = None
+    created_at = None
+    updated_at = None
+
+    def __init__(self, items=(), user=None):
+        self.user = user
+        self.items = list(items)
+        self.items_quantity = sum(item.quantity for item in self.items)
+        self.items_price = sum((item.total_price for item in self.items), Decimal('0.00'))
+
+
+class DatabaseCartStore:
+    """
+    Reads and writes go straight to the cart tables.
+    """
+
+    def load(self, user, queryset):
+        # Reading never creates the Cart row; the first add does
+        cart = with_totals(queryset).filter(user=user).first()
+        return cart if cart is not None else DetachedCart(user=user)
+
+    def add(self, user, items, serializer_class=None):
+        cart, created = Cart.objects.get_or_create(user=user)
+        return add_items(cart, items, serializer_class)
+
+    def item(self, user, item_id, serializer_class=None):
+        queryset = CartItem.objects.filter(cart__user=user)
+        if serializer_class is not None:
+            queryset = plan_queryset(queryset, serializer_class)
+        return get_object_or_404(queryset, pk=item_id)
+
+    def set_quantity(self, user, item_id, quantity, serializer_class=None):
+        item = self.item(user, item_id, serializer_class)
+        with transaction.atomic():
+            available = lock_available_stock([item.product_id], item.cart_id)
+            reserve(item.cart_id, {item.product_id: quantity}, available)
+            item.quantity = quantity
+            item.save(update_fields=['quantity'])
+        return item
+
+    def remove(self, user, item_id):
+        line = CartItem.objects.filter(cart__user=user, pk=item_id).values_list('cart_id', 'product_id').first()
+        if line is None:
+            raise Http404
+        cart_id, product_id = line
+        with transaction.atomic():
+            CartItem.objects.filter(pk=item_id).delete()
+            release(cart_id, [product_id])
+
+    def summary(self, user):
+        return cart_totals(CartItem.objects.filter(cart__user=user))
+
+    def flush(self):
+        return 0
+
+    def checkout_session(self, user):
+        return nullcontext()
+
+
+def _with_items(cart, items):
+    # Same shape prefetch_related leaves behind, so CartSerializer reads
+    # `cart.items.all()` without a query
+    queryset = CartItem.objects.filter(cart=cart)
+    queryset._result_cache = items
+    queryset._prefetch_done = True
+    cart._prefetched_objects_cache = {'items': queryset}
+    return cart
+
+
+class CacheCartStore:
+    """
+    Write-behind cart store. Each active cart is kept in the cache as
+    {'cart': id, 'created', 'updated', 'lines': {product_id: [item_id,
+    quantity, added_at]}} and every change appends the user to a log in the
+    cache. flush() replays the log, coalescing repeated changes of a cart,
+    and writes the carts to the tables in batches. A cart missing from the
+    cache is loaded from the tables, which stay the durable copy.
+
+    As in guest carts, a line's id is its product id: CartItem rows (and
+    their ids) only exist once a flush has written the line.
+
+    Needs a cache shared by all processes that does not evict these keys
+    (CART_CACHE_ALIAS); changes not yet flushed live only in the cache, so
+    a per-process cache is refused.
+    Adds take no stock reservations, which would defeat the write-behind.
+    """
+    lock_timeout = 5
+    # A log slot that stays empty this long belongs to a writer that died
+    # between reserving and filling it
+    gap_timeout = 60
+
+    HEAD_KEY = 'cart:log:head'
+    TAIL_KEY = 'cart:log:tail'
+    GAP_KEY = 'cart:log:gap'
+    FLUSH_LOCK_KEY = 'cart:flush:lock'
+
+    def __init__(self):
+        alias = getattr(settings, 'CART_CACHE_ALIAS', 'default')
+        if not cache_backend_is_shared(alias):
+            # flush_carts would run against its own, empty copy of the cache
+            raise ImproperlyConfigured(
+                f"CacheCartStore needs a cache shared by all processes; CART_CACHE_ALIAS '{alias}' is per-process."
+            )
+        self.cache = caches[alias]
+
+    @staticmethod
+    def _state_key(user_id):
+        return f'cart:state:{user_id}'
+
+    @staticmethod
+    def _log_key(seq):
+        return f'cart:log:{seq}'
+
+    @contextmanager
+    def _lock(self, key):
+        """
+        Hold `key` for the block, raising CartBusy when it stays taken for
+        lock_timeout seconds (a lock whose holder died expires by then).
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        while not self.cache.add(key, token, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                raise CartBusy
+            time.sleep(0.005)
+        try:
+            yield
+        finally:
+            # After an overrun the lock may have expired and been taken by
+            # another request; only release our own
+            if self.cache.get(key) == token:
+                self.cache.delete(key)
+
+    def _user_lock(self, user_id):
+        return self._lock(f'cart:lock:{user_id}')
+
+    def _state(self, user):
+        key = self._state_key(user.pk)
+        state = self.cache.get(key)
+        if state is not None:
+            return state
+        cart, created = Cart.objects.get_or_create(user=user)
+        state = {
+            'cart': cart.pk,
+            'created': cart.created_at,
+            'updated': cart.updated_at,
+            'lines': {
+                product_id: [pk, quantity, added_at]
+                for pk, product_id, quantity, added_at in CartItem.objects.filter(cart=cart).order_by('pk')
+                .values_list('pk', 'product_id', 'quantity', 'added_at')
+            },
+        }
+        # Never overwrite a state another request has already cached
+        self.cache.add(key, state, None)
+        return self.cache.get(key) or state
+
+    def _save(self, user, state):
+        state['updated'] = timezone.now()
+        self.cache.set(self._state_key(user.pk), state, None)
+        try:
+            seq = self.cache.incr(self.HEAD_KEY)
+        except ValueError:
+            self.cache.add(self.HEAD_KEY, 0, None)
+            seq = self.cache.incr(self.HEAD_KEY)
+        self.cache.set(self._log_key(seq), user.pk, None)
+
+    def _items(self, user, state, products, product_ids):
+        cart = Cart(id=state['cart'], user=user, created_at=state['created'], updated_at=state['updated'])
+        items = []
+        for product_id in product_ids:
+            line = state['lines'].get(product_id)
+            if line is not None and product_id in products:
+                _, quantity, added_at = line
+                items.append(CartItem(
+                    id=product_id, cart=cart, product=products[product_id], quantity=quantity, added_at=added_at
+                ))
+        return cart, items
+
+    def load(self, user, queryset):
+        state = self._state(user)
+        products = load_products(state['lines'])
+        cart, items = self._items(user, state, products, list(state['lines']))
+        cart.items_quantity = sum(item.quantity for item in items)
+        cart.items_price = sum((item.total_price for item in items), Decimal('0.00'))
+        return _with_items(cart, items)
+
+    def add(self, user, items, serializer_class=None):
+        quantities = {}
+        for item in items:
+            quantities[item['product_id']] = quantities.get(item['product_id'], 0) + item['quantity']
+        products = load_products(quantities)
+        missing = [pk for pk in quantities if pk not in products]
+        if missing:
+            raise ProductsNotFound(missing)
+
+        with self._user_lock(user.pk):
+            state = self._state(user)
+            now = timezone.now()
+            for product_id, quantity in quantities.items():
+                line = state['lines'].setdefault(product_id, [None, 0, now])
+                line[1] += quantity
+            self._save(user, state)
+        return self._items(user, state, products, list(quantities))[1]
+
+    def item(self, user, item_id, serializer_class=None):
+        state = self._state(user)
+        items = self._items(user, state, load_products([item_id]), [item_id])[1]
+        if not items:
+            raise Http404
+        return items[0]
+
+    def set_quantity(self, user, item_id, quantity, serializer_class=None):
+        with self._user_lock(user.pk):
+            state = self._state(user)
+            if item_id not in state['lines']:
+                raise Http404
+            state['lines'][item_id][1] = quantity
+            self._save(user, state)
+        return self._items(user, state, load_products([item_id]), [item_id])[1][0]
+
+    def remove(self, user, item_id):
+        with self._user_lock(user.pk):
+            state = self._state(user)
+            if state['lines'].pop(item_id, None) is None:
+                raise Http404
+            self._save(user, state)
+
+    def summary(self, user):
+        lines = self._state(user)['lines']
+        prices = dict(Product.objects.filter(pk__in=lines).values_list('pk', 'price'))
+        lines = [(product_id, line[1]) for product_id, line in lines.items() if product_id in prices]
+        return {
+            'line_count': len(lines),
+            'total_items': sum(quantity for _, quantity in lines),
+            'total_price': sum((quantity * prices[product_id] for product_id, quantity in lines), Decimal('0.00')),
+        }
+
+    def _gap_expired(self, seq):
+        gap = self.cache.get(self.GAP_KEY)
+        now = time.time()
+        if gap is None or gap[0] != seq:
+            self.cache.set(self.GAP_KEY, (seq, now), None)
+            return False
+        return now - gap[1] > self.gap_timeout
+
+    def flush(self, batch_size=500):
+        """
+        Write every cart changed since the last flush to the tables.
+        Returns the number of carts written.
+        """
+        if not self.cache.add(self.FLUSH_LOCK_KEY, 1, 300):
+            return 0
+        written = 0
+        try:
+            tail = self.cache.get(self.TAIL_KEY, 0)
+            head = self.cache.get(self.HEAD_KEY, 0)
+            while tail < head:
+                seqs = range(tail + 1, min(head, tail + batch_size) + 1)
+                entries = self.cache.get_many([self._log_key(seq) for seq in seqs])
+                user_ids = set()
+                done = tail
+                for seq in seqs:
+                    key = self._log_key(seq)
+                    if key not in entries and not self._gap_expired(seq):
+                        break
+                    if key in entries:
+                        user_ids.add(entries[key])
+                    done = seq
+                if done == tail:
+                    break
+                written += self._write(user_ids)
+                self.cache.delete_many([self._log_key(seq) for seq in range(tail + 1, done + 1)])
+                self.cache.set(self.TAIL_KEY, done, None)
+                tail = done
+        finally:
+            self.cache.delete(self.FLUSH_LOCK_KEY)
+        return written
+
+    @contextmanager
+    def checkout_session(self, user):
+        """
+        Hold the user's cart lock while their order is placed from the
+        tables: the cached cart is written first, and dropped afterwards so
+        the next read loads the cart as the checkout left it.
+        """
+        key = self._state_key(user.pk)
+        with self._user_lock(user.pk):
+            state = self.cache.get(key)
+            if state is not None:
+                self._write_states({user.pk: state})
+            try:
+                yield
+            finally:
+                self.cache.delete(key)
+
+    def _write(self, user_ids):
+        states = {}
+        for user_id in user_ids:
+            # Copy under the lock; the tables are written without holding it
+            with self._user_lock(user_id):
+                state = self.cache.get(self._state_key(user_id))
+            if state is not None:
+                states[user_id] = state
+        if not states:
+            return 0
+
+        ids = self._write_states(states)
+        for user_id, state in states.items():
+            with self._user_lock(user_id):
+                current = self.cache.get(self._state_key(user_id))
+                if current is None:
+                    continue
+                for product_id, line in current['lines'].items():
+                    if line[0] is None and (current['cart'], product_id) in ids:
+                        line[0] = ids[current['cart'], product_id]
+                self.cache.set(self._state_key(user_id), current, None)
+        return len(states)
+
+    def _write_states(self, states):
+        """
+        Make the cart tables match `states` ({user_id: state}) and return
+        {(cart_id, product_id): item_id}. A copy older than its Cart row
+        (e.g. taken before a checkout emptied the cart) is skipped.
+        """
+        with transaction.atomic():
+            current = dict(
+                Cart.objects.select_for_update().filter(pk__in=[state['cart'] for state in states.values()])
+                .values_list('pk', 'updated_at')
+            )
+            states = {
+                user_id: state for user_id, state in states.items()
+                if state['cart'] in current and state['updated'] >= current[state['cart']]
+            }
+            if not states:
+                return {}
+            return self._write_rows(states)
+
+    def _write_rows(self, states):
+        desired = {
+            (state['cart'], product_id): line
+            for state in states.values()
+            for product_id, line in state['lines'].items()
+        }
+        existing = {
+            (cart_id, product_id): (pk, quantity)
+            for pk, cart_id, product_id, quantity in CartItem.objects.filter(
+                cart_id__in=[state['cart'] for state in states.values()]
+            ).values_list('pk', 'cart_id', 'product_id', 'quantity')
+        }
+        stale = [pk for key, (pk, _) in existing.items() if key not in desired]
+        changed = {pk: desired[key][1] for key, (pk, quantity) in existing.items()
+                   if key in desired and desired[key][1] != quantity}
+        new = [key for key in desired if key not in existing]
+        valid_products = set(Product.objects.filter(pk__in={product_id for _, product_id in new})
+                             .values_list('pk', flat=True))
+        new = [key for key in new if key[1] in valid_products]
+
+        if stale:
+            CartItem.objects.filter(pk__in=stale).delete()
+        if changed:
+            CartItem.objects.filter(pk__in=changed).update(quantity=Case(
+                *[When(pk=pk, then=Value(quantity)) for pk, quantity in changed.items()],
+                output_field=PositiveIntegerField(),
+            ))
+        created = CartItem.objects.bulk_create([
+            CartItem(cart_id=cart_id, product_id=product_id, quantity=desired[cart_id, product_id][1])
+            for cart_id, product_id in new
+        ])
+        Cart.objects.filter(pk__in=[state['cart'] for state in states.values()]).update(updated_at=Case(
+            *[When(pk=state['cart'], then=Value(state['updated'])) for state in states.values()],
+            output_field=DateTimeField(),
+        ))
+
+        ids = {key: pk for key, (pk, _) in existing.items()}
+        ids.update({(item.cart_id, item.product_id): item.pk for item in created})
+        return ids
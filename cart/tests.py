@@ -1,3 +1,408 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from accounts.throttling import LoginRateThrottle
+from sellers.models import SellerProfile
+from products.models import Category, Product
+from .models import Cart, CartItem, StockReservation
+from .reservations import available_stock
+from .store import CacheCartStore, get_cart_store
+
+User = get_user_model()
+
+
+class CartTotalsTestCase(APITestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@test.com', password='TestPass123!', role='buyer'
+        )
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        category = Category.objects.create(name='Snacks')
+        self.chips = Product.objects.create(
+            title='Chips', description='Salty', price='2.50', stock=10, category=category, seller=seller
+        )
+        self.soda = Product.objects.create(
+            title='Soda', description='Fizzy', price='1.25', stock=10, category=category, seller=seller
+        )
+        self.cart = Cart.objects.create(user=self.buyer)
+        CartItem.objects.create(cart=self.cart, product=self.chips, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.soda, quantity=3)
+        self.client.force_authenticate(self.buyer)
+
+    def test_cart_totals_follow_current_prices(self):
+        """Test cart totals are computed in the database at current product prices"""
+        response = self.client.get('/api/cart/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['total_items'], 5)
+        self.assertEqual(response.data['data']['total_price'], Decimal('8.75'))
+
+        Product.objects.filter(pk=self.soda.pk).update(price='2.00')
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/cart/', {'fields': 'total_items,total_price'})
+        self.assertEqual(response.data['data'], {'total_items': 5, 'total_price': Decimal('11.00')})
+
+    def test_summary(self):
+        """Test the summary endpoint answers with one aggregate query"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.data['data'], {'line_count': 2, 'total_items': 5, 'total_price': '8.75'})
+
+        self.client.force_authenticate(self.chips.seller.user)
+        response = self.client.get('/api/cart/summary/')
+        self.assertEqual(response.data['data'], {'line_count': 0, 'total_items': 0, 'total_price': '0.00'})
+
+
+class BatchAddToCartTestCase(APITestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@test.com', password='TestPass123!', role='buyer'
+        )
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        category = Category.objects.create(name='Snacks')
+        self.products = [
+            Product.objects.create(
+                title=f'Snack {number}', description='Snack', price='1.00', stock=10,
+                category=category, seller=seller
+            )
+            for number in range(20)
+        ]
+        self.client.force_authenticate(self.buyer)
+
+    def add(self, items):
+        return self.client.post('/api/cart/add/batch/', items, format='json')
+
+    def test_batch_add_runs_constant_queries(self):
+        """Test adding 2 or 20 products takes the same number of queries"""
+        self.add([{'product_id': self.products[0].id}])
+        with self.assertNumQueries(8):
+            self.add([{'product_id': product.id, 'quantity': 1} for product in self.products[:2]])
+        with self.assertNumQueries(8):
+            response = self.add({'items': [{'product_id': product.id, 'quantity': 2} for product in self.products]})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['data']), 20)
+        self.assertEqual(response.data['data'][0]['quantity'], 4)
+        self.assertEqual(CartItem.objects.get(product=self.products[1]).quantity, 3)
+        self.assertEqual(CartItem.objects.count(), 20)
+
+    def test_missing_products_reject_the_whole_batch(self):
+        """Test an unknown product fails the batch without adding anything"""
+        response = self.add([{'product_id': self.products[0].id}, {'product_id': 999999}])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['data']['missing'], [999999])
+        self.assertFalse(CartItem.objects.exists())
+
+        response = self.add([{'product_id': self.products[0].id, 'quantity': 0}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_single_add_increments_existing_item(self):
+        """Test the single add endpoint shares the atomic increment"""
+        for _ in range(2):
+            response = self.client.post(
+                '/api/cart/add/', {'product_id': self.products[0].id, 'quantity': 2}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['data']['quantity'], 4)
+
+
+class StockReservationTestCase(APITestCase):
+    def setUp(self):
+        self.buyers = [
+            User.objects.create_user(
+                username=f'buyer{number}', email=f'buyer{number}@test.com', password='TestPass123!', role='buyer'
+            )
+            for number in range(2)
+        ]
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        category = Category.objects.create(name='Snacks')
+        self.chips = Product.objects.create(
+            title='Chips', description='Salty', price='2.50', stock=3, category=category, seller=seller
+        )
+
+    def add(self, buyer, quantity):
+        self.client.force_authenticate(buyer)
+        return self.client.post('/api/cart/add/', {'product_id': self.chips.id, 'quantity': quantity}, format='json')
+
+    def test_cart_lines_hold_stock(self):
+        """Test adding to a cart holds stock that other carts cannot take"""
+        first, second = self.buyers
+        self.assertEqual(self.add(first, 2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(available_stock([self.chips.id]), {self.chips.id: 1})
+
+        response = self.add(second, 2)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['data']['available'], [{'product_id': self.chips.id, 'available': 1}])
+        self.assertFalse(CartItem.objects.filter(cart__user=second).exists())
+        self.assertEqual(self.add(second, 1).status_code, status.HTTP_201_CREATED)
+
+        # A cart's own hold does not count against it; removing a line releases its hold
+        self.client.force_authenticate(first)
+        item = CartItem.objects.get(cart__user=first)
+        self.assertEqual(self.client.patch(f'/api/cart/update/{item.id}/', {'quantity': 3}, format='json').status_code,
+                         status.HTTP_409_CONFLICT)
+        self.client.delete(f'/api/cart/remove/{item.id}/')
+        self.assertEqual(available_stock([self.chips.id]), {self.chips.id: 2})
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_expired_holds_are_ignored_and_swept(self):
+        """Test expired holds free their stock and the sweeper deletes them"""
+        first, second = self.buyers
+        self.add(first, 3)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.add(second, 3).status_code, status.HTTP_201_CREATED)
+
+        out = StringIO()
+        call_command('release_stock_reservations', stdout=out)
+        self.assertIn('Released 1 expired', out.getvalue())
+        self.assertEqual(list(StockReservation.objects.values_list('cart__user', flat=True)), [second.id])
+
+
+@override_settings(CART_STORE='cart.store.CacheCartStore')
+class CacheCartStoreTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        # The store refuses per-process caches; a file cache is shared
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shared = override_settings(CART_CACHE_ALIAS='carts', CACHES={**settings.CACHES, 'carts': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+        }})
+        shared.enable()
+        self.addCleanup(shared.disable)
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@test.com', password='TestPass123!', role='buyer'
+        )
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        category = Category.objects.create(name='Snacks')
+        self.chips = Product.objects.create(
+            title='Chips', description='Salty', price='2.50', stock=10, category=category, seller=seller
+        )
+        self.soda = Product.objects.create(
+            title='Soda', description='Fizzy', price='1.25', stock=10, category=category, seller=seller
+        )
+        self.client.force_authenticate(self.buyer)
+
+    def cart(self):
+        return self.client.get('/api/cart/').data['data']
+
+    def test_writes_are_served_from_cache_and_flushed_in_batches(self):
+        """Test cart changes are read back from the cache and reach the tables on flush"""
+        for _ in range(3):
+            self.client.post('/api/cart/add/', {'product_id': self.chips.id}, format='json')
+        self.client.post('/api/cart/add/batch/', [{'product_id': self.soda.id, 'quantity': 2}], format='json')
+        self.assertFalse(CartItem.objects.exists())
+
+        cart = self.cart()
+        # Lines are addressed by product id, before and after a flush
+        self.assertEqual(
+            [(item['id'], item['quantity']) for item in cart['items']], [(self.chips.id, 3), (self.soda.id, 2)]
+        )
+        self.assertEqual((cart['total_items'], cart['total_price']), (5, Decimal('10.00')))
+        self.assertEqual(self.client.get('/api/cart/summary/').data['data']['total_price'], '10.00')
+
+        # Four logged changes of one cart are written once
+        self.assertEqual(get_cart_store().flush(), 1)
+        self.assertEqual(
+            dict(CartItem.objects.values_list('product_id', 'quantity')), {self.chips.id: 3, self.soda.id: 2}
+        )
+        self.assertEqual(self.cart()['items'][0]['id'], self.chips.id)
+
+        response = self.client.patch(f'/api/cart/update/{self.chips.id}/', {'quantity': 7}, format='json')
+        self.assertEqual(response.data['data']['quantity'], 7)
+        response = self.client.delete(f'/api/cart/remove/{self.soda.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(get_cart_store().flush(), 1)
+        self.assertEqual(dict(CartItem.objects.values_list('product_id', 'quantity')), {self.chips.id: 7})
+        self.assertEqual(get_cart_store().flush(), 0)
+
+    def test_unflushed_lines_can_be_changed_and_removed(self):
+        """Test a line added since the last flush is updated and removed by its id"""
+        self.client.post('/api/cart/add/batch/', [
+            {'product_id': self.chips.id}, {'product_id': self.soda.id},
+        ], format='json')
+        response = self.client.patch(f'/api/cart/update/{self.chips.id}/', {'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['data']['id'], response.data['data']['quantity']), (self.chips.id, 4))
+        response = self.client.delete(f'/api/cart/remove/{self.soda.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        get_cart_store().flush()
+        self.assertEqual(dict(CartItem.objects.values_list('product_id', 'quantity')), {self.chips.id: 4})
+
+    def test_busy_cart_lock_is_not_broken(self):
+        """Test a change waiting past the lock timeout gets a 503 and leaves the holder's lock"""
+        store = get_cart_store()
+        key = f'cart:lock:{self.buyer.pk}'
+        store.cache.add(key, 'holder', 60)
+        with mock.patch.object(CacheCartStore, 'lock_timeout', 0.05):
+            response = self.client.post('/api/cart/add/', {'product_id': self.chips.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual((response.data['success'], response.data['data']), (False, None))
+        self.assertEqual(store.cache.get(key), 'holder')
+
+    def test_per_process_cache_is_refused(self):
+        """Test the store will not keep carts in a cache flush_carts cannot see"""
+        with self.settings(CART_CACHE_ALIAS='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                get_cart_store()
+
+    def test_cold_cache_loads_from_tables(self):
+        """Test a cart missing from the cache is read from the tables"""
+        cart = Cart.objects.create(user=self.buyer)
+        CartItem.objects.create(cart=cart, product=self.soda, quantity=4)
+        self.assertEqual([(row['id'], row['quantity']) for row in self.cart()['items']], [(self.soda.id, 4)])
+
+        response = self.client.delete('/api/cart/remove/999999/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GuestCartTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@test.com', password='TestPass123!', role='buyer'
+        )
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        category = Category.objects.create(name='Snacks')
+        self.chips = Product.objects.create(
+            title='Chips', description='Salty', price='2.50', stock=10, category=category, seller=seller
+        )
+        self.soda = Product.objects.create(
+            title='Soda', description='Fizzy', price='1.25', stock=10, category=category, seller=seller
+        )
+
+    def test_guest_cart_lives_in_the_token(self):
+        """Test anonymous cart changes are carried by the signed token without writes"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/cart/add/', {'product_id': self.chips.id, 'quantity': 2}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.client.post('/api/cart/add/batch/', [{'product_id': self.soda.id}], format='json')
+            self.client.patch(f'/api/cart/update/{self.soda.id}/', {'quantity': 3}, format='json')
+            cart = self.client.get('/api/cart/').data['data']
+            summary = self.client.get('/api/cart/summary/').data['data']
+        self.assertFalse([query for query in queries if not query['sql'].startswith('SELECT')])
+        self.assertEqual([(item['id'], item['quantity']) for item in cart['items']], [(self.chips.id, 2), (self.soda.id, 3)])
+        self.assertEqual((cart['id'], cart['total_items'], cart['total_price']), (None, 5, Decimal('8.75')))
+        self.assertEqual(summary, {'line_count': 2, 'total_items': 5, 'total_price': '8.75'})
+        self.assertFalse(Cart.objects.exists())
+
+        # The header works without the cookie; a tampered token is an empty cart
+        token = response['X-Guest-Cart']
+        self.client.cookies.clear()
+        cart = self.client.get('/api/cart/', HTTP_X_GUEST_CART=token).data['data']
+        self.assertEqual(cart['total_items'], 2)
+        cart = self.client.get('/api/cart/', HTTP_X_GUEST_CART=token[:-1] + 'x').data['data']
+        self.assertEqual(cart['items'], [])
+
+    def test_guest_cart_merges_on_login(self):
+        """Test logging in adds the guest cart to the user's cart in one upsert"""
+        Cart.objects.create(user=self.buyer).items.create(product=self.chips, quantity=1)
+        self.client.post('/api/cart/add/batch/', [
+            {'product_id': self.chips.id, 'quantity': 2}, {'product_id': self.soda.id},
+        ], format='json')
+        self.client.delete(f'/api/cart/remove/{self.soda.id}/')
+        self.client.post('/api/cart/add/', {'product_id': self.soda.id, 'quantity': 4}, format='json')
+
+        # The login throttle reads its rates at import time
+        with mock.patch.object(LoginRateThrottle, 'THROTTLE_RATES', {'login': '100/minute'}):
+            response = self.client.post(
+                '/api/auth/login/', {'email': 'buyer@test.com', 'password': 'TestPass123!'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.cookies['guest_cart'].value, '')
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart__user=self.buyer).values_list('product_id', 'quantity')),
+            {self.chips.id: 3, self.soda.id: 4},
+        )
+
+    def test_merge_drops_deleted_products(self):
+        """Test a product deleted after it was added to the guest cart is skipped at login"""
+        self.client.post('/api/cart/add/batch/', [
+            {'product_id': self.chips.id}, {'product_id': self.soda.id},
+        ], format='json')
+        self.soda.delete()
+
+        with mock.patch.object(LoginRateThrottle, 'THROTTLE_RATES', {'login': '100/minute'}):
+            response = self.client.post(
+                '/api/auth/login/', {'email': 'buyer@test.com', 'password': 'TestPass123!'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart__user=self.buyer).values_list('product_id', 'quantity')),
+            {self.chips.id: 1},
+        )
+
+    def test_guest_quantities_are_checked_against_stock(self):
+        """Test guest adds and quantity changes past the available stock are refused"""
+        Product.objects.filter(pk=self.chips.pk).update(stock=3)
+        self.client.post('/api/cart/add/', {'product_id': self.chips.id, 'quantity': 2}, format='json')
+        response = self.client.patch(f'/api/cart/update/{self.chips.id}/', {'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['data']['available'], [{'product_id': self.chips.id, 'available': 3}])
+        response = self.client.post('/api/cart/add/', {'product_id': self.chips.id, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get('/api/cart/').data['data']['total_items'], 2)
+
+    def test_merge_caps_lines_short_of_stock(self):
+        """Test a guest line that no longer fits the stock is merged at the available quantity"""
+        Product.objects.filter(pk=self.chips.pk).update(stock=4)
+        self.client.post('/api/cart/add/batch/', [
+            {'product_id': self.chips.id, 'quantity': 3}, {'product_id': self.soda.id},
+        ], format='json')
+        Cart.objects.create(user=self.buyer).items.create(product=self.chips, quantity=2)
+
+        with mock.patch.object(LoginRateThrottle, 'THROTTLE_RATES', {'login': '100/minute'}):
+            response = self.client.post(
+                '/api/auth/login/', {'email': 'buyer@test.com', 'password': 'TestPass123!'}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            dict(CartItem.objects.filter(cart__user=self.buyer).values_list('product_id', 'quantity')),
+            {self.chips.id: 4, self.soda.id: 1},
+        )
+
+    @override_settings(GUEST_CART_MAX_LINES=1)
+    def test_full_guest_cart_is_an_envelope_error(self):
+        """Test adding past the guest line limit returns the standard error response"""
+        self.client.post('/api/cart/add/', {'product_id': self.chips.id}, format='json')
+        response = self.client.post('/api/cart/add/', {'product_id': self.soda.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual((response.data['success'], response.data['data']), (False, {'max_lines': 1}))
+        self.assertIn('at most 1 products', response.data['error'])
+
+    def test_authenticated_read_creates_no_cart(self):
+        """Test reading an empty cart does not create the Cart row"""
+        self.client.force_authenticate(self.buyer)
+        response = self.client.get('/api/cart/')
+        self.assertEqual(response.data['data']['items'], [])
+        self.assertEqual(response.data['data']['user'], self.buyer.id)
+        self.assertFalse(Cart.objects.exists())
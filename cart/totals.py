@@ -0,0 +1,39 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import CartItem
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def line_total():
+    return ExpressionWrapper(F('quantity') * F('product__price'), output_field=MONEY)
+
+
+def cart_totals(items):
+    """
+    Return {'line_count', 'total_items', 'total_price'} for a CartItem
+    queryset with one aggregate query, priced at current product prices.
+    """
+    return items.aggregate(
+        line_count=Count('pk'),
+        total_items=Coalesce(Sum('quantity'), 0),
+        total_price=Coalesce(Sum(line_total()), Value(Decimal('0.00'), output_field=MONEY)),
+    )
+
+
+def with_totals(carts):
+    """
+    Annotate a Cart queryset with `items_quantity` and `items_price`
+    computed by correlated subqueries in the same SELECT.
+    """
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    return carts.annotate(
+        items_quantity=Coalesce(Subquery(items.annotate(total=Sum('quantity')).values('total')), 0),
+        items_price=Coalesce(
+            Subquery(items.annotate(total=Sum(line_total())).values('total'), output_field=MONEY),
+            Value(Decimal('0.00'), output_field=MONEY),
+        ),
+    )
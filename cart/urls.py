@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import CartView, AddToCartView, UpdateCartItemView, RemoveFromCartView
+from .views import CartView, CartSummaryView, AddToCartView, BatchAddToCartView, UpdateCartItemView, RemoveFromCartView
 
 urlpatterns = [
     path('', CartView.as_view(), name='cart-detail'),
+    path('summary/', CartSummaryView.as_view(), name='cart-summary'),
     path('add/', AddToCartView.as_view(), name='cart-add'),
+    path('add/batch/', BatchAddToCartView.as_view(), name='cart-add-batch'),
     path('update/<int:pk>/', UpdateCartItemView.as_view(), name='cart-item-update'),
     path('remove/<int:pk>/', RemoveFromCartView.as_view(), name='cart-item-remove'),
 ]
\ No newline at end of file
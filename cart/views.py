@@ -1,18 +1,45 @@
 from rest_framework import generics, status
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .models import Cart, CartItem
-from products.models import Product
-from .serializers import CartSerializer, CartItemSerializer
+from .serializers import CartSerializer, CartItemSerializer, CartSummarySerializer
+from .operations import MAX_BATCH_ITEMS, CartAddItemSerializer, ProductsNotFound
+from .guest import GuestCartFull, cart_store_for, guest_response
+from .store import CartBusy
+from .reservations import InsufficientStock
 from api.permissions import IsOwnerOrAdmin
+from api.prefetch import PlannedQuerysetMixin
 
-class CartView(generics.RetrieveAPIView):
+def insufficient_stock_response(exc):
+    return Response({
+        'success': False,
+        'data': {'available': [
+            {'product_id': product_id, 'available': available} for product_id, available in exc.available.items()
+        ]},
+        'error': 'Insufficient stock'
+    }, status=status.HTTP_409_CONFLICT)
+
+def cart_busy_response():
+    return Response({
+        'success': False,
+        'data': None,
+        'error': 'The cart is being changed by another request, please retry'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+def guest_cart_full_response(exc):
+    return Response({
+        'success': False,
+        'data': {'max_lines': exc.limit},
+        'error': str(exc)
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+class CartView(PlannedQuerysetMixin, generics.RetrieveAPIView):
     serializer_class = CartSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     
     def get_object(self):
-        cart, created = Cart.objects.get_or_create(user=self.request.user)
-        return cart
+        return cart_store_for(self.request).load(self.request.user, self.plan_queryset(Cart.objects.all()))
     
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -23,72 +50,142 @@ class CartView(generics.RetrieveAPIView):
             'error': None
         })
 
+class CartSummaryView(APIView):
+    """
+    Item count and total of the current user's (or guest's) cart for
+    header badges, from a single query.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        totals = cart_store_for(request).summary(request.user)
+        return Response({
+            'success': True,
+            'data': CartSummarySerializer(totals).data,
+            'error': None
+        })
+
 class AddToCartView(generics.CreateAPIView):
     serializer_class = CartItemSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     
     def create(self, request, *args, **kwargs):
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        product_id = request.data.get('product_id')
-        quantity = request.data.get('quantity', 1)
+        item = CartAddItemSerializer(data=request.data)
+        if not item.is_valid():
+            return Response({
+                'success': False,
+                'data': None,
+                'error': item.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
         
+        store = cart_store_for(request)
         try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
+            cart_item, = store.add(request.user, [item.validated_data], self.get_serializer_class())
+        except ProductsNotFound:
             return Response({
                 'success': False,
                 'data': None,
                 'error': 'Product not found'
             }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Check if item already in cart
-        cart_item, created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
-        )
-        
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
+        except InsufficientStock as exc:
+            return insufficient_stock_response(exc)
+        except GuestCartFull as exc:
+            return guest_cart_full_response(exc)
+        except CartBusy:
+            return cart_busy_response()
         
         serializer = self.get_serializer(cart_item)
-        return Response({
+        return guest_response(store, Response({
             'success': True,
             'data': serializer.data,
             'error': None
-        }, status=status.HTTP_201_CREATED)
+        }, status=status.HTTP_201_CREATED))
+
+class BatchAddToCartView(generics.CreateAPIView):
+    """
+    Add several products at once. The body is a list of
+    {product_id, quantity?} entries (or {"items": [...]}); repeated products
+    are summed. The batch is applied atomically with a constant number of
+    queries, and fails as a whole if any product does not exist.
+    """
+    serializer_class = CartItemSerializer
+    permission_classes = [AllowAny]
+    
+    def create(self, request, *args, **kwargs):
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        serializer = CartAddItemSerializer(data=items, many=True, max_length=MAX_BATCH_ITEMS, allow_empty=False)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'data': None,
+                'error': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        store = cart_store_for(request)
+        try:
+            cart_items = store.add(request.user, serializer.validated_data, self.get_serializer_class())
+        except ProductsNotFound as exc:
+            return Response({
+                'success': False,
+                'data': {'missing': exc.missing},
+                'error': 'Some products were not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        except InsufficientStock as exc:
+            return insufficient_stock_response(exc)
+        except GuestCartFull as exc:
+            return guest_cart_full_response(exc)
+        except CartBusy:
+            return cart_busy_response()
+        
+        return guest_response(store, Response({
+            'success': True,
+            'data': self.get_serializer(cart_items, many=True).data,
+            'error': None
+        }, status=status.HTTP_201_CREATED))
 
 class UpdateCartItemView(generics.UpdateAPIView):
     serializer_class = CartItemSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     
     def get_queryset(self):
         return CartItem.objects.filter(cart__user=self.request.user)
     
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
-        instance = self.get_object()
-        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer = self.get_serializer(data=request.data, partial=partial)
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        return Response({
+        store = cart_store_for(request)
+        if 'quantity' in serializer.validated_data:
+            try:
+                instance = store.set_quantity(
+                    request.user, kwargs['pk'], serializer.validated_data['quantity'], self.get_serializer_class()
+                )
+            except InsufficientStock as exc:
+                return insufficient_stock_response(exc)
+            except CartBusy:
+                return cart_busy_response()
+        else:
+            instance = store.item(request.user, kwargs['pk'], self.get_serializer_class())
+        return guest_response(store, Response({
             'success': True,
-            'data': serializer.data,
+            'data': self.get_serializer(instance).data,
             'error': None
-        })
+        }))
 
 class RemoveFromCartView(generics.DestroyAPIView):
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
     
     def get_queryset(self):
         return CartItem.objects.filter(cart__user=self.request.user)
     
     def destroy(self, request, *args, **kwargs):
-        instance = self.get_object()
-        self.perform_destroy(instance)
-        return Response({
+        store = cart_store_for(request)
+        try:
+            store.remove(request.user, kwargs['pk'])
+        except CartBusy:
+            return cart_busy_response()
+        return guest_response(store, Response({
             'success': True,
             'data': None,
             'error': None
-        }, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        }, status=status.HTTP_204_NO_CONTENT))
\ No newline at end of file
@@ -22,7 +22,7 @@ class Order(models.Model):
         return f"Order {self.id} - {self.user.username}"
 
 class OrderItem(models.Model):
-    order = models.ForeignKey('orders.Order', on_delete=models.CASCADE)
+    order = models.ForeignKey('orders.Order', on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)  # Price at time of purchase
@@ -1,3 +1,143 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APITestCase
+from rest_framework import status
+from cart.models import Cart, CartItem, StockReservation
+from cart.store import get_cart_store
+from sellers.models import SellerProfile
+from products.models import Category, Product
+from .models import Order, OrderItem
+
+User = get_user_model()
+
+
+class CheckoutFixtureMixin:
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user(
+            username='buyer', email='buyer@test.com', password='TestPass123!', role='buyer'
+        )
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        category = Category.objects.create(name='Snacks')
+        self.products = [
+            Product.objects.create(
+                title=f'Snack {number}', description='Snack', price=f'{number + 1}.50', stock=5,
+                category=category, seller=seller
+            )
+            for number in range(10)
+        ]
+        self.client.force_authenticate(self.buyer)
+
+    def fill_cart(self, count, quantity=2):
+        self.client.post('/api/cart/add/batch/', [
+            {'product_id': product.id, 'quantity': quantity} for product in self.products[:count]
+        ], format='json')
+
+    def checkout(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/orders/checkout/')
+        return response, len(queries)
+
+
+class CheckoutTestCase(CheckoutFixtureMixin, APITestCase):
+    def test_checkout_turns_the_cart_into_an_order(self):
+        """Test checkout orders every line at current prices and empties the cart"""
+        self.fill_cart(2)
+        Product.objects.filter(pk=self.products[0].pk).update(price='3.00')
+        response, _ = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data['data']['total_price']), Decimal('11.00'))
+        self.assertEqual(len(response.data['data']['items']), 2)
+
+        order = Order.objects.get()
+        self.assertEqual((order.user, order.total_price), (self.buyer, Decimal('11.00')))
+        self.assertEqual(
+            sorted(OrderItem.objects.values_list('product_id', 'quantity', 'price')),
+            [(self.products[0].id, 2, Decimal('3.00')), (self.products[1].id, 2, Decimal('2.50'))],
+        )
+        self.assertEqual(list(Product.objects.filter(pk__in=[p.pk for p in self.products[:2]])
+                              .values_list('stock', flat=True)), [3, 3])
+        self.assertFalse(CartItem.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+
+        response, _ = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_checkout_runs_constant_queries(self):
+        """Test a 2-line and a 10-line checkout take the same number of queries"""
+        self.fill_cart(2)
+        _, small = self.checkout()
+        self.fill_cart(10, quantity=1)
+        response, large = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(small, large)
+
+    def test_insufficient_stock_orders_nothing(self):
+        """Test a short product (counting other carts' holds) fails the whole checkout"""
+        self.fill_cart(2)
+        other = User.objects.create_user(
+            username='other', email='other@test.com', password='TestPass123!', role='buyer'
+        )
+        Product.objects.filter(pk=self.products[1].pk).update(stock=3)
+        cart = Cart.objects.create(user=other)
+        cart.items.create(product=self.products[1], quantity=2)
+        StockReservation.objects.create(
+            cart=cart, product=self.products[1], quantity=2,
+            expires_at=StockReservation.objects.get(product=self.products[1]).expires_at,
+        )
+
+        response, _ = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['data']['available'], [{'product_id': self.products[1].id, 'available': 1}])
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 5)
+        self.assertEqual(CartItem.objects.filter(cart__user=self.buyer).count(), 2)
+
+    def test_checkout_changes_product_etag(self):
+        """Test the stock taken by a checkout invalidates product ETags"""
+        product = self.products[0]
+        etag = self.client.get(f'/api/products/{product.id}/')['ETag']
+        self.fill_cart(1)
+        self.checkout()
+        response = self.client.get(f'/api/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['stock'], 3)
+
+
+@override_settings(CART_STORE='cart.store.CacheCartStore')
+class CacheCartStoreCheckoutTestCase(CheckoutFixtureMixin, APITestCase):
+    def setUp(self):
+        # The store refuses per-process caches; a file cache is shared
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shared = override_settings(CART_CACHE_ALIAS='carts', CACHES={**settings.CACHES, 'carts': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory,
+        }})
+        shared.enable()
+        self.addCleanup(shared.disable)
+        super().setUp()
+
+    def test_unflushed_lines_are_ordered_once(self):
+        """Test checkout orders cached lines and a later flush does not restore them"""
+        self.fill_cart(2)
+        self.assertFalse(CartItem.objects.exists())
+        response, _ = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['data']['items']), 2)
+        self.assertEqual(self.client.get('/api/cart/').data['data']['items'], [])
+        get_cart_store().flush()
+        self.assertFalse(CartItem.objects.exists())
+
+        self.fill_cart(1)
+        self.assertEqual(self.client.get('/api/cart/').data['data']['total_items'], 2)
@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import OrderListCreateView, OrderDetailView
+from .views import OrderListCreateView, CheckoutView, OrderDetailView
 
 urlpatterns = [
     path('', OrderListCreateView.as_view(), name='order-list-create'),
+    path('checkout/', CheckoutView.as_view(), name='order-checkout'),
     path('<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
 ]
\ No newline at end of file
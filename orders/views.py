@@ -3,9 +3,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from .models import Order, OrderItem
 from .serializers import OrderSerializer
+from .checkout import EmptyCart, OutOfStock, checkout
+from cart.store import CartBusy, get_cart_store
 from api.permissions import IsBuyerOrAdmin, IsOwnerOrAdmin
+from api.pagination import KeysetPaginationMixin
+from api.prefetch import PlannedQuerysetMixin
+from api.idempotency import IdempotentCreateMixin, idempotent_response
 
-class OrderListCreateView(generics.ListCreateAPIView):
+class OrderListCreateView(IdempotentCreateMixin, KeysetPaginationMixin, PlannedQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = OrderSerializer
     
     def get_permissions(self):
@@ -52,7 +57,56 @@ class OrderListCreateView(generics.ListCreateAPIView):
             'error': None
         }, status=status.HTTP_201_CREATED)
 
-class OrderDetailView(generics.RetrieveUpdateAPIView):
+class CheckoutView(PlannedQuerysetMixin, generics.GenericAPIView):
+    """
+    Place an order for everything in the current user's cart at current
+    prices. Stock is taken atomically; if any product falls short nothing
+    is ordered.
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [IsBuyerOrAdmin]
+    
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user)
+    
+    def post(self, request, *args, **kwargs):
+        try:
+            with get_cart_store().checkout_session(request.user):
+                return idempotent_response(request, self.place_order)
+        except CartBusy:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'The cart is being changed by another request, please retry'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    def place_order(self):
+        try:
+            order = checkout(self.request.user)
+        except EmptyCart:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'Cart is empty'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except OutOfStock as exc:
+            return Response({
+                'success': False,
+                'data': {'available': [
+                    {'product_id': product_id, 'available': available}
+                    for product_id, available in exc.available.items()
+                ]},
+                'error': 'Insufficient stock'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        order = self.plan_queryset(self.get_queryset()).get(pk=order.pk)
+        return Response({
+            'success': True,
+            'data': self.get_serializer(order).data,
+            'error': None
+        }, status=status.HTTP_201_CREATED)
+
+class OrderDetailView(PlannedQuerysetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     
@@ -3,8 +3,11 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import Payout
 from .serializers import PayoutSerializer
+from api.pagination import KeysetPaginationMixin
+from api.prefetch import PlannedQuerysetMixin
+from api.idempotency import IdempotentCreateMixin
 
-class PayoutListView(generics.ListCreateAPIView):
+class PayoutListView(IdempotentCreateMixin, KeysetPaginationMixin, PlannedQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = PayoutSerializer
     permission_classes = [IsAuthenticated]
     
@@ -53,7 +56,7 @@ class PayoutListView(generics.ListCreateAPIView):
             'error': None
         }, status=status.HTTP_201_CREATED)
 
-class PayoutDetailView(generics.RetrieveUpdateAPIView):
+class PayoutDetailView(PlannedQuerysetMixin, generics.RetrieveUpdateAPIView):
     serializer_class = PayoutSerializer
     permission_classes = [IsAuthenticated]
     
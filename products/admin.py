@@ -1,17 +1,24 @@
 from django.contrib import admin
+from django.db.models import F
+from django.db.models.functions import Now
 from .models import Category, Product
+from .signals import products_bulk_updated
+from api.cache import bump_catalog_version
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ('name', 'product_count', 'created_at', 'updated_at')
+    list_display = ('name', 'product_count', 'active_product_count', 'created_at', 'updated_at')
     search_fields = ('name', 'description')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('product_count', 'active_product_count', 'created_at', 'updated_at')
     ordering = ('name',)
     list_per_page = 25
+    
+    actions = ['recount_products']
 
-    @admin.display(description='Number of Products')
-    def product_count(self, obj):
-        return obj.products.count()
+    @admin.action(description="Recount products of selected categories")
+    def recount_products(self, request, queryset):
+        Category.recount_products(queryset.values('pk'))
+        bump_catalog_version()
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
@@ -27,14 +34,21 @@ class ProductAdmin(admin.ModelAdmin):
 
     @admin.action(description="Mark selected products as active")
     def make_active(self, request, queryset):
+        category_ids = list(queryset.order_by().values_list('category_id', flat=True).distinct())
         queryset.update(is_active=True)
+        # Bulk updates bypass the signals that maintain the counters and cache version
+        Category.recount_products(category_ids)
+        bump_catalog_version()
 
     @admin.action(description="Mark selected products as inactive")
     def make_inactive(self, request, queryset):
+        category_ids = list(queryset.order_by().values_list('category_id', flat=True).distinct())
         queryset.update(is_active=False)
+        Category.recount_products(category_ids)
+        bump_catalog_version()
 
     @admin.action(description="Restock selected products (+100 units)")
     def restock_products(self, request, queryset):
-        for product in queryset:
-            product.stock += 100
-            product.save()
\ No newline at end of file
+        product_ids = list(queryset.values_list('pk', flat=True))
+        Product.objects.filter(pk__in=product_ids).update(stock=F('stock') + 100, updated_at=Now())
+        products_bulk_updated.send(sender=Product, product_ids=product_ids)
\ No newline at end of file
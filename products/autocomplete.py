@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max
+
+from api.cache import cache_is_shared, catalog_version
+from .models import Category, Product
+from .search import tokenize
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 20
+# Prefixes this short match a large share of the index; their completions
+# are ranked once at build time
+SHORT_PREFIX_LENGTH = 2
+# Sorts after every character that can appear in a key
+PREFIX_END = '\U0010ffff'
+
+
+def normalize(text):
+    return ' '.join(tokenize(text))
+
+
+class PrefixIndex:
+    """
+    Sorted array of normalized keys answering prefix queries with bisect.
+
+    Every word position of a text is a key ("steel kettle", "kettle"), so
+    a query matches at the start of any word. Matches are ranked by
+    popularity with NumPy over the contiguous key range; ties go to the
+    alphabetically first key.
+    """
+
+    def __init__(self, entries):
+        # entries: (text, kind, id, popularity)
+        self.entries = []
+        popularity = []
+        keys = []
+        owners = []
+        for text, kind, pk, score in entries:
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            number = len(self.entries)
+            self.entries.append({'type': kind, 'id': pk, 'text': text})
+            popularity.append(score or 0)
+            for start in range(len(tokens)):
+                keys.append(' '.join(tokens[start:]))
+                owners.append(number)
+
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.keys = [keys[position] for position in order]
+        self.owners = np.array(owners, dtype=np.int64)[order] if order else np.empty(0, dtype=np.int64)
+        self.scores = np.array(popularity, dtype=np.float64)[self.owners]
+
+        self.short = {}
+        for key in self.keys:
+            for length in range(1, min(SHORT_PREFIX_LENGTH, len(key)) + 1):
+                prefix = key[:length]
+                if prefix not in self.short:
+                    self.short[prefix] = self._rank(*self._range(prefix), MAX_LIMIT)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _range(self, prefix):
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + PREFIX_END)
+
+    def _rank(self, lo, hi, limit):
+        """
+        Return the entry numbers of the `limit` most popular keys in
+        [lo, hi), without repeating an entry matched at several words.
+        """
+        width = hi - lo
+        scores = self.scores[lo:hi]
+        take = min(width, limit * 2)
+        while True:
+            if take < width:
+                positions = np.argpartition(-scores, take - 1)[:take]
+            else:
+                positions = np.arange(width)
+            positions = positions[np.lexsort((positions, -scores[positions]))]
+            owners = list(dict.fromkeys(self.owners[lo + positions].tolist()))
+            if len(owners) >= limit or take >= width:
+                return owners[:limit]
+            take = min(width, take * 4)
+
+    def complete(self, query, limit=10):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = min(limit, MAX_LIMIT)
+        if len(prefix) <= SHORT_PREFIX_LENGTH:
+            owners = self.short.get(prefix, [])[:limit]
+        else:
+            owners = self._rank(*self._range(prefix), limit)
+        return [self.entries[owner] for owner in owners]
+
+
+def build_index():
+    """
+    Index active product titles (ranked by number of ratings) and the
+    names of categories with active products (ranked by that count).
+    """
+    products = Product.objects.filter(is_active=True).values_list('title', 'id', 'rating_count')
+    categories = Category.objects.filter(active_product_count__gt=0).values_list(
+        'name', 'id', 'active_product_count'
+    )
+    return PrefixIndex(
+        [(title, 'product', pk, score) for title, pk, score in products.iterator(chunk_size=5000)]
+        + [(name, 'category', pk, score) for name, pk, score in categories]
+    )
+
+
+def index_version():
+    """
+    Stamp of the data the index is built from: the catalog version when
+    the cache is shared, otherwise the row counts and latest updated_at of
+    products and categories (writes in other workers never bump this
+    process's own catalog version).
+    """
+    if cache_is_shared():
+        return catalog_version()
+    products = Product.objects.aggregate(rows=Count('pk'), changed=Max('updated_at'))
+    categories = Category.objects.aggregate(rows=Count('pk'), changed=Max('updated_at'))
+    return products['rows'], products['changed'], categories['rows'], categories['changed']
+
+
+# (index, index_version() it was built at), replaced as a whole so a
+# reader never pairs an index with another build's version
+_current = (None, None)
+_checked_at = 0.0
+_build_lock = threading.Lock()
+
+
+def _rebuild(version):
+    """
+    Build the index and swap it in, then release _build_lock (which the
+    caller acquired). Runs in a background thread unless
+    AUTOCOMPLETE_BACKGROUND_REBUILD is off or there is no index yet.
+    """
+    global _current
+    try:
+        _current = (build_index(), version)
+    finally:
+        _build_lock.release()
+
+
+def _rebuild_in_background(version):
+    try:
+        _rebuild(version)
+    except Exception:
+        # Keep serving the previous index; the next version check retries
+        logger.exception('Autocomplete index rebuild failed')
+    finally:
+        # The thread's own database connection
+        connections.close_all()
+
+
+def get_index():
+    """
+    Return this process's index, rebuilding it when index_version() has
+    changed. The version is checked at most every
+    AUTOCOMPLETE_VERSION_CHECK_SECONDS. Only the first build blocks a
+    request; later ones run in a background thread while every request
+    keeps answering from the previous index until the new one is swapped in.
+    """
+    global _checked_at
+    index, built_version = _current
+    now = time.monotonic()
+    interval = getattr(settings, 'AUTOCOMPLETE_VERSION_CHECK_SECONDS', 1.0)
+    if index is not None and now - _checked_at < interval:
+        return index
+
+    # Read the version first: changes made during the build bump it again
+    version = index_version()
+    _checked_at = now
+    if index is not None and version == built_version:
+        return index
+    if not _build_lock.acquire(blocking=index is None):
+        # Another thread is rebuilding
+        return index
+    index, built_version = _current
+    if index is not None and built_version == version:
+        _build_lock.release()
+        return index
+    if index is None or not getattr(settings, 'AUTOCOMPLETE_BACKGROUND_REBUILD', True):
+        _rebuild(version)
+        return _current[0]
+    threading.Thread(
+        target=_rebuild_in_background, args=(version,), name='autocomplete-rebuild', daemon=True
+    ).start()
+    return index
+
+
+def autocomplete(query, limit=10):
+    return get_index().complete(query, limit)
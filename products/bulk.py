@@ -0,0 +1,264 @@
+import codecs
+import csv
+import json
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest, Now
+from rest_framework import serializers
+
+from .models import Category, Product
+from .signals import products_bulk_created, products_bulk_updated
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_BATCH_SIZE = 1000
+# Per-row errors returned to the caller; further failures are only counted
+MAX_REPORTED_ERRORS = 100
+# Rows written per UPDATE statement/transaction by bulk_update_products
+UPDATE_CHUNK_SIZE = 500
+
+
+class ProductImportRowSerializer(serializers.Serializer):
+    """
+    Validates one import row. `category` is a category id or exact name (a
+    number that is no category's id is taken as a name) and is resolved per
+    batch by `import_products`, not per row.
+    """
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'))
+    stock = serializers.IntegerField(min_value=0, default=0)
+    category = serializers.CharField(max_length=100)
+    image_url = serializers.URLField(required=False, allow_null=True)
+    is_active = serializers.BooleanField(default=True)
+
+
+class ProductBulkUpdateItemSerializer(serializers.Serializer):
+    """
+    One entry of a bulk price/stock update. `stock` sets an absolute level,
+    `stock_delta` adjusts the stored level (floored at zero).
+    """
+    id = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    stock_delta = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if 'stock' in attrs and 'stock_delta' in attrs:
+            raise serializers.ValidationError('Provide either stock or stock_delta, not both.')
+        if not {'price', 'stock', 'stock_delta'} & attrs.keys():
+            raise serializers.ValidationError('Provide at least one of price, stock or stock_delta.')
+        return attrs
+
+
+def detect_format(filename, fmt=None):
+    """
+    Return 'csv' or 'jsonl' from an explicit format or the file extension.
+    """
+    fmt = (fmt or filename.rsplit('.', 1)[-1]).lower()
+    if fmt in ('json', 'ndjson'):
+        fmt = 'jsonl'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported import format '{fmt}'. Use csv or jsonl.")
+    return fmt
+
+
+class _DecodedLines:
+    """
+    Decode a binary file lazily, line by line, so an upload is never read
+    into memory at once. Lines that are not UTF-8 are decoded with
+    replacement characters and their numbers collected in `invalid`.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.invalid = set()
+
+    def __iter__(self):
+        for line_number, line in enumerate(self.fileobj, start=1):
+            if line_number == 1 and line.startswith(codecs.BOM_UTF8):
+                line = line[len(codecs.BOM_UTF8):]
+            try:
+                yield line.decode('utf-8')
+            except UnicodeDecodeError:
+                self.invalid.add(line_number)
+                yield line.decode('utf-8', 'replace')
+
+    def invalid_since(self, line_number):
+        # Whether a line from `line_number` on was not UTF-8; forgets them
+        found = any(number >= line_number for number in self.invalid)
+        self.invalid.clear()
+        return found
+
+
+def iter_rows(fileobj, fmt):
+    """
+    Stream (line number, row dict) pairs from a binary CSV or JSONL file.
+    Malformed rows (invalid JSON or CSV, or bytes that are not UTF-8) are
+    yielded as a row with a '_parse_error' key.
+    """
+    lines = _DecodedLines(fileobj)
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        try:
+            # Read the header now so line numbers below start at the rows
+            reader.fieldnames
+        except csv.Error as exc:
+            yield 1, {'_parse_error': f'Invalid CSV header: {exc}'}
+            return
+        if lines.invalid_since(1):
+            yield 1, {'_parse_error': 'Header is not valid UTF-8'}
+            return
+        while True:
+            first_line = reader.line_num + 1
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as exc:
+                lines.invalid.clear()
+                yield first_line, {'_parse_error': f'Invalid CSV: {exc}'}
+                continue
+            if lines.invalid_since(first_line):
+                row = {'_parse_error': 'Row is not valid UTF-8'}
+            row.pop(None, None)
+            yield reader.line_num, row
+
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        if lines.invalid_since(line_number):
+            yield line_number, {'_parse_error': 'Line is not valid UTF-8'}
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = {'_parse_error': f'Invalid JSON: {exc}'}
+        if not isinstance(row, dict):
+            row = {'_parse_error': 'Each line must be a JSON object'}
+        yield line_number, row
+
+
+def _category_key(value):
+    return str(value).strip()
+
+
+def _resolve_categories(keys, known):
+    """
+    Add the categories for `keys` missing from `known` with one query. An
+    all-digit key is a category id, or a name when no category has that id.
+    """
+    missing = [key for key in keys if key not in known]
+    if not missing:
+        return
+    ids = [int(key) for key in missing if key.isdigit()]
+    matches = Category.objects.filter(Q(pk__in=ids) | Q(name__in=missing)).values_list('id', 'name')
+    by_id, by_name = {}, {}
+    for category_id, name in matches:
+        by_id[category_id] = category_id
+        by_name[name] = category_id
+    for key in missing:
+        category_id = by_id.get(int(key)) if key.isdigit() else None
+        known[key] = category_id if category_id is not None else by_name.get(key)
+
+
+def _clean(row):
+    # CSV has no null: treat empty cells as missing so defaults apply
+    return {key: value for key, value in row.items() if value not in ('', None)}
+
+
+def import_products(rows, seller, batch_size=DEFAULT_BATCH_SIZE, max_errors=MAX_REPORTED_ERRORS):
+    """
+    Validate and insert `rows` ((line number, dict) pairs) for `seller` in
+    batches. Each batch resolves its categories in one lookup and is
+    inserted with bulk_create in its own transaction, so memory stays flat
+    however long the input is.
+
+    Returns {'created', 'failed', 'errors'}; `errors` holds at most
+    `max_errors` entries of {'row', 'errors'}.
+    """
+    result = {'created': 0, 'failed': 0, 'errors': []}
+    categories = {}
+    rows = iter(rows)
+
+    def fail(line_number, errors):
+        result['failed'] += 1
+        if len(result['errors']) < max_errors:
+            result['errors'].append({'row': line_number, 'errors': errors})
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+
+        valid = []
+        for line_number, row in batch:
+            if '_parse_error' in row:
+                fail(line_number, {'non_field_errors': [row['_parse_error']]})
+                continue
+            serializer = ProductImportRowSerializer(data=_clean(row))
+            if serializer.is_valid():
+                valid.append((line_number, serializer.validated_data))
+            else:
+                fail(line_number, serializer.errors)
+
+        _resolve_categories({_category_key(data['category']) for _, data in valid}, categories)
+
+        products = []
+        for line_number, data in valid:
+            category_id = categories[_category_key(data['category'])]
+            if category_id is None:
+                fail(line_number, {'category': [f"Unknown category '{data['category']}'."]})
+                continue
+            products.append(Product(
+                title=data['title'],
+                description=data['description'],
+                price=data['price'],
+                stock=data['stock'],
+                category_id=category_id,
+                seller=seller,
+                image_url=data.get('image_url'),
+                is_active=data['is_active'],
+            ))
+
+        if products:
+            with transaction.atomic():
+                created = Product.objects.bulk_create(products)
+                products_bulk_created.send(sender=Product, products=created)
+            result['created'] += len(created)
+
+    return result
+
+
+def _update_chunk(items):
+    changes = {'updated_at': Now()}
+    prices = [When(pk=item['id'], then=Value(item['price'])) for item in items if 'price' in item]
+    if prices:
+        changes['price'] = Case(*prices, default=F('price'))
+    stocks = []
+    for item in items:
+        if 'stock' in item:
+            stocks.append(When(pk=item['id'], then=Value(item['stock'])))
+        elif 'stock_delta' in item:
+            stocks.append(When(pk=item['id'], then=Greatest(F('stock') + item['stock_delta'], Value(0))))
+    if stocks:
+        changes['stock'] = Case(*stocks, default=F('stock'), output_field=IntegerField())
+    return Product.objects.filter(pk__in=[item['id'] for item in items]).update(**changes)
+
+
+def bulk_update_products(items, chunk_size=UPDATE_CHUNK_SIZE):
+    """
+    Apply validated {id, price?, stock?, stock_delta?} entries with one
+    CASE-based UPDATE per chunk, each in its own transaction. Deltas are
+    applied in SQL, so concurrent orders and restocks do not lose updates.
+    Returns the number of rows updated.
+    """
+    updated = 0
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        with transaction.atomic():
+            updated += _update_chunk(chunk)
+            products_bulk_updated.send(sender=Product, product_ids=[item['id'] for item in chunk])
+    return updated
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import BooleanField, Case, CharField, Count, Q, Value, When
+
+FACETS = ('category', 'seller', 'price', 'in_stock')
+DEFAULT_PRICE_BUCKETS = (25, 50, 100, 250, 500)
+
+
+def price_buckets():
+    """
+    Return [(label, lower, upper)] for the configured price edges; the last
+    bucket is open-ended.
+    """
+    edges = [Decimal(str(edge)) for edge in getattr(settings, 'PRODUCT_PRICE_FACET_BUCKETS', DEFAULT_PRICE_BUCKETS)]
+    buckets = []
+    lower = Decimal('0')
+    for upper in edges:
+        buckets.append((f'{lower:g}-{upper:g}', lower, upper))
+        lower = upper
+    buckets.append((f'{lower:g}+', lower, None))
+    return buckets
+
+
+def parse_facets(value):
+    """
+    Split a `?facets=` value. Raises ValueError on unknown facet names.
+    """
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in FACETS]
+    if unknown:
+        raise ValueError(f"Unknown facets: {', '.join(unknown)}. Choose from {', '.join(FACETS)}.")
+    return list(dict.fromkeys(names))
+
+
+def compute_facets(queryset, names):
+    """
+    Count the filtered products per requested facet with one GROUP BY
+    query over every requested dimension, then fold the rows per facet.
+    """
+    buckets = price_buckets()
+    group_by = []
+    annotations = {}
+    if 'category' in names:
+        group_by += ['category_id', 'category__name']
+    if 'seller' in names:
+        group_by += ['seller_id', 'seller__store_name']
+    if 'price' in names:
+        annotations['price_bucket'] = Case(
+            *[When(Q(price__lt=upper), then=Value(label)) for label, lower, upper in buckets if upper is not None],
+            default=Value(buckets[-1][0]),
+            output_field=CharField(),
+        )
+        group_by.append('price_bucket')
+    if 'in_stock' in names:
+        annotations['has_stock'] = Case(
+            When(stock__gt=0, then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        )
+        group_by.append('has_stock')
+
+    rows = (
+        queryset.order_by()
+        .annotate(**annotations)
+        .values(*group_by)
+        .annotate(facet_count=Count('pk'))
+    )
+
+    categories, sellers, prices = {}, {}, {}
+    stock = {'true': 0, 'false': 0}
+    for row in rows:
+        count = row['facet_count']
+        if 'category' in names:
+            entry = categories.setdefault(row['category_id'], {'id': row['category_id'], 'name': row['category__name'], 'count': 0})
+            entry['count'] += count
+        if 'seller' in names:
+            entry = sellers.setdefault(row['seller_id'], {'id': row['seller_id'], 'name': row['seller__store_name'], 'count': 0})
+            entry['count'] += count
+        if 'price' in names:
+            prices[row['price_bucket']] = prices.get(row['price_bucket'], 0) + count
+        if 'in_stock' in names:
+            stock['true' if row['has_stock'] else 'false'] += count
+
+    facets = {}
+    if 'category' in names:
+        facets['category'] = sorted(categories.values(), key=lambda entry: (-entry['count'], entry['name']))
+    if 'seller' in names:
+        facets['seller'] = sorted(sellers.values(), key=lambda entry: (-entry['count'], entry['name']))
+    if 'price' in names:
+        facets['price'] = [
+            {'bucket': label, 'min': lower, 'max': upper, 'count': prices.get(label, 0)}
+            for label, lower, upper in buckets
+        ]
+    if 'in_stock' in names:
+        facets['in_stock'] = stock
+    return facets
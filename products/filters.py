@@ -0,0 +1,32 @@
+import django_filters
+from rest_framework import filters
+
+from .models import Product
+from .search import search_products
+
+
+class ProductFilter(django_filters.FilterSet):
+    min_price = django_filters.NumberFilter(field_name="price", lookup_expr='gte')
+    max_price = django_filters.NumberFilter(field_name="price", lookup_expr='lte')
+    in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+    min_rating = django_filters.NumberFilter(field_name="rating_avg", lookup_expr='gte')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'seller', 'is_active']
+
+    def filter_in_stock(self, queryset, name, value):
+        if value:
+            return queryset.filter(stock__gt=0)
+        return queryset.filter(stock=0)
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    `?search=` backed by the product token index instead of icontains scans.
+    Results are ordered by relevance unless an explicit `?ordering=` is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search_products(queryset, query)
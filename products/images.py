@@ -0,0 +1,153 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# name -> longest edge in pixels
+DEFAULT_THUMBNAIL_SIZES = {'small': 160, 'medium': 480, 'large': 1024}
+THUMBNAIL_FORMAT = 'WEBP'
+THUMBNAIL_EXTENSION = 'webp'
+THUMBNAIL_QUALITY = 80
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+ALLOWED_FORMATS = ('JPEG', 'MPO', 'PNG', 'WEBP', 'GIF')
+# Refuse decompression bombs well before Pillow's own limit
+MAX_PIXELS = 40_000_000
+
+
+class ImageProcessingError(Exception):
+    pass
+
+
+class ImageWorkerError(Exception):
+    """The worker pool timed out or died; the upload itself may be fine."""
+
+
+def thumbnail_sizes():
+    return getattr(settings, 'PRODUCT_THUMBNAIL_SIZES', DEFAULT_THUMBNAIL_SIZES)
+
+
+def render_thumbnails(data, sizes):
+    """
+    Decode `data` once and return {name: encoded bytes} for each
+    {name: longest edge} in `sizes`. Runs in a worker process.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        if image.format not in ALLOWED_FORMATS:
+            raise ImageProcessingError(f'Unsupported image format: {image.format}')
+        if image.width * image.height > MAX_PIXELS:
+            raise ImageProcessingError('Image dimensions are too large')
+        # Let JPEG decode at a reduced scale when every output is smaller
+        image.draft('RGB', (max(sizes.values()),) * 2)
+        image.load()
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise ImageProcessingError(f'Invalid image: {exc}')
+
+    image = ImageOps.exif_transpose(image)
+    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+    outputs = {}
+    # Shrink step by step from the largest size; each step reads a smaller source
+    source = image
+    for name, edge in sorted(sizes.items(), key=lambda item: -item[1]):
+        source = source.copy()
+        source.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        source.save(buffer, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY, method=4)
+        outputs[name] = buffer.getvalue()
+    return outputs
+
+
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    """
+    Lazily create the shared worker pool. A semaphore bounds jobs in
+    flight so a burst of uploads queues in request threads instead of
+    piling encoded images up in memory.
+    """
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'PRODUCT_IMAGE_WORKERS', None) or min(4, os.cpu_count() or 1)
+            _executor = ProcessPoolExecutor(max_workers=workers)
+            _slots = threading.BoundedSemaphore(workers * 2)
+    return _executor, _slots
+
+
+def _discard_pool(executor):
+    """
+    Drop `executor` so the next upload starts a fresh pool. Jobs already
+    queued on it are left to finish (or fail) without waiting for them.
+    """
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is not executor:
+            # Another thread already replaced it
+            return
+        _executor = _slots = None
+    executor.shutdown(wait=False)
+
+
+def thumbnail_name(image_hash, size_name):
+    return f'products/{image_hash[:2]}/{image_hash}/{size_name}.{THUMBNAIL_EXTENSION}'
+
+
+def thumbnail_urls(image_hash):
+    if not image_hash:
+        return None
+    return {name: default_storage.url(thumbnail_name(image_hash, name)) for name in thumbnail_sizes()}
+
+
+def store_product_image(upload, timeout=30):
+    """
+    Create the thumbnails of an uploaded image and return its content hash.
+
+    Files are addressed by the SHA-256 of the upload, so re-uploading the
+    same image (for any product) reuses the stored thumbnails without
+    decoding it again. Decoding, resizing and encoding run in the process
+    pool; the calling thread only hashes and writes bytes. Raises
+    ImageProcessingError for a bad upload and ImageWorkerError when the
+    pool times out or breaks, in which case it is replaced.
+    """
+    if upload.size > MAX_UPLOAD_BYTES:
+        raise ImageProcessingError(f'Images may be at most {MAX_UPLOAD_BYTES // (1024 * 1024)} MB')
+
+    data = upload.read()
+    image_hash = hashlib.sha256(data).hexdigest()
+    sizes = thumbnail_sizes()
+    missing = {
+        name: edge for name, edge in sizes.items()
+        if not default_storage.exists(thumbnail_name(image_hash, name))
+    }
+    if not missing:
+        return image_hash
+
+    executor, slots = _pool()
+    try:
+        with slots:
+            outputs = executor.submit(render_thumbnails, data, sizes).result(timeout=timeout)
+    except FutureTimeoutError:
+        # The stuck worker would keep holding a process; start over
+        _discard_pool(executor)
+        raise ImageWorkerError('Image processing timed out, please try again')
+    except BrokenProcessPool:
+        _discard_pool(executor)
+        raise ImageWorkerError('Image processing is temporarily unavailable, please try again')
+    for name in missing:
+        path = thumbnail_name(image_hash, name)
+        # A concurrent upload of the same image may have written it meanwhile
+        if not default_storage.exists(path):
+            default_storage.save(path, ContentFile(outputs[name]))
+    return image_hash
@@ -0,0 +1,83 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from accounts.models import User
+from sellers.models import SellerProfile
+from products.models import Category, Product
+from products.search import index_products, search_products
+
+COMMON_WORDS = [
+    'premium', 'deluxe', 'basic', 'wireless', 'organic', 'steel', 'cotton', 'leather',
+    'compact', 'portable', 'smart', 'classic', 'vintage', 'ultra', 'eco', 'pro',
+]
+SYLLABLES = [
+    'ka', 'lo', 'mi', 'ten', 'vra', 'zu', 'pel', 'dor', 'qui', 'sam', 'bex', 'nor',
+    'tal', 'ri', 'gon', 'fay', 'hul', 'jin', 'wex', 'yar', 'cos', 'dri', 'mup', 'ost',
+]
+# Brand/model style vocabulary: each word appears in only a small share of the catalog
+RARE_WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare token-index search against icontains scans on synthetic catalogs. '
+        'All generated rows are rolled back when the command finishes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Catalog sizes to measure (cumulative)')
+        parser.add_argument('--queries', type=int, default=25,
+                            help='Number of timed queries per size')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with transaction.atomic():
+            user = User.objects.create_user(
+                username='search-benchmark', email='search-benchmark@example.com', password=None
+            )
+            seller = SellerProfile.objects.create(user=user, store_name='Benchmark Store')
+            category = Category.objects.create(name='Search Benchmark')
+
+            self.stdout.write(f"{'products':>10} {'index ms':>10} {'icontains ms':>14}")
+            created = 0
+            for size in sorted(options['sizes']):
+                created = self._seed(rng, seller, category, created, size, options['batch_size'])
+                terms = [rng.choice(RARE_WORDS) for _ in range(options['queries'])]
+                indexed = self._time(lambda term: search_products(Product.objects.all(), term), terms)
+                scanned = self._time(lambda term: Product.objects.filter(title__icontains=term)
+                                     | Product.objects.filter(description__icontains=term), terms)
+                self.stdout.write(f'{size:>10} {indexed:>10.2f} {scanned:>14.2f}')
+
+            transaction.set_rollback(True)
+
+    def _seed(self, rng, seller, category, start, size, batch_size):
+        while start < size:
+            count = min(batch_size, size - start)
+            products = Product.objects.bulk_create([
+                Product(
+                    title=' '.join(rng.sample(COMMON_WORDS, 2) + rng.sample(RARE_WORDS, 2)),
+                    description=' '.join(rng.choices(COMMON_WORDS, k=10) + rng.choices(RARE_WORDS, k=2)),
+                    price=rng.randint(100, 50000) / 100,
+                    stock=rng.randint(0, 100),
+                    category=category,
+                    seller=seller,
+                )
+                for i in range(count)
+            ])
+            index_products(products)
+            start += count
+        return start
+
+    def _time(self, build_queryset, terms):
+        timings = []
+        for term in terms:
+            started = time.perf_counter()
+            # Fetch the first page, as the list endpoint does
+            list(build_queryset(term)[:20].values_list('id', flat=True))
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
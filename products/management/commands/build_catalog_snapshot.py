@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from api.cache import cache_backend_is_shared, catalog_version
+from products.snapshot import build_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = 'Write the memory-mapped product snapshot that narrow product reads are served from'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Snapshot file (default: CATALOG_SNAPSHOT_PATH)')
+        parser.add_argument('--watch', type=float, metavar='SECONDS',
+                            help='Keep running and rebuild whenever the catalog version changes, '
+                                 'checking every SECONDS')
+
+    def handle(self, *args, **options):
+        if not cache_backend_is_shared():
+            raise CommandError(
+                'The snapshot is stamped with the catalog version, which this command and the '
+                'workers can only share through a cache outside their processes. Set CACHE_URL '
+                'to a shared backend such as Redis; a per-process cache never matches the stamp, '
+                'even with CATALOG_CACHE_SINGLE_PROCESS.'
+            )
+        path = options['path'] or snapshot_path()
+        built = None
+        while True:
+            if built != catalog_version():
+                started = time.perf_counter()
+                built = build_snapshot(path)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(self.style.SUCCESS(
+                    f'Wrote catalog snapshot version {built} to {path} in {elapsed:.2f}s'
+                ))
+            if not options['watch']:
+                return
+            time.sleep(options['watch'])
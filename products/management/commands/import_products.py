@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.bulk import DEFAULT_BATCH_SIZE, detect_format, iter_rows, import_products
+from sellers.models import SellerProfile
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products for a seller from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file to import')
+        parser.add_argument('--seller', required=True,
+                            help='Seller profile id or the seller\'s username')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help='Number of rows validated and inserted per batch')
+
+    def handle(self, *args, **options):
+        seller_ref = options['seller']
+        lookup = {'pk': seller_ref} if seller_ref.isdigit() else {'user__username': seller_ref}
+        try:
+            seller = SellerProfile.objects.get(**lookup)
+        except SellerProfile.DoesNotExist:
+            raise CommandError(f"Seller '{seller_ref}' not found")
+
+        try:
+            fmt = detect_format(options['path'], options['format'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        with open(options['path'], 'rb') as fileobj:
+            result = import_products(iter_rows(fileobj, fmt), seller, batch_size=options['batch_size'])
+
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if result['failed'] > len(result['errors']):
+            self.stderr.write(f"... {result['failed'] - len(result['errors'])} more rows failed")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} products ({result['failed']} rows failed)"
+        ))
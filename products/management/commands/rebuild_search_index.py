@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products.models import Product, ProductSearchToken
+from products.search import index_products
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search token index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of products indexed per batch')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            ProductSearchToken.objects.all().delete()
+            batch = []
+            indexed = 0
+            products = Product.objects.only('id', 'title', 'description').iterator(chunk_size=batch_size)
+            for product in products:
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    index_products(batch)
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                index_products(batch)
+                indexed += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} products'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored product counters on every category'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report categories whose counters have drifted')
+
+    def handle(self, *args, **options):
+        drifted = (
+            Category.objects
+            .annotate(
+                actual_total=Count('products'),
+                actual_active=Count('products', filter=Q(products__is_active=True)),
+            )
+            .filter(~Q(product_count=F('actual_total')) | ~Q(active_product_count=F('actual_active')))
+        )
+        drifted_ids = []
+        for category in drifted:
+            drifted_ids.append(category.pk)
+            self.stdout.write(
+                f'{category.name}: stored {category.product_count}/{category.active_product_count}, '
+                f'actual {category.actual_total}/{category.actual_active}'
+            )
+
+        if options['dry_run']:
+            return
+
+        # Only rewrite the drifted rows, so untouched categories keep their updated_at
+        updated = Category.recount_products(drifted_ids)
+        self.stdout.write(self.style.SUCCESS(f'Reconciled product counts for {updated} categories'))
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:33
+
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, FloatField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('reviews', 'Review')
+    stats = (
+        Review.objects
+        .filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(
+            total=Sum('rating'),
+            count=Count('pk'),
+            **{f'stars_{star}': Count('pk', filter=Q(rating=star)) for star in range(1, 6)}
+        )
+    )
+
+    def stat(name):
+        return Coalesce(Subquery(stats.values(name)), 0)
+
+    average = Round(Cast(stat('total'), FloatField()) / NullIf(stat('count'), 0), 2)
+    Product.objects.update(
+        rating_count=stat('count'),
+        rating_sum=stat('total'),
+        rating_avg=Coalesce(Cast(average, DecimalField(max_digits=3, decimal_places=2)), 0),
+        **{f'rating_{star}_count': stat(f'stars_{star}') for star in range(1, 6)}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_category_product_counts'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,13 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Now
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True, null=True)
+    # Denormalized counters maintained by products.signals
+    product_count = models.PositiveIntegerField(default=0)
+    active_product_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -11,6 +16,31 @@ class Category(models.Model):
     
     def __str__(self):
         return self.name
+    
+    @classmethod
+    def recount_products(cls, category_ids=None):
+        """
+        Recompute the stored product counters from the products table in a
+        single UPDATE. Returns the number of categories written.
+        """
+        counts = (
+            Product.objects
+            .filter(category=OuterRef('pk'))
+            .order_by()
+            .values('category')
+            .annotate(
+                total=Count('pk'),
+                active=Count('pk', filter=Q(is_active=True)),
+            )
+        )
+        queryset = cls.objects.all()
+        if category_ids is not None:
+            queryset = queryset.filter(pk__in=category_ids)
+        return queryset.update(
+            product_count=Coalesce(Subquery(counts.values('total')), 0),
+            active_product_count=Coalesce(Subquery(counts.values('active')), 0),
+            updated_at=Now(),
+        )
 
 class Product(models.Model):
     title = models.CharField(max_length=200)
@@ -20,9 +50,42 @@ class Product(models.Model):
     category = models.ForeignKey('products.Category', on_delete=models.CASCADE, related_name='products')
     seller = models.ForeignKey('sellers.SellerProfile', on_delete=models.CASCADE, related_name='products')
     image_url = models.URLField(blank=True, null=True)
+    # SHA-256 of the uploaded image; thumbnails live under products/<hash>/
+    image_hash = models.CharField(max_length=64, blank=True, default='')
     is_active = models.BooleanField(default=True)
+    # Review aggregates maintained by reviews.signals
+    rating_avg = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+    
+    @property
+    def rating_histogram(self):
+        return {str(star): getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+
+class ProductSearchToken(models.Model):
+    """
+    Inverted index entry mapping a normalized token to a product.
+    Maintained by products.signals; queried by products.search.
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='search_tokens')
+    token = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ('product', 'token')
+        indexes = [
+            models.Index(fields=['token', 'product'], name='products_search_token_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.product_id} ({self.weight})"
@@ -0,0 +1,101 @@
+import re
+from collections import Counter
+
+from django.db.models import OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import ProductSearchToken
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TOKEN_LENGTH = ProductSearchToken._meta.get_field('token').max_length
+
+# Title matches outrank description matches
+TITLE_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+
+def tokenize(text):
+    """
+    Split text into lower-cased word tokens, truncated to the index column width.
+    """
+    if not text:
+        return []
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall(text.lower())]
+
+
+def weigh_text(title, description):
+    """
+    Return a {token: weight} mapping for a title and description.
+    """
+    weights = Counter()
+    for token in tokenize(title):
+        weights[token] += TITLE_WEIGHT
+    for token in tokenize(description):
+        weights[token] += DESCRIPTION_WEIGHT
+    return weights
+
+
+def build_tokens(product):
+    """
+    Return a {token: weight} mapping for a product's title and description.
+    """
+    return weigh_text(product.title, product.description)
+
+
+def index_product(product):
+    """
+    Replace the index entries of a single product.
+    """
+    ProductSearchToken.objects.filter(product=product).delete()
+    ProductSearchToken.objects.bulk_create([
+        ProductSearchToken(product=product, token=token, weight=weight)
+        for token, weight in build_tokens(product).items()
+    ])
+
+
+def index_products(products, batch_size=1000):
+    """
+    Replace the index entries of many products with batched inserts.
+    """
+    products = list(products)
+    ProductSearchToken.objects.filter(product__in=[p.pk for p in products]).delete()
+    entries = [
+        ProductSearchToken(product_id=product.pk, token=token, weight=weight)
+        for product in products
+        for token, weight in build_tokens(product).items()
+    ]
+    ProductSearchToken.objects.bulk_create(entries, batch_size=batch_size)
+
+
+def token_prefix_q(term):
+    # A range predicate (rather than LIKE 'term%') lets every backend use the token index
+    return Q(token__gte=term, token__lt=term + '\uffff')
+
+
+def search_products(queryset, query):
+    """
+    Restrict a product queryset to products matching every term of the query
+    (prefix match per term) and order it by summed token weight.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return queryset
+
+    any_term = Q()
+    for term in terms:
+        term_q = token_prefix_q(term)
+        queryset = queryset.filter(
+            pk__in=ProductSearchToken.objects.filter(term_q).values('product_id')
+        )
+        any_term |= term_q
+
+    rank = (
+        ProductSearchToken.objects
+        .filter(any_term, product=OuterRef('pk'))
+        .values('product')
+        .annotate(total=Sum('weight'))
+        .values('total')
+    )
+    return queryset.annotate(
+        search_rank=Coalesce(Subquery(rank), 0)
+    ).order_by('-search_rank', '-created_at', '-pk')
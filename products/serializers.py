@@ -1,22 +1,35 @@
 from rest_framework import serializers
 from .models import Category, Product
+from .images import thumbnail_urls
+from api.sparse import SparseFieldsetMixin
 
 class CategorySerializer(serializers.ModelSerializer):
-    products_count = serializers.SerializerMethodField()
+    products_count = serializers.IntegerField(source='product_count', read_only=True)
     
     class Meta:
         model = Category
-        fields = '__all__'
-        
-    def get_products_count(self, obj):
-        return obj.products.count()
+        # The stored product_count is exposed as products_count
+        exclude = ('product_count',)
+        read_only_fields = ('id', 'active_product_count', 'created_at', 'updated_at')
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     seller_name = serializers.CharField(source='seller.store_name', read_only=True)
     seller_id = serializers.IntegerField(source='seller.id', read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
+    thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
-        fields = '__all__'
-        read_only_fields = ('id', 'created_at', 'updated_at')
\ No newline at end of file
+        exclude = (
+            'image_hash', 'rating_sum', 'rating_1_count', 'rating_2_count', 'rating_3_count',
+            'rating_4_count', 'rating_5_count',
+        )
+        read_only_fields = ('id', 'rating_avg', 'rating_count', 'created_at', 'updated_at')
+        field_sources = {
+            'thumbnails': ('image_hash',),
+            'rating_histogram': tuple(f'rating_{star}_count' for star in range(1, 6)),
+        }
+    
+    def get_thumbnails(self, obj):
+        return thumbnail_urls(obj.image_hash)
@@ -0,0 +1,107 @@
+from collections import Counter
+
+from django.db.models import F
+from django.db.models.functions import Now
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import Category, Product
+from .search import index_product, index_products
+
+# Product fields whose previous value is captured before each save
+TRACKED_FIELDS = ('title', 'description', 'is_active', 'category_id')
+
+# Sent after Product.objects.bulk_create(), which skips post_save.
+# Receivers get `products`: the created instances, with primary keys set.
+products_bulk_created = Signal()
+
+# Sent after set-based price/stock updates that skip post_save.
+# Receivers get `product_ids`.
+products_bulk_updated = Signal()
+
+
+@receiver(pre_save, sender=Product)
+def capture_previous_state(sender, instance, raw=False, **kwargs):
+    """
+    Remember the stored values of tracked fields so post_save handlers can
+    tell what actually changed.
+    """
+    instance._previous_state = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_state = (
+        Product.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+    )
+
+
+def changed_fields(instance):
+    """
+    Return the tracked fields changed by the current save, or None when the
+    previous state is unknown (new products, raw saves).
+    """
+    previous = getattr(instance, '_previous_state', None)
+    if previous is None:
+        return None
+    return {field for field in TRACKED_FIELDS if previous[field] != getattr(instance, field)}
+
+
+@receiver(post_save, sender=Product)
+def update_search_index(sender, instance, created, raw=False, **kwargs):
+    """
+    Keep the product search index in sync with title/description edits.
+    Index rows are removed with the product through the FK cascade.
+    """
+    if raw:
+        return
+    changed = changed_fields(instance)
+    if changed is not None and not changed & {'title', 'description'}:
+        return
+    index_product(instance)
+
+
+def adjust_category_counts(category_id, delta, is_active):
+    """
+    Apply a +/- delta to a category's counters with an F() expression so
+    concurrent writers do not lose updates.
+    """
+    # Category ETags and Last-Modified follow the counters and updated_at
+    changes = {'product_count': F('product_count') + delta, 'updated_at': Now()}
+    if is_active:
+        changes['active_product_count'] = F('active_product_count') + delta
+    Category.objects.filter(pk=category_id).update(**changes)
+
+
+@receiver(post_save, sender=Product)
+def update_category_counts(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_category_counts(instance.category_id, 1, instance.is_active)
+        return
+    previous = getattr(instance, '_previous_state', None)
+    if previous is None or not changed_fields(instance) & {'category_id', 'is_active'}:
+        return
+    adjust_category_counts(previous['category_id'], -1, previous['is_active'])
+    adjust_category_counts(instance.category_id, 1, instance.is_active)
+
+
+@receiver(post_delete, sender=Product)
+def decrement_category_counts(sender, instance, **kwargs):
+    adjust_category_counts(instance.category_id, -1, instance.is_active)
+
+
+@receiver(products_bulk_created)
+def sync_bulk_created_products(sender, products, **kwargs):
+    """
+    Index and count a batch of bulk-created products with one write per
+    table/category instead of one per product.
+    """
+    index_products(products)
+    totals = Counter(product.category_id for product in products)
+    active = Counter(product.category_id for product in products if product.is_active)
+    for category_id, total in totals.items():
+        Category.objects.filter(pk=category_id).update(
+            product_count=F('product_count') + total,
+            active_product_count=F('active_product_count') + active[category_id],
+            updated_at=Now(),
+        )
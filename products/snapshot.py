@@ -0,0 +1,342 @@
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+from django.conf import settings
+
+from api.cache import cache_backend_is_shared, catalog_version
+from sellers.models import SellerProfile
+from .models import Category, Product
+
+MAGIC = b'BZSNAP01'
+ALIGNMENT = 64
+
+# ProductSerializer fields a snapshot row can render
+SNAPSHOT_FIELDS = frozenset((
+    'id', 'title', 'price', 'stock', 'category', 'category_name',
+    'seller', 'seller_id', 'seller_name', 'is_active',
+))
+# Listing parameters answered from the snapshot; any other parameter
+# (search, facets, cursor pagination, rating filters...) goes to the ORM
+LIST_PARAMS = frozenset((
+    'page', 'page_size', 'fields', 'omit', 'ordering',
+    'category', 'seller', 'is_active', 'min_price', 'max_price', 'in_stock',
+))
+DETAIL_PARAMS = frozenset(('fields', 'omit'))
+ORDERING_FIELDS = ('price', 'title', 'created_at')
+
+
+def snapshot_path():
+    return getattr(settings, 'CATALOG_SNAPSHOT_PATH', None)
+
+
+def _strings(values):
+    """
+    Encode strings as (offsets, utf-8 bytes): value i is data[offsets[i]:offsets[i + 1]].
+    """
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _columns():
+    products = list(
+        Product.objects.order_by('id').values_list(
+            'id', 'title', 'price', 'stock', 'category_id', 'seller_id', 'is_active', 'created_at'
+        ).iterator(chunk_size=5000)
+    )
+    categories = list(Category.objects.order_by('id').values_list('id', 'name'))
+    sellers = list(SellerProfile.objects.order_by('id').values_list('id', 'store_name'))
+
+    ids, titles, prices, stock, category_ids, seller_ids, active, created = (
+        zip(*products) if products else ([],) * 8
+    )
+    title_offsets, title_data = _strings(titles)
+    # Rank of each row in title order, so sorting by title never decodes strings
+    title_rank = np.empty(len(titles), dtype=np.int64)
+    title_rank[sorted(range(len(titles)), key=titles.__getitem__)] = np.arange(len(titles))
+    category_offsets, category_data = _strings([name for _, name in categories])
+    seller_offsets, seller_data = _strings([name for _, name in sellers])
+    return {
+        'id': np.array(ids, dtype=np.int64),
+        'price_cents': np.array([int(price * 100) for price in prices], dtype=np.int64),
+        'stock': np.array(stock, dtype=np.int64),
+        'category_id': np.array(category_ids, dtype=np.int64),
+        'seller_id': np.array(seller_ids, dtype=np.int64),
+        'is_active': np.array(active, dtype=np.bool_),
+        'created_at': np.array([int(value.timestamp() * 1_000_000) for value in created], dtype=np.int64),
+        'title_rank': title_rank,
+        'title_offsets': title_offsets,
+        'title_data': title_data,
+        'categories': np.array([pk for pk, _ in categories], dtype=np.int64),
+        'category_offsets': category_offsets,
+        'category_data': category_data,
+        'sellers': np.array([pk for pk, _ in sellers], dtype=np.int64),
+        'seller_offsets': seller_offsets,
+        'seller_data': seller_data,
+    }
+
+
+def build_snapshot(path=None):
+    """
+    Write every product (with its category and seller names) to a
+    column-per-array snapshot file and atomically replace the previous one.
+
+    The file is stamped with the catalog version read before the rows, so a
+    write that lands during the build leaves the snapshot stale rather than
+    wrongly current. Returns the version written.
+    """
+    path = path or snapshot_path()
+    version = catalog_version()
+    columns = _columns()
+
+    layout = {}
+    offset = 0
+    for name, array in columns.items():
+        layout[name] = {'dtype': array.dtype.str, 'count': len(array), 'offset': offset}
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({'version': version, 'count': len(columns['id']), 'columns': layout}).encode('utf-8')
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(MAGIC + struct.pack('<Q', len(header)) + header)
+            for name, array in columns.items():
+                handle.seek(data_start + layout[name]['offset'])
+                handle.write(array.tobytes())
+            handle.truncate(data_start + offset)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return version
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of a snapshot file. Columns are NumPy arrays over one
+    shared mmap, so every worker process reads the same page-cache pages.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as handle:
+            stat = os.fstat(handle.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path} is not a catalog snapshot')
+        (header_length,) = struct.unpack_from('<Q', self._map, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        header = json.loads(self._map[header_start:header_start + header_length])
+        data_start = -(-(header_start + header_length) // ALIGNMENT) * ALIGNMENT
+
+        self.version = header['version']
+        self.count = header['count']
+        for name, column in header['columns'].items():
+            setattr(self, name, np.frombuffer(
+                self._map, dtype=np.dtype(column['dtype']), count=column['count'],
+                offset=data_start + column['offset'],
+            ))
+
+    @staticmethod
+    def _string(offsets, data, position):
+        return data[offsets[position]:offsets[position + 1]].tobytes().decode('utf-8')
+
+    def _lookup(self, table, offsets, data, pk):
+        position = int(np.searchsorted(table, pk))
+        return self._string(offsets, data, position)
+
+    def has_category(self, pk):
+        position = np.searchsorted(self.categories, pk)
+        return position < len(self.categories) and self.categories[position] == pk
+
+    def has_seller(self, pk):
+        position = np.searchsorted(self.sellers, pk)
+        return position < len(self.sellers) and self.sellers[position] == pk
+
+    def position_of(self, pk):
+        position = int(np.searchsorted(self.id, pk))
+        if position < self.count and self.id[position] == pk:
+            return position
+        return None
+
+    def row(self, position):
+        """
+        Render a row the way ProductSerializer renders these fields.
+        """
+        category, seller = int(self.category_id[position]), int(self.seller_id[position])
+        return {
+            'id': int(self.id[position]),
+            'title': self._string(self.title_offsets, self.title_data, position),
+            'price': str(Decimal(int(self.price_cents[position])).scaleb(-2)),
+            'stock': int(self.stock[position]),
+            'category': category,
+            'category_name': self._lookup(self.categories, self.category_offsets, self.category_data, category),
+            'seller': seller,
+            'seller_id': seller,
+            'seller_name': self._lookup(self.sellers, self.seller_offsets, self.seller_data, seller),
+            'is_active': bool(self.is_active[position]),
+        }
+
+    def select(self, category=None, seller=None, is_active=None, min_cents=None, max_cents=None,
+               in_stock=None, ordering=()):
+        """
+        Return the row positions matching the filters, sorted by `ordering`
+        (names from ORDERING_FIELDS, '-' for descending) and then by id.
+        """
+        mask = np.ones(self.count, dtype=np.bool_)
+        if category is not None:
+            mask &= self.category_id == category
+        if seller is not None:
+            mask &= self.seller_id == seller
+        if is_active is not None:
+            mask &= self.is_active == is_active
+        if min_cents is not None:
+            mask &= self.price_cents >= min_cents
+        if max_cents is not None:
+            mask &= self.price_cents <= max_cents
+        if in_stock is not None:
+            mask &= (self.stock > 0) if in_stock else (self.stock == 0)
+        positions = np.flatnonzero(mask)
+        if not ordering or not len(positions):
+            return positions
+
+        sort_columns = {'price': self.price_cents, 'title': self.title_rank, 'created_at': self.created_at}
+        keys = []
+        for term in ordering:
+            values = sort_columns[term.lstrip('-')][positions]
+            keys.append(-values if term.startswith('-') else values)
+        # lexsort sorts by the last key first; positions (id order) break ties
+        return positions[np.lexsort([positions] + keys[::-1])]
+
+
+class SnapshotRows:
+    """
+    Lazy sequence of rendered rows for Paginator: only the requested page
+    is decoded.
+    """
+
+    def __init__(self, snapshot, positions, fields):
+        self.snapshot = snapshot
+        self.positions = positions
+        self.fields = fields
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _render(self, position):
+        row = self.snapshot.row(int(position))
+        return {name: row[name] for name in self.fields}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._render(position) for position in self.positions[index]]
+        return self._render(self.positions[index])
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def current_snapshot():
+    """
+    Return this process's snapshot if its stamp matches the catalog
+    version, reopening the file when it has been replaced; None otherwise.
+    The stamp comes from the build command's process, so it can only match
+    on a cache backend that process shares; CATALOG_CACHE_SINGLE_PROCESS
+    does not make a LocMem cache shared with a management command.
+    """
+    global _snapshot
+    path = snapshot_path()
+    if not path or not cache_backend_is_shared():
+        return None
+    version = catalog_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if snapshot is None or snapshot.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+        with _lock:
+            snapshot = _snapshot = CatalogSnapshot(path)
+    return snapshot if snapshot.version == version else None
+
+
+def _boolean(value):
+    return {'true': True, 'false': False}[value]
+
+
+def _cents(value, rounding):
+    return int((Decimal(value) * 100).to_integral_value(rounding=rounding))
+
+
+def snapshot_listing(request, fields):
+    """
+    Answer a product listing from the snapshot, or return None when the
+    request needs the ORM (unsupported parameters or fields, invalid
+    values, or no current snapshot). Invalid values are left to the ORM
+    path so error responses stay the same.
+    """
+    params = request.query_params
+    if not set(fields) <= SNAPSHOT_FIELDS or not set(params) <= LIST_PARAMS:
+        return None
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return None
+
+    filters = {}
+    try:
+        for name in ('category', 'seller'):
+            if params.get(name):
+                filters[name] = int(params[name])
+        if params.get('is_active'):
+            filters['is_active'] = _boolean(params['is_active'])
+        if params.get('in_stock'):
+            filters['in_stock'] = _boolean(params['in_stock'])
+        if params.get('min_price'):
+            filters['min_cents'] = _cents(params['min_price'], 'ROUND_CEILING')
+        if params.get('max_price'):
+            filters['max_cents'] = _cents(params['max_price'], 'ROUND_FLOOR')
+    except (KeyError, ValueError, OverflowError, InvalidOperation):
+        return None
+    if 'category' in filters and not snapshot.has_category(filters['category']):
+        return None
+    if 'seller' in filters and not snapshot.has_seller(filters['seller']):
+        return None
+
+    ordering = []
+    for term in params.get('ordering', '').split(','):
+        term = term.strip()
+        if term.lstrip('-') in ORDERING_FIELDS:
+            ordering.append(term)
+        elif term:
+            # Orderings the snapshot does not hold (e.g. rating) need the ORM
+            return None
+    return SnapshotRows(snapshot, snapshot.select(ordering=ordering, **filters), list(fields))
+
+
+def snapshot_detail(request, pk, fields):
+    """
+    Render one product from the snapshot, or None when the ORM must answer.
+    """
+    if not set(fields) <= SNAPSHOT_FIELDS or not set(request.query_params) <= DETAIL_PARAMS:
+        return None
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return None
+    position = snapshot.position_of(int(pk))
+    if position is None:
+        return None
+    row = snapshot.row(position)
+    return {name: row[name] for name in fields}
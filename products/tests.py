@@ -1,3 +1,726 @@
-from django.test import TestCase
+import csv
+import io
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from sellers.models import SellerProfile
+from api.models import SearchDocument
+from .models import Category, Product, ProductSearchToken
+from .snapshot import build_snapshot
+
+User = get_user_model()
+
+
+class ProductSearchTestCase(APITestCase):
+    def setUp(self):
+        seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Kitchen')
+        self.kettle = Product.objects.create(
+            title='Steel Kettle', description='Boils water fast', price='25.00',
+            stock=5, category=self.category, seller=self.seller
+        )
+        self.mug = Product.objects.create(
+            title='Ceramic Mug', description='Pairs well with a kettle', price='8.00',
+            stock=5, category=self.category, seller=self.seller
+        )
+
+    def search(self, query):
+        response = self.client.get('/api/products/', {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in response.data['data']['results']['data']]
+
+    def test_title_matches_rank_above_description_matches(self):
+        """Test search results are ordered by relevance"""
+        self.assertEqual(self.search('kettle'), [self.kettle.id, self.mug.id])
+
+    def test_all_terms_must_match_by_prefix(self):
+        """Test every query term is required and matched as a prefix"""
+        self.assertEqual(self.search('ste ket'), [self.kettle.id])
+        self.assertEqual(self.search('steel mug'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        """Test the index is updated when products change"""
+        self.mug.title = 'Ceramic Teapot'
+        self.mug.save()
+        self.assertEqual(self.search('teapot'), [self.mug.id])
+
+        self.kettle.delete()
+        self.assertFalse(ProductSearchToken.objects.filter(product_id=self.kettle.id).exists())
+        self.assertEqual(self.search('kettle'), [self.mug.id])
+
+
+class CategoryProductCountTestCase(APITestCase):
+    def setUp(self):
+        seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        self.books = Category.objects.create(name='Books')
+        self.games = Category.objects.create(name='Games')
+
+    def create_product(self, category, **kwargs):
+        return Product.objects.create(
+            title='Item', description='Item', price='1.00', stock=1,
+            category=category, seller=self.seller, **kwargs
+        )
+
+    def assertCounts(self, category, total, active):
+        category.refresh_from_db()
+        self.assertEqual((category.product_count, category.active_product_count), (total, active))
+
+    def test_counts_follow_create_move_toggle_and_delete(self):
+        """Test stored counters track every product change"""
+        product = self.create_product(self.books)
+        self.create_product(self.books, is_active=False)
+        self.assertCounts(self.books, 2, 1)
+
+        product.category = self.games
+        product.save()
+        self.assertCounts(self.books, 1, 0)
+        self.assertCounts(self.games, 1, 1)
+
+        product.is_active = False
+        product.save()
+        self.assertCounts(self.games, 1, 0)
+
+        product.delete()
+        self.assertCounts(self.games, 0, 0)
+
+    def test_recount_repairs_drift(self):
+        """Test recount_products fixes counters changed behind the signals' back"""
+        self.create_product(self.books)
+        Product.objects.update(is_active=False)
+        Category.objects.update(product_count=7)
+        Category.recount_products()
+        self.assertCounts(self.books, 1, 0)
+        self.assertCounts(self.games, 0, 0)
+
+    def test_counter_updates_touch_updated_at(self):
+        """Test counter changes advance updated_at and reconciling leaves correct rows alone"""
+        long_ago = timezone.now() - timedelta(days=1)
+        Category.objects.update(updated_at=long_ago)
+        self.create_product(self.books)
+        self.books.refresh_from_db()
+        self.assertGreater(self.books.updated_at, long_ago)
+
+        Category.objects.update(updated_at=long_ago)
+        Category.objects.filter(pk=self.games.pk).update(product_count=3)
+        call_command('reconcile_category_counts', stdout=io.StringIO())
+        self.books.refresh_from_db()
+        self.games.refresh_from_db()
+        self.assertEqual(self.books.updated_at, long_ago)
+        self.assertGreater(self.games.updated_at, long_ago)
+        self.assertCounts(self.games, 0, 0)
+
+    def test_category_list_reads_stored_count(self):
+        """Test the category list does not count products per row"""
+        self.create_product(self.books)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/categories/', {'ordering': 'name'})
+        results = response.data['data']['results']['data']
+        self.assertEqual([c['products_count'] for c in results], [1, 0])
+        self.assertNotIn('product_count', results[0])
+
+
+@override_settings(CATALOG_CACHE_SINGLE_PROCESS=True)
+class CatalogListingCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller_user = seller_user
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Garden')
+        self.product = Product.objects.create(
+            title='Rake', description='Metal rake', price='12.00', stock=4,
+            category=self.category, seller=self.seller
+        )
+
+    def titles(self, response):
+        return [item['title'] for item in response.data['data']['results']['data']]
+
+    def test_anonymous_listing_is_served_from_cache(self):
+        """Test repeated anonymous listings skip the database"""
+        first = self.client.get('/api/products/', {'page_size': 10, 'ordering': 'title'})
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/products/', {'ordering': 'title', 'page_size': 10})
+        self.assertEqual(first.data, second.data)
+
+    def test_catalog_writes_invalidate_cached_listings(self):
+        """Test product, category and seller writes bump the catalog version"""
+        self.client.get('/api/products/')
+        self.product.title = 'Leaf Rake'
+        self.product.save()
+        self.assertEqual(self.titles(self.client.get('/api/products/')), ['Leaf Rake'])
+
+        self.seller.store_name = 'Renamed Store'
+        self.seller.save()
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.data['data']['results']['data'][0]['seller_name'], 'Renamed Store')
+
+    def test_authenticated_listings_are_not_cached(self):
+        """Test only anonymous responses are cached"""
+        self.client.force_authenticate(self.seller_user)
+        self.client.get('/api/products/')
+        with self.assertNumQueries(2):
+            self.client.get('/api/products/')
+
+    def test_stats_count_hits_and_misses(self):
+        """Test hit/miss counters are exposed to admins"""
+        self.client.get('/api/products/categories/')
+        self.client.get('/api/products/categories/')
+        admin = User.objects.create_user(
+            username='admin', email='admin@test.com', password='TestPass123!', role='admin'
+        )
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/cache/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['data']['hits'], response.data['data']['misses']), (1, 1))
+
+    @override_settings(CATALOG_CACHE_SINGLE_PROCESS=False)
+    def test_per_process_cache_is_not_used(self):
+        """Test listings are not cached when workers do not share the cache"""
+        self.client.get('/api/products/')
+        with self.assertNumQueries(2):
+            self.client.get('/api/products/')
+
+
+class ConditionalDetailTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=self.seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Garden')
+        self.product = Product.objects.create(
+            title='Rake', description='Metal rake', price='12.00', stock=4,
+            category=self.category, seller=self.seller
+        )
+        self.url = f'/api/products/{self.product.id}/'
+
+    def test_matching_etag_short_circuits_before_serialization(self):
+        """Test If-None-Match answers 304 with a single lightweight query"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_related_changes_produce_a_new_etag(self):
+        """Test category edits change the product validators"""
+        response = self.client.get(self.url)
+        self.category.name = 'Yard'
+        self.category.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['category_name'], 'Yard')
+
+    def test_if_modified_since(self):
+        """Test Last-Modified is honoured"""
+        last_modified = self.client.get(self.url)['Last-Modified']
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_stale_if_match_rejects_writes(self):
+        """Test conditional PATCH with an outdated ETag fails with 412"""
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(self.seller_user)
+        response = self.client.patch(self.url, {'stock': 5}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(self.url, {'stock': 6}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+
+    def test_category_etag_tracks_product_count(self):
+        """Test category validators include the stored product counts"""
+        url = f'/api/products/categories/{self.category.id}/'
+        etag = self.client.get(url)['ETag']
+        self.product.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['products_count'], 0)
+
+
+class ProductFacetTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        self.books = Category.objects.create(name='Books')
+        self.games = Category.objects.create(name='Games')
+        for category, price, stock in [
+            (self.books, '10.00', 3), (self.books, '30.00', 0), (self.games, '600.00', 1),
+        ]:
+            Product.objects.create(
+                title='Item', description='Item', price=price, stock=stock,
+                category=category, seller=self.seller
+            )
+
+    def test_facets_are_computed_in_one_query(self):
+        """Test all requested facets cost a single extra query"""
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/products/', {'facets': 'category,seller,price,in_stock'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        facets = response.data['data']['results']['facets']
+        self.assertEqual(
+            [(entry['name'], entry['count']) for entry in facets['category']],
+            [('Books', 2), ('Games', 1)]
+        )
+        self.assertEqual(facets['seller'][0]['count'], 3)
+        self.assertEqual(
+            {entry['bucket']: entry['count'] for entry in facets['price'] if entry['count']},
+            {'0-25': 1, '25-50': 1, '500+': 1}
+        )
+        self.assertEqual(facets['in_stock'], {'true': 2, 'false': 1})
+
+    def test_facets_follow_filters(self):
+        """Test facet counts only cover the filtered products"""
+        response = self.client.get('/api/products/', {'facets': 'category', 'in_stock': 'true', 'max_price': 100})
+        self.assertEqual(len(response.data['data']['results']['data']), 1)
+        self.assertEqual(response.data['data']['results']['facets']['category'][0]['count'], 1)
+
+    def test_unknown_facet_is_rejected(self):
+        """Test unsupported facet names return 400"""
+        response = self.client.get('/api/products/', {'facets': 'colour'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductBulkImportTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=self.seller_user, store_name='Test Store')
+        self.books = Category.objects.create(name='Books')
+        self.client.force_authenticate(self.seller_user)
+
+    def upload(self, name, content, **data):
+        return self.client.post('/api/seller/products/import/', {
+            'file': SimpleUploadedFile(name, content.encode('utf-8')), **data
+        }, format='multipart')
+
+    def test_csv_import_reports_row_errors(self):
+        """Test valid rows are created and invalid rows reported by line"""
+        content = (
+            'title,description,price,stock,category\n'
+            'Atlas,World maps,20.00,3,Books\n'
+            'Broken,No price,,1,Books\n'
+            'Ghost,Unknown category,5.00,1,Nowhere\n'
+            f'Novel,A story,9.50,,{self.books.id}\n'
+        )
+        response = self.upload('catalog.csv', content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.data['data']
+        self.assertEqual((data['created'], data['failed']), (2, 2))
+        self.assertEqual([error['row'] for error in data['errors']], [3, 4])
+        self.assertIn('price', data['errors'][0]['errors'])
+
+        novel = Product.objects.get(title='Novel')
+        self.assertEqual((novel.stock, novel.seller, novel.category), (0, self.seller, self.books))
+
+    def test_numeric_category_names_match_when_no_id_does(self):
+        """Test an all-digit category is an id first, then a name"""
+        season = Category.objects.create(name='2024', description='Season')
+        content = (
+            'title,description,price,stock,category\n'
+            'Almanac,Yearbook,12.00,1,2024\n'
+            f'Novel,A story,9.50,1,{self.books.id}\n'
+        )
+        response = self.upload('catalog.csv', content)
+        self.assertEqual(response.data['data']['created'], 2)
+        self.assertEqual(Product.objects.get(title='Almanac').category, season)
+        self.assertEqual(Product.objects.get(title='Novel').category, self.books)
+
+    def test_jsonl_import_keeps_derived_data_in_sync(self):
+        """Test bulk-created products are indexed, counted and searchable"""
+        content = (
+            '{"title": "Steel Kettle", "description": "Boils", "price": "25.00", "category": "Books"}\n'
+            'not json\n'
+            '{"title": "Tea Guide", "description": "Brewing", "price": "5.00", "category": "Books"}\n'
+        )
+        # One write per table for the whole batch, not one per row
+        with self.assertNumQueries(10):
+            response = self.upload('catalog.jsonl', content)
+        self.assertEqual(response.data['data']['created'], 2)
+        self.assertEqual(response.data['data']['errors'][0]['row'], 2)
+
+        product = Product.objects.get(title='Steel Kettle')
+        self.books.refresh_from_db()
+        self.assertEqual((self.books.product_count, self.books.active_product_count), (2, 2))
+        self.assertTrue(ProductSearchToken.objects.filter(product=product, token='kettle').exists())
+        self.assertTrue(SearchDocument.objects.filter(kind='product', object_id=product.id).exists())
+
+    def test_undecodable_and_malformed_rows_are_reported(self):
+        """Test rows that are not UTF-8 or not valid CSV fail alone, not the upload"""
+        content = (
+            b'\xef\xbb\xbftitle,description,price,stock,category\n'
+            b'Atlas,World maps,20.00,3,Books\n'
+            b'\xff\xfeBad,Not utf-8,5.00,1,Books\n'
+            b'Huge,' + b'x' * (csv.field_size_limit() + 1) + b',5.00,1,Books\n'
+            b'Novel,A story,9.50,1,Books\n'
+        )
+        response = self.client.post('/api/seller/products/import/', {
+            'file': SimpleUploadedFile('catalog.csv', content)
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = response.data['data']
+        self.assertEqual((data['created'], data['failed']), (2, 2))
+        self.assertEqual([error['row'] for error in data['errors']], [3, 4])
+        self.assertEqual(data['errors'][0]['errors'], {'non_field_errors': ['Row is not valid UTF-8']})
+        self.assertEqual(sorted(Product.objects.values_list('title', flat=True)), ['Atlas', 'Novel'])
+
+    def test_only_sellers_can_import(self):
+        """Test buyers are rejected"""
+        buyer = User.objects.create_user(
+            username='buyer', email='buyer@test.com', password='TestPass123!', role='buyer'
+        )
+        self.client.force_authenticate(buyer)
+        response = self.upload('catalog.csv', 'title\n')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ProductBulkUpdateTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=self.seller_user, store_name='Test Store')
+        other_user = User.objects.create_user(
+            username='other', email='other@test.com', password='TestPass123!', role='seller'
+        )
+        other_seller = SellerProfile.objects.create(user=other_user, store_name='Other Store')
+        self.category = Category.objects.create(name='Tools')
+        self.hammer, self.saw = [
+            Product.objects.create(
+                title=title, description=title, price='10.00', stock=5,
+                category=self.category, seller=self.seller
+            )
+            for title in ('Hammer', 'Saw')
+        ]
+        self.foreign = Product.objects.create(
+            title='Drill', description='Drill', price='50.00', stock=1,
+            category=self.category, seller=other_seller
+        )
+        self.client.force_authenticate(self.seller_user)
+
+    def test_prices_and_stock_are_updated_set_based(self):
+        """Test the whole batch is checked and written with a constant number of queries"""
+        items = [
+            {'id': self.hammer.id, 'price': '12.50', 'stock_delta': 3},
+            {'id': self.saw.id, 'stock_delta': -10},
+        ]
+        with self.assertNumQueries(4):
+            response = self.client.post('/api/products/bulk-update/', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['data']['updated'], 2)
+
+        self.hammer.refresh_from_db()
+        self.saw.refresh_from_db()
+        self.assertEqual((str(self.hammer.price), self.hammer.stock), ('12.50', 8))
+        self.assertEqual((str(self.saw.price), self.saw.stock), ('10.00', 0))
+
+    def test_foreign_products_reject_the_whole_batch(self):
+        """Test one product owned by another seller fails the request without writes"""
+        items = [{'id': self.hammer.id, 'stock': 1}, {'id': self.foreign.id, 'stock': 1}]
+        response = self.client.post('/api/products/bulk-update/', {'items': items}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['data']['forbidden'], [self.foreign.id])
+        self.hammer.refresh_from_db()
+        self.assertEqual(self.hammer.stock, 5)
+
+    def test_invalid_entries_are_rejected(self):
+        """Test stock and stock_delta cannot be combined"""
+        items = [{'id': self.hammer.id, 'stock': 1, 'stock_delta': 1}]
+        response = self.client.post('/api/products/bulk-update/', items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductImageUploadTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root, PRODUCT_IMAGE_WORKERS=1)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=self.seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Garden')
+        self.product = Product.objects.create(
+            title='Watering Can', description='Can', price='15.00', stock=3,
+            category=self.category, seller=self.seller
+        )
+        self.client.force_authenticate(self.seller_user)
+
+    def png(self, size=(1200, 800)):
+        from PIL import Image
+        buffer = io.BytesIO()
+        Image.new('RGB', size, (40, 120, 60)).save(buffer, 'PNG')
+        return SimpleUploadedFile('can.png', buffer.getvalue(), content_type='image/png')
+
+    def upload(self, image, product=None):
+        product = product or self.product
+        return self.client.post(f'/api/products/{product.id}/image/', {'image': image}, format='multipart')
+
+    def test_upload_renders_thumbnails(self):
+        """Test an uploaded image is stored as resized thumbnails exposed on the product"""
+        from PIL import Image
+        response = self.upload(self.png())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        thumbnails = response.data['data']['thumbnails']
+        self.assertEqual(set(thumbnails), {'small', 'medium', 'large'})
+
+        self.product.refresh_from_db()
+        from .images import thumbnail_name
+        with Image.open(f'{self.media_root}/{thumbnail_name(self.product.image_hash, "medium")}') as thumb:
+            self.assertEqual((thumb.format, max(thumb.size)), ('WEBP', 480))
+
+        detail = self.client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(detail.data['data']['thumbnails'], thumbnails)
+
+    def test_identical_images_share_storage(self):
+        """Test re-uploading the same bytes reuses the stored thumbnails"""
+        other = Product.objects.create(
+            title='Rake', description='Rake', price='9.00', stock=3,
+            category=self.category, seller=self.seller
+        )
+        self.upload(self.png())
+        with mock.patch('products.images._pool') as pool:
+            response = self.upload(self.png(), product=other)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        pool.assert_not_called()
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.product.image_hash, other.image_hash)
+
+    def test_broken_or_stuck_pool_is_replaced(self):
+        """Test a timed-out or dead worker pool returns 503 and is recreated"""
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+        from concurrent.futures.process import BrokenProcessPool
+        from . import images
+        self.addCleanup(setattr, images, '_slots', images._slots)
+        self.addCleanup(setattr, images, '_executor', images._executor)
+        images._executor = images._slots = None
+
+        for error in (FutureTimeoutError(), BrokenProcessPool()):
+            with mock.patch('products.images.ProcessPoolExecutor') as executor_class:
+                executor_class.return_value.submit.return_value.result.side_effect = error
+                response = self.upload(self.png())
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual((response.data['success'], response.data['data']), (False, None))
+            executor_class.return_value.shutdown.assert_called_once_with(wait=False)
+            self.assertIsNone(images._executor)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_hash, '')
+
+    def test_invalid_image_is_rejected(self):
+        """Test a non-image upload fails without changing the product"""
+        response = self.upload(SimpleUploadedFile('can.png', b'not an image', content_type='image/png'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.data['success'])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_hash, '')
+
+
+@override_settings(AUTOCOMPLETE_VERSION_CHECK_SECONDS=0, AUTOCOMPLETE_BACKGROUND_REBUILD=False)
+class ProductAutocompleteTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Kettles')
+        self.steel = Product.objects.create(
+            title='Steel Kettle', description='Kettle', price='25.00', stock=5,
+            category=self.category, seller=self.seller, rating_count=3
+        )
+        self.glass = Product.objects.create(
+            title='Glass Kettle', description='Kettle', price='30.00', stock=5,
+            category=self.category, seller=self.seller, rating_count=8
+        )
+
+    def complete(self, query):
+        response = self.client.get('/api/products/autocomplete/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(item['type'], item['text']) for item in response.data['data']]
+
+    def test_prefixes_match_any_word_ranked_by_popularity(self):
+        """Test completions match word starts of titles and categories, most popular first"""
+        self.assertEqual(self.complete('ket'), [
+            ('product', 'Glass Kettle'), ('product', 'Steel Kettle'), ('category', 'Kettles'),
+        ])
+        self.assertEqual(self.complete('steel k'), [('product', 'Steel Kettle')])
+        self.assertEqual(self.complete('g'), [('product', 'Glass Kettle')])
+
+    def test_index_follows_catalog_changes(self):
+        """Test the index is rebuilt after products change"""
+        self.assertEqual(self.complete('cop'), [])
+        Product.objects.create(
+            title='Copper Kettle', description='Kettle', price='40.00', stock=5,
+            category=self.category, seller=self.seller
+        )
+        self.glass.is_active = False
+        self.glass.save()
+        self.assertEqual(self.complete('cop'), [('product', 'Copper Kettle')])
+        self.assertNotIn(('product', 'Glass Kettle'), self.complete('kettle'))
+
+    def test_index_sees_writes_that_skip_the_catalog_version(self):
+        """Test on a per-process cache the index follows the tables, not this process's version"""
+        self.assertEqual(self.complete('cop'), [])
+        # Like a write made in another worker: no signal, no version bump here
+        Product.objects.filter(pk=self.steel.pk).update(title='Copper Kettle', updated_at=timezone.now())
+        self.assertEqual(self.complete('cop'), [('product', 'Copper Kettle')])
+
+    def test_rebuild_runs_in_the_background(self):
+        """Test requests keep the previous index until a background rebuild swaps in"""
+        from . import autocomplete
+        self.assertEqual(self.complete('cop'), [])
+        previous = autocomplete.get_index()
+        started, finish = threading.Event(), threading.Event()
+        rebuilt = autocomplete.PrefixIndex([('Copper Kettle', 'product', 99, 0)])
+
+        def build_index():
+            started.set()
+            finish.wait(5)
+            return rebuilt
+
+        Product.objects.filter(pk=self.steel.pk).update(updated_at=timezone.now())
+        with self.settings(AUTOCOMPLETE_BACKGROUND_REBUILD=True), \
+                mock.patch('products.autocomplete.build_index', side_effect=build_index) as build:
+            self.assertIs(autocomplete.get_index(), previous)
+            self.assertTrue(started.wait(5))
+            self.assertIs(autocomplete.get_index(), previous)
+            finish.set()
+            for thread in threading.enumerate():
+                if thread.name == 'autocomplete-rebuild':
+                    thread.join(5)
+            self.assertEqual(self.complete('cop'), [('product', 'Copper Kettle')])
+        build.assert_called_once_with()
+
+    def test_query_is_required(self):
+        """Test a blank query is rejected"""
+        response = self.client.get('/api/products/autocomplete/', {'q': ' '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CatalogSnapshotTestCase(APITestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        # The build command stamps the file through a cache the workers share
+        shared = override_settings(CATALOG_SNAPSHOT_PATH=f'{directory}/catalog.snapshot', CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': f'{directory}/cache',
+        }})
+        shared.enable()
+        self.addCleanup(shared.disable)
+        cache.clear()
+
+        seller_user = User.objects.create_user(
+            username='seller', email='seller@test.com', password='TestPass123!', role='seller'
+        )
+        self.seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        self.category = Category.objects.create(name='Lamps')
+        self.desk = Product.objects.create(
+            title='Desk Lamp', description='Lamp', price='19.99', stock=0,
+            category=self.category, seller=self.seller
+        )
+        self.floor = Product.objects.create(
+            title='Floor Lamp', description='Lamp', price='49.50', stock=4,
+            category=self.category, seller=self.seller
+        )
+        Product.objects.create(
+            title='Wall Lamp', description='Lamp', price='35.00', stock=2,
+            category=Category.objects.create(name='Walls'), seller=self.seller
+        )
+
+    def listing(self, **params):
+        response = self.client.get('/api/products/', {'fields': 'id,title,price,category_name', **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['data']
+
+    def test_listing_is_served_from_the_snapshot(self):
+        """Test narrow, filtered and sorted listings match the ORM and run no queries"""
+        params = {'category': self.category.id, 'ordering': '-price', 'min_price': '19.99'}
+        expected = self.listing(**params)
+        build_snapshot()
+        with self.assertNumQueries(0):
+            served = self.listing(**params, page_size=10)
+        self.assertEqual(served['results']['data'], expected['results']['data'])
+        self.assertEqual(served['results']['data'][0], {
+            'id': self.floor.id, 'title': 'Floor Lamp', 'price': '49.50', 'category_name': 'Lamps'
+        })
+        self.assertEqual(served['pagination']['count'], 2)
+
+        with self.assertNumQueries(0):
+            in_stock = self.listing(in_stock='false')
+        self.assertEqual([item['id'] for item in in_stock['results']['data']], [self.desk.id])
+
+    def test_writes_and_unsupported_requests_fall_back_to_the_orm(self):
+        """Test a product write makes the snapshot stale and wide requests keep using the ORM"""
+        build_snapshot()
+        response = self.client.get(f'/api/products/{self.desk.id}/', {'fields': 'title,price'})
+        self.assertEqual(response.data['data'], {'title': 'Desk Lamp', 'price': '19.99'})
+
+        self.desk.price = '17.00'
+        self.desk.save()
+        response = self.client.get(f'/api/products/{self.desk.id}/', {'fields': 'title,price'})
+        self.assertEqual(response.data['data']['price'], '17.00')
+
+        build_snapshot()
+        self.assertEqual(self.listing(search='desk')['results']['data'][0]['price'], '17.00')
+        response = self.client.get('/api/products/', {'fields': 'id,description'})
+        self.assertEqual(response.data['data']['results']['data'][0]['description'], 'Lamp')
+
+    @override_settings(CATALOG_CACHE_SINGLE_PROCESS=True, CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    })
+    def test_snapshot_requires_a_shared_cache(self):
+        """Test the snapshot is not built or served on a per-process cache, even for a single process"""
+        with self.assertRaises(CommandError):
+            call_command('build_catalog_snapshot', stdout=io.StringIO())
+        build_snapshot()
+        with self.assertNumQueries(2):
+            self.listing()
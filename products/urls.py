@@ -1,5 +1,9 @@
 from django.urls import path
-from .views import CategoryListCreateView, CategoryDetailView, ProductListCreateView, ProductDetailView
+from .views import (
+    CategoryListCreateView, CategoryDetailView, ProductListCreateView, ProductDetailView,
+    ProductBulkUpdateView, ProductImageUploadView, ProductAutocompleteView,
+)
+from analytics.views import RelatedProductListView
 
 urlpatterns = [
     # Category endpoints
@@ -9,4 +13,8 @@ urlpatterns = [
     # Product endpoints
     path('', ProductListCreateView.as_view(), name='product-list-create'),
     path('<int:pk>/', ProductDetailView.as_view(), name='product-detail'),
+    path('<int:pk>/image/', ProductImageUploadView.as_view(), name='product-image-upload'),
+    path('<int:pk>/related/', RelatedProductListView.as_view(), name='product-related'),
+    path('autocomplete/', ProductAutocompleteView.as_view(), name='product-autocomplete'),
+    path('bulk-update/', ProductBulkUpdateView.as_view(), name='product-bulk-update'),
 ]
\ No newline at end of file
@@ -1,12 +1,24 @@
 from rest_framework import generics, status, filters
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Category, Product
 from .serializers import CategorySerializer, ProductSerializer
+from .filters import ProductFilter, ProductSearchFilter
+from .facets import compute_facets, parse_facets
+from .bulk import ProductBulkUpdateItemSerializer, bulk_update_products
+from .images import ImageProcessingError, ImageWorkerError, store_product_image
+from .autocomplete import MAX_LIMIT, autocomplete
+from .snapshot import snapshot_detail, snapshot_listing
 from api.permissions import IsSellerOrAdmin, IsAdmin
+from api.pagination import KeysetPaginationMixin
+from api.prefetch import PlannedQuerysetMixin
+from api.cache import CatalogCacheMixin
+from api.conditional import conditional_object
 
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(CatalogCacheMixin, KeysetPaginationMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -50,6 +62,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
             'error': None
         }, status=status.HTTP_201_CREATED)
 
+@conditional_object(Category, ('updated_at', 'product_count', 'active_product_count'))
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -93,13 +106,13 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
             'error': None
         }, status=status.HTTP_204_NO_CONTENT)
 
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(CatalogCacheMixin, KeysetPaginationMixin, PlannedQuerysetMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'seller', 'is_active']
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
+    filterset_class = ProductFilter
     search_fields = ['title', 'description']
-    ordering_fields = ['price', 'created_at', 'title']
+    ordering_fields = ['price', 'created_at', 'title', 'rating_avg', 'rating_count']
     
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -111,21 +124,51 @@ class ProductListCreateView(generics.ListCreateAPIView):
         return [permission() for permission in permission_classes]
     
     def list(self, request, *args, **kwargs):
+        try:
+            facet_names = parse_facets(request.query_params.get('facets', ''))
+        except ValueError as exc:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Narrow listings (e.g. ?fields=id,title,price) may be answered from
+        # the memory-mapped catalog snapshot without touching the database
+        rows = snapshot_listing(request, self.get_serializer().fields)
+        if rows is not None:
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response({
+                    'success': True,
+                    'data': page,
+                    'error': None
+                })
+            return Response({
+                'success': True,
+                'data': rows[:],
+                'error': None
+            })
+
         queryset = self.filter_queryset(self.get_queryset())
+        # Facet counts cover the whole filtered result set, not just this page
+        extra = {'facets': compute_facets(queryset, facet_names)} if facet_names else {}
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response({
                 'success': True,
                 'data': serializer.data,
-                'error': None
+                'error': None,
+                **extra
             })
         
         serializer = self.get_serializer(queryset, many=True)
         return Response({
             'success': True,
             'data': serializer.data,
-            'error': None
+            'error': None,
+            **extra
         })
     
     def create(self, request, *args, **kwargs):
@@ -147,7 +190,11 @@ class ProductListCreateView(generics.ListCreateAPIView):
             'error': None
         }, status=status.HTTP_201_CREATED)
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+@conditional_object(Product, (
+    'updated_at', 'category__updated_at', 'seller__updated_at', 'rating_count',
+    'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+))
+class ProductDetailView(PlannedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     
@@ -161,11 +208,12 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
         return [permission() for permission in permission_classes]
     
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
+        data = snapshot_detail(request, kwargs['pk'], self.get_serializer().fields)
+        if data is None:
+            data = self.get_serializer(self.get_object()).data
         return Response({
             'success': True,
-            'data': serializer.data,
+            'data': data,
             'error': None
         })
     
@@ -208,4 +256,132 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
                 'success': False,
                 'data': None,
                 'error': 'You do not have permission to perform this action.'
-            }, status=status.HTTP_403_FORBIDDEN)
\ No newline at end of file
+            }, status=status.HTTP_403_FORBIDDEN)
+
+class ProductBulkUpdateView(APIView):
+    """
+    Update price and/or stock of many products in one request. The body is
+    a list of {id, price?, stock?, stock_delta?} entries; sellers may only
+    touch their own products, which is checked for the whole batch at once.
+    """
+    permission_classes = [IsSellerOrAdmin]
+    
+    def post(self, request, *args, **kwargs):
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        serializer = ProductBulkUpdateItemSerializer(data=items, many=True)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'data': None,
+                'error': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        items = serializer.validated_data
+        ids = [item['id'] for item in items]
+        if len(set(ids)) != len(ids):
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'Each product id may appear only once per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        owners = dict(Product.objects.filter(pk__in=ids).values_list('id', 'seller__user_id'))
+        missing = [pk for pk in ids if pk not in owners]
+        if missing:
+            return Response({
+                'success': False,
+                'data': {'missing': missing},
+                'error': 'Some products were not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if request.user.role != 'admin':
+            foreign = [pk for pk in ids if owners[pk] != request.user.id]
+            if foreign:
+                return Response({
+                    'success': False,
+                    'data': {'forbidden': foreign},
+                    'error': 'You do not have permission to perform this action.'
+                }, status=status.HTTP_403_FORBIDDEN)
+        
+        updated = bulk_update_products(items)
+        return Response({
+            'success': True,
+            'data': {'updated': updated},
+            'error': None
+        })
+
+class ProductImageUploadView(generics.GenericAPIView):
+    """
+    Upload a product image (multipart `image`). Thumbnails are rendered in
+    a worker process pool and stored by content hash; the response carries
+    the updated product with its thumbnail URLs.
+    """
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    permission_classes = [IsSellerOrAdmin]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if not ((hasattr(request.user, 'seller_profile') and
+                 instance.seller == request.user.seller_profile) or
+                request.user.role == 'admin'):
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'You do not have permission to perform this action.'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        upload = request.FILES.get('image')
+        if upload is None:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'An image upload is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            instance.image_hash = store_product_image(upload)
+        except ImageProcessingError as exc:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except ImageWorkerError as exc:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': str(exc)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        instance.save(update_fields=['image_hash', 'updated_at'])
+        return Response({
+            'success': True,
+            'data': self.get_serializer(instance).data,
+            'error': None
+        })
+
+class ProductAutocompleteView(APIView):
+    """
+    Search-as-you-type completions of active product titles and category
+    names (`?q=`, optional `limit`), served from an in-process prefix index.
+    """
+    permission_classes = [AllowAny]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'Query parameter "q" is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), MAX_LIMIT))
+        except ValueError:
+            limit = 10
+        return Response({
+            'success': True,
+            'data': autocomplete(query, limit),
+            'error': None
+        })
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from api.cache import bump_catalog_version
+from reviews.ratings import rebuild_product_ratings
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored rating aggregates of every product from its reviews'
+
+    def handle(self, *args, **options):
+        updated = rebuild_product_ratings()
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt ratings of {updated} products'))
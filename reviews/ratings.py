@@ -0,0 +1,71 @@
+from django.db.models import Count, DecimalField, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Now, Round
+
+from products.models import Product
+from .models import Review
+
+STARS = range(1, 6)
+
+
+def _average(total, count):
+    # avg = sum / count, 0 for unrated products; computed in SQL
+    return Coalesce(
+        Cast(Round(Cast(total, FloatField()) / NullIf(count, 0), 2),
+             DecimalField(max_digits=3, decimal_places=2)),
+        Value(0, output_field=DecimalField(max_digits=3, decimal_places=2)),
+    )
+
+
+def adjust_product_rating(product_id, added=None, removed=None):
+    """
+    Add and/or remove one rating from a product's stored aggregates with a
+    single F()-expression UPDATE, so the cost does not depend on how many
+    reviews the product has and concurrent reviews do not lose updates.
+    """
+    count_delta = (added is not None) - (removed is not None)
+    sum_delta = (added or 0) - (removed or 0)
+    changes = {
+        'rating_count': F('rating_count') + count_delta,
+        'rating_sum': F('rating_sum') + sum_delta,
+        'rating_avg': _average(F('rating_sum') + sum_delta, F('rating_count') + count_delta),
+        # Last-Modified and the export feed follow updated_at
+        'updated_at': Now(),
+    }
+    if added is not None:
+        changes[f'rating_{added}_count'] = F(f'rating_{added}_count') + 1
+    if removed is not None:
+        bucket = f'rating_{removed}_count'
+        changes[bucket] = (changes.get(bucket) or F(bucket)) - 1
+    Product.objects.filter(pk=product_id).update(**changes)
+
+
+def rebuild_product_ratings(product_ids=None):
+    """
+    Recompute the stored rating aggregates from the reviews table in a
+    single UPDATE. Returns the number of products written.
+    """
+    stats = (
+        Review.objects
+        .filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(
+            total=Sum('rating'),
+            count=Count('pk'),
+            **{f'stars_{star}': Count('pk', filter=Q(rating=star)) for star in STARS}
+        )
+    )
+
+    def stat(name):
+        return Coalesce(Subquery(stats.values(name)), 0)
+
+    queryset = Product.objects.all()
+    if product_ids is not None:
+        queryset = queryset.filter(pk__in=product_ids)
+    return queryset.update(
+        rating_count=stat('count'),
+        rating_sum=stat('total'),
+        rating_avg=_average(stat('total'), stat('count')),
+        updated_at=Now(),
+        **{f'rating_{star}_count': stat(f'stars_{star}') for star in STARS}
+    )
@@ -0,0 +1,44 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Review
+from .ratings import adjust_product_rating
+
+
+@receiver(pre_save, sender=Review)
+def capture_previous_rating(sender, instance, raw=False, **kwargs):
+    """
+    Remember the stored product/rating so post_save can move the old
+    rating out of the aggregates.
+    """
+    instance._previous_rating = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_rating = (
+        Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def update_product_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        adjust_product_rating(instance.product_id, added=instance.rating)
+        return
+    previous = getattr(instance, '_previous_rating', None)
+    if previous is None:
+        return
+    previous_product_id, previous_rating = previous
+    if (previous_product_id, previous_rating) == (instance.product_id, instance.rating):
+        return
+    if previous_product_id == instance.product_id:
+        adjust_product_rating(instance.product_id, added=instance.rating, removed=previous_rating)
+    else:
+        adjust_product_rating(previous_product_id, removed=previous_rating)
+        adjust_product_rating(instance.product_id, added=instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+def remove_product_rating(sender, instance, **kwargs):
+    adjust_product_rating(instance.product_id, removed=instance.rating)
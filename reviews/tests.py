@@ -1,3 +1,100 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from sellers.models import SellerProfile
+from products.models import Category, Product
+from .models import Review
+from .ratings import rebuild_product_ratings
+
+User = get_user_model()
+
+
+class ProductRatingAggregateTestCase(APITestCase):
+    def setUp(self):
+        seller_user = User.objects.create_user(
+            username='seller',
+            email='seller@test.com',
+            password='TestPass123!',
+            role='seller'
+        )
+        seller = SellerProfile.objects.create(user=seller_user, store_name='Test Store')
+        category = Category.objects.create(name='Audio')
+        self.speaker, self.radio = [
+            Product.objects.create(
+                title=title, description=title, price='30.00', stock=2,
+                category=category, seller=seller
+            )
+            for title in ('Speaker', 'Radio')
+        ]
+        self.buyers = [
+            User.objects.create_user(
+                username=f'buyer{i}', email=f'buyer{i}@test.com', password='TestPass123!', role='buyer'
+            )
+            for i in range(3)
+        ]
+
+    def review(self, buyer, rating, product=None):
+        self.client.force_authenticate(buyer)
+        product = product or self.speaker
+        response = self.client.post(f'/api/reviews/products/{product.id}/', {'product': product.id, 'rating': rating}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['data']['id']
+
+    def assertRating(self, product, avg, count, histogram):
+        product.refresh_from_db()
+        self.assertEqual((product.rating_avg, product.rating_count), (Decimal(avg), count))
+        self.assertEqual(product.rating_histogram, histogram)
+
+    def test_aggregates_follow_create_update_and_delete(self):
+        """Test stored aggregates track every review change"""
+        self.review(self.buyers[0], 5)
+        review_id = self.review(self.buyers[1], 4)
+        self.review(self.buyers[2], 4)
+        self.assertRating(self.speaker, '4.33', 3, {'1': 0, '2': 0, '3': 0, '4': 2, '5': 1})
+
+        self.client.force_authenticate(self.buyers[1])
+        self.client.patch(f'/api/reviews/{review_id}/', {'rating': 1}, format='json')
+        self.assertRating(self.speaker, '3.33', 3, {'1': 1, '2': 0, '3': 0, '4': 1, '5': 1})
+
+        self.client.delete(f'/api/reviews/{review_id}/')
+        self.assertRating(self.speaker, '4.50', 2, {'1': 0, '2': 0, '3': 0, '4': 1, '5': 1})
+
+    def test_product_list_filters_and_sorts_by_rating(self):
+        """Test ?min_rating= and ?ordering=-rating_avg use the stored values"""
+        self.review(self.buyers[0], 2)
+        self.review(self.buyers[0], 5, product=self.radio)
+        self.client.force_authenticate(None)
+        response = self.client.get('/api/products/', {'ordering': '-rating_avg'})
+        results = response.data['data']['results']['data']
+        self.assertEqual([item['id'] for item in results], [self.radio.id, self.speaker.id])
+        self.assertEqual(results[0]['rating_histogram']['5'], 1)
+        self.assertNotIn('rating_sum', results[0])
+
+        response = self.client.get('/api/products/', {'min_rating': 3})
+        self.assertEqual([item['id'] for item in response.data['data']['results']['data']], [self.radio.id])
+
+    def test_rebuild_repairs_drift(self):
+        """Test rebuild_product_ratings recomputes from the reviews table"""
+        self.review(self.buyers[0], 3)
+        Review.objects.create(user=self.buyers[1], product=self.speaker, rating=5)
+        Product.objects.update(rating_count=0, rating_sum=0, rating_avg=0, rating_3_count=9)
+        rebuild_product_ratings()
+        self.assertRating(self.speaker, '4.00', 2, {'1': 0, '2': 0, '3': 1, '4': 0, '5': 1})
+        self.assertRating(self.radio, '0.00', 0, {'1': 0, '2': 0, '3': 0, '4': 0, '5': 0})
+
+    def test_rating_changes_touch_updated_at(self):
+        """Test review writes and rebuilds advance updated_at, which Last-Modified follows"""
+        long_ago = timezone.now() - timedelta(days=1)
+        Product.objects.update(updated_at=long_ago)
+        self.review(self.buyers[0], 4)
+        self.speaker.refresh_from_db()
+        self.assertGreater(self.speaker.updated_at, long_ago)
+
+        Product.objects.update(updated_at=long_ago)
+        rebuild_product_ratings([self.radio.id])
+        self.radio.refresh_from_db()
+        self.assertGreater(self.radio.updated_at, long_ago)
@@ -4,8 +4,10 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Review
 from products.models import Product
 from .serializers import ReviewSerializer
+from api.pagination import KeysetPaginationMixin
+from api.prefetch import PlannedQuerysetMixin
 
-class ProductReviewListCreateView(generics.ListCreateAPIView):
+class ProductReviewListCreateView(KeysetPaginationMixin, PlannedQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticated]
     
@@ -51,7 +53,7 @@ class ProductReviewListCreateView(generics.ListCreateAPIView):
             'error': None
         }, status=status.HTTP_201_CREATED)
 
-class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewDetailView(PlannedQuerysetMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticated]
     
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import SellerProfileView, SellerProductListView, SellerOrderListView
+from .views import SellerProfileView, SellerProductListView, SellerProductImportView, SellerOrderListView
 
 urlpatterns = [
     path('profile/', SellerProfileView.as_view(), name='seller-profile'),
     path('products/', SellerProductListView.as_view(), name='seller-product-list-create'),
+    path('products/import/', SellerProductImportView.as_view(), name='seller-product-import'),
     path('orders/', SellerOrderListView.as_view(), name='seller-order-list'),
 ]
\ No newline at end of file
@@ -1,4 +1,6 @@
 from rest_framework import generics, status
+from rest_framework.views import APIView
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from .models import SellerProfile
@@ -6,7 +8,10 @@ from products.models import Product
 from orders.models import Order
 from .serializers import SellerProfileSerializer
 from products.serializers import ProductSerializer
+from products.bulk import detect_format, iter_rows, import_products
 from orders.serializers import OrderSerializer
+from api.pagination import KeysetPaginationMixin
+from api.prefetch import PlannedQuerysetMixin
 
 class SellerProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = SellerProfileSerializer
@@ -54,7 +59,7 @@ class SellerProfileView(generics.RetrieveUpdateAPIView):
             'error': None
         })
 
-class SellerProductListView(generics.ListCreateAPIView):
+class SellerProductListView(KeysetPaginationMixin, PlannedQuerysetMixin, generics.ListCreateAPIView):
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
     
@@ -121,7 +126,57 @@ class SellerProductListView(generics.ListCreateAPIView):
             'error': None
         }, status=status.HTTP_201_CREATED)
 
-class SellerOrderListView(generics.ListAPIView):
+class SellerProductImportView(APIView):
+    """
+    Bulk-create products from an uploaded CSV or JSONL file (`file`, with an
+    optional `format` of csv/jsonl). Rows are streamed and inserted in
+    batches; invalid rows are reported and skipped.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request, *args, **kwargs):
+        if request.user.role != 'seller':
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'Only sellers can import products'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            seller_profile = SellerProfile.objects.get(user=request.user)
+        except SellerProfile.DoesNotExist:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'Seller profile not found'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': 'A file upload is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            fmt = detect_format(upload.name, request.data.get('format'))
+        except ValueError as exc:
+            return Response({
+                'success': False,
+                'data': None,
+                'error': str(exc)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        result = import_products(iter_rows(upload, fmt), seller_profile)
+        return Response({
+            'success': True,
+            'data': result,
+            'error': None
+        }, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
+class SellerOrderListView(PlannedQuerysetMixin, generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
     
@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from .models import Wishlist
 from products.serializers import ProductSerializer
+from api.sparse import SparseFieldsetMixin
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     products = ProductSerializer(many=True, read_only=True)
     products_count = serializers.SerializerMethodField()
     
@@ -10,6 +11,7 @@ class WishlistSerializer(serializers.ModelSerializer):
         model = Wishlist
         fields = '__all__'
         read_only_fields = ('id', 'user', 'created_at', 'updated_at')
+        field_sources = {'products_count': ()}
         
     def get_products_count(self, obj):
         return obj.products.count()
\ No newline at end of file
@@ -4,13 +4,15 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Wishlist
 from products.models import Product
 from .serializers import WishlistSerializer
+from api.prefetch import PlannedQuerysetMixin
 
-class WishlistView(generics.RetrieveAPIView):
+class WishlistView(PlannedQuerysetMixin, generics.RetrieveAPIView):
     serializer_class = WishlistSerializer
     permission_classes = [IsAuthenticated]
     
     def get_object(self):
-        wishlist, created = Wishlist.objects.get_or_create(user=self.request.user)
+        queryset = self.plan_queryset(Wishlist.objects.all())
+        wishlist, created = queryset.get_or_create(user=self.request.user)
         return wishlist
     
     def retrieve(self, request, *args, **kwargs):